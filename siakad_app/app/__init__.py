@@ -28,6 +28,8 @@ login.login_message = 'Silakan login untuk mengakses halaman ini.'
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
+    # Processes started from this app (flask pdf-worker) are created with the same config
+    app.config['CONFIG_CLASS'] = config_class
 
     # Init extensions with app
     db.init_app(app)
@@ -123,6 +125,14 @@ def create_app(config_class=Config):
     from app.errors import bp as errors_bp
     app.register_blueprint(errors_bp)
 
+    # Background audit log writer (record_audit)
+    from app.services.audit_writer import AuditWriter
+    AuditWriter(app)
+
+    # CLI Commands (flask pdf-worker, ...)
+    from app.commands import register_commands
+    register_commands(app)
+
     # Import models to ensure they are registered with SQLAlchemy
     # We put this inside create_app or at bottom of file to avoid circular imports
     # But usually models import db from app, so db must be defined.
@@ -0,0 +1,62 @@
+import click
+from app import db
+from app.services.pdf_service import PdfService
+from app.services.absensi_rekap import AbsensiRekapService
+from app.services.saldo_harian import SaldoHarianService
+from app.services.tabungan import TabunganService
+from app.services.berkas import BerkasService
+
+def register_commands(app):
+    @app.cli.command('pdf-worker')
+    @click.option('--processes', default=2, show_default=True, help='Jumlah proses render PDF.')
+    @click.option('--poll-interval', default=1.0, show_default=True, help='Jeda (detik) saat antrian kosong.')
+    def pdf_worker(processes, poll_interval):
+        """Jalankan pool worker untuk antrian render PDF."""
+        requeued = PdfService.requeue_stale_jobs()
+        if requeued:
+            click.echo(f'{requeued} job macet dikembalikan ke antrian.')
+        click.echo(f'PDF worker berjalan dengan {processes} proses.')
+        PdfService.run_worker_pool(processes, poll_interval)
+
+    @app.cli.command('rebuild-absensi-rekap')
+    @click.option('--santri-id', 'santri_ids', type=int, multiple=True, help='Hanya santri ini (boleh diulang).')
+    def rebuild_absensi_rekap(santri_ids):
+        """Hitung ulang tabel rekap absensi bulanan dari data absensi."""
+        rows = AbsensiRekapService.rebuild(list(santri_ids) or None)
+        db.session.commit()
+        click.echo(f'{rows} baris rekap absensi dibuat ulang.')
+
+    @app.cli.command('rebuild-saldo-harian')
+    @click.option('--pos-id', 'pos_ids', type=int, multiple=True, help='Hanya pos keuangan ini (boleh diulang).')
+    def rebuild_saldo_harian(pos_ids):
+        """Hitung ulang tabel saldo harian dari data transaksi keuangan."""
+        rows = SaldoHarianService.rebuild(list(pos_ids) or None)
+        db.session.commit()
+        click.echo(f'{rows} baris saldo harian dibuat ulang.')
+
+    @app.cli.command('rebuild-saldo-tabungan')
+    @click.option('--santri-id', 'santri_ids', type=int, multiple=True, help='Hanya santri ini (boleh diulang).')
+    def rebuild_saldo_tabungan(santri_ids):
+        """Hitung ulang saldo tabungan per santri dari riwayat tabungan."""
+        rows = TabunganService.rebuild(list(santri_ids) or None)
+        db.session.commit()
+        click.echo(f'{rows} saldo tabungan dibuat ulang.')
+
+    @app.cli.command('thumbnail-berkas')
+    @click.option('--ulang', is_flag=True, help='Coba lagi thumbnail yang sebelumnya gagal.')
+    def thumbnail_berkas(ulang):
+        """Buat thumbnail berkas upload yang masih antri (biasanya dikerjakan pdf-worker)."""
+        BerkasService.requeue_stale_thumbnails()
+        total = 0
+        while True:
+            processed = BerkasService.proses_thumbnail(ulang=ulang)
+            if not processed:
+                break
+            total += processed
+        click.echo(f'{total} thumbnail diproses.')
+
+    @app.cli.command('replay-audit-spool')
+    def replay_audit_spool():
+        """Tulis ke database audit log yang tersimpan di spool saat database tidak tersedia."""
+        written = app.extensions['audit_writer'].replay_spool()
+        click.echo(f'{written} audit log ditulis dari spool.')
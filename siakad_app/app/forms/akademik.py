@@ -1,15 +1,13 @@
 from flask_wtf import FlaskForm
 from wtforms import SelectField, IntegerField, FloatField, DateField, SubmitField, StringField, TextAreaField
-from wtforms.validators import DataRequired, NumberRange, Length
+from wtforms.validators import DataRequired, NumberRange, Length, ValidationError
+from app.services.quran import SURAH, jumlah_ayat
+from app.forms.fields import SantriField
 
 class NilaiForm(FlaskForm):
-    santri_id = SelectField('Santri', coerce=int, validators=[DataRequired()])
+    santri_id = SantriField('Santri', validators=[DataRequired()])
     mapel_id = SelectField('Mata Pelajaran', coerce=int, validators=[DataRequired()])
-    semester = SelectField('Semester', choices=[
-        ('Ganjil 2024/2025', 'Ganjil 2024/2025'),
-        ('Genap 2024/2025', 'Genap 2024/2025'),
-        ('Ganjil 2025/2026', 'Ganjil 2025/2026')
-    ], validators=[DataRequired()])
+    semester = SelectField('Semester', choices=[], validators=[DataRequired()])
     
     nilai_harian = FloatField('Nilai Harian', validators=[NumberRange(min=0, max=100)], default=0)
     nilai_uts = FloatField('Nilai UTS', validators=[NumberRange(min=0, max=100)], default=0)
@@ -18,21 +16,36 @@ class NilaiForm(FlaskForm):
     
     submit = SubmitField('Simpan Nilai')
 
+class NilaiKelasForm(FlaskForm):
+    kelas_id = SelectField('Kelas', coerce=int, validators=[DataRequired()])
+    mapel_id = SelectField('Mata Pelajaran', coerce=int, validators=[DataRequired()])
+    semester = SelectField('Semester', choices=[], validators=[DataRequired()])
+    submit = SubmitField('Simpan Nilai Kelas')
+
+ABSENSI_STATUS_CHOICES = [
+    ('Hadir', 'Hadir'),
+    ('Sakit', 'Sakit'),
+    ('Izin', 'Izin'),
+    ('Alpha', 'Alpha')
+]
+
 class AbsensiForm(FlaskForm):
-    santri_id = SelectField('Santri', coerce=int, validators=[DataRequired()])
+    santri_id = SantriField('Santri', validators=[DataRequired()])
     tanggal = DateField('Tanggal', validators=[DataRequired()])
-    status = SelectField('Status', choices=[
-        ('Hadir', 'Hadir'),
-        ('Sakit', 'Sakit'),
-        ('Izin', 'Izin'),
-        ('Alpha', 'Alpha')
-    ], validators=[DataRequired()])
+    status = SelectField('Status', choices=ABSENSI_STATUS_CHOICES, validators=[DataRequired()])
     submit = SubmitField('Simpan Absensi')
 
+class AbsensiKelasForm(FlaskForm):
+    kelas_id = SelectField('Kelas', coerce=int, validators=[DataRequired()])
+    tanggal = DateField('Tanggal', validators=[DataRequired()])
+    submit = SubmitField('Simpan Absensi Kelas')
+
 class TahfidzForm(FlaskForm):
-    santri_id = SelectField('Santri', coerce=int, validators=[DataRequired()])
-    nama_surat = StringField('Nama Surat', validators=[DataRequired(), Length(max=50)])
-    ayat = StringField('Ayat', validators=[DataRequired(), Length(max=50)])
+    santri_id = SantriField('Santri', validators=[DataRequired()])
+    surah_nomor = SelectField('Surat', coerce=int, choices=[(nomor, f'{nomor}. {nama}') for nomor, nama, _ in SURAH],
+                              validators=[DataRequired()])
+    ayat_mulai = IntegerField('Dari Ayat', validators=[DataRequired(), NumberRange(min=1)])
+    ayat_selesai = IntegerField('Sampai Ayat', validators=[DataRequired(), NumberRange(min=1)])
     kelancaran = SelectField('Kelancaran', choices=[
         ('Lancar', 'Lancar'),
         ('Kurang Lancar', 'Kurang Lancar'),
@@ -46,13 +59,15 @@ class TahfidzForm(FlaskForm):
     tanggal_setor = DateField('Tanggal Setor', validators=[DataRequired()])
     submit = SubmitField('Simpan Hafalan')
 
+    def validate_ayat_selesai(self, ayat_selesai):
+        if self.ayat_mulai.data and ayat_selesai.data < self.ayat_mulai.data:
+            raise ValidationError('Ayat akhir tidak boleh lebih kecil dari ayat awal.')
+        if self.surah_nomor.data in range(1, len(SURAH) + 1) and ayat_selesai.data > jumlah_ayat(self.surah_nomor.data):
+            raise ValidationError(f'Surat ini hanya memiliki {jumlah_ayat(self.surah_nomor.data)} ayat.')
+
 class RaportForm(FlaskForm):
-    santri_id = SelectField('Santri', coerce=int, validators=[DataRequired()])
-    semester = SelectField('Semester', choices=[
-        ('Ganjil 2024/2025', 'Ganjil 2024/2025'),
-        ('Genap 2024/2025', 'Genap 2024/2025'),
-        ('Ganjil 2025/2026', 'Ganjil 2025/2026')
-    ], validators=[DataRequired()])
+    santri_id = SantriField('Santri', validators=[DataRequired()])
+    semester = SelectField('Semester', choices=[], validators=[DataRequired()])
     catatan_wali_kelas = TextAreaField('Catatan Wali Kelas', validators=[DataRequired()])
     status_kenaikan = SelectField('Status Kenaikan', choices=[
         ('Naik Kelas', 'Naik Kelas'),
@@ -0,0 +1,67 @@
+from flask import url_for
+from markupsafe import Markup
+from wtforms import Field
+from wtforms.validators import ValidationError
+from app import db
+from app.models.akademik import Santri
+
+
+def santri_label(santri):
+    return f"{santri.nama} ({santri.kelas.nama_kelas if santri.kelas else '-'})"
+
+
+class SantriAutocompleteWidget:
+    """
+    Hidden input holding the santri id plus a text box that searches
+    `master.santri_search` as the user types (see static/js/santri_autocomplete.js).
+    """
+    def __call__(self, field, **kwargs):
+        kwargs.setdefault('id', field.id)
+        css_class = kwargs.pop('class', kwargs.pop('class_', 'form-control'))
+        santri = field.santri
+        return Markup(
+            '<input type="hidden" name="{name}" id="{id}-id" value="{value}">'
+            '<input type="text" class="{css} santri-autocomplete" id="{id}" data-target="{id}-id" '
+            'data-url="{url}" list="{id}-options" value="{label}" placeholder="Ketik nama atau NIS santri..." '
+            'autocomplete="off"{required}>'
+            '<datalist id="{id}-options"></datalist>'
+        ).format(
+            name=field.name, id=kwargs['id'], value=santri.id if santri else '',
+            css=css_class, url=url_for('master.santri_search'),
+            label=santri_label(santri) if santri else '',
+            required=Markup(' required') if field.flags.required else '',
+        )
+
+
+class SantriField(Field):
+    """
+    Santri picker validated with a single primary-key lookup, instead of a
+    SelectField whose choices list the whole santri table.
+    """
+    widget = SantriAutocompleteWidget()
+
+    def process_formdata(self, valuelist):
+        self._santri = None
+        if valuelist and valuelist[0] not in ('', '0', None):
+            try:
+                self.data = int(valuelist[0])
+            except ValueError:
+                self.data = None
+                raise ValueError('Santri tidak valid.')
+        else:
+            self.data = None
+
+    def pre_validate(self, form):
+        if self.data is not None and self.santri is None:
+            raise ValidationError('Santri tidak ditemukan.')
+
+    @property
+    def santri(self):
+        if not self.data:
+            return None
+        if getattr(self, '_santri', None) is None or self._santri.id != self.data:
+            self._santri = db.session.get(Santri, self.data)
+        return self._santri
+
+    def _value(self):
+        return str(self.data) if self.data is not None else ''
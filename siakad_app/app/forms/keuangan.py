@@ -1,7 +1,9 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, SelectField, DecimalField, DateField, SubmitField, TextAreaField, FileField
+from wtforms import StringField, SelectField, DecimalField, DateField, IntegerField, SubmitField, TextAreaField, FileField
 from wtforms.validators import DataRequired, NumberRange, Optional
-from flask_wtf.file import FileAllowed
+from flask_wtf.file import FileAllowed, FileRequired
+from app.forms.fields import SantriField
+from app.models.keuangan import NAMA_BULAN
 
 class PosKeuanganForm(FlaskForm):
     nama = StringField('Nama Kategori', validators=[DataRequired()])
@@ -12,7 +14,7 @@ class PosKeuanganForm(FlaskForm):
 
 class TransaksiKeuanganForm(FlaskForm):
     pos_id = SelectField('Kategori', coerce=int, validators=[DataRequired()])
-    santri_id = SelectField('Santri (Optional)', coerce=int, validators=[Optional()])
+    santri_id = SantriField('Santri (Optional)', validators=[Optional()])
     jumlah = DecimalField('Jumlah (Rp)', validators=[DataRequired(), NumberRange(min=0)])
     jenis = SelectField('Jenis', choices=[('masuk', 'Masuk'), ('keluar', 'Keluar')], validators=[DataRequired()])
     tanggal = DateField('Tanggal', validators=[DataRequired()])
@@ -22,13 +24,19 @@ class TransaksiKeuanganForm(FlaskForm):
     submit = SubmitField('Simpan')
 
 class TabunganForm(FlaskForm):
-    santri_id = SelectField('Santri', coerce=int, validators=[DataRequired()])
+    santri_id = SantriField('Santri', validators=[DataRequired()])
     jenis = SelectField('Jenis Transaksi', choices=[('setor', 'Setor Tunai'), ('tarik', 'Tarik Tunai')], validators=[DataRequired()])
     jumlah = DecimalField('Jumlah (Rp)', validators=[DataRequired(), NumberRange(min=0)])
     tanggal = DateField('Tanggal', validators=[DataRequired()])
     keterangan = TextAreaField('Keterangan')
     submit = SubmitField('Simpan')
 
+class TabunganBatchForm(FlaskForm):
+    tanggal = DateField('Tanggal', validators=[DataRequired()])
+    entri = TextAreaField('Daftar Transaksi', validators=[DataRequired()],
+                          description='Satu transaksi per baris: NIS;setor/tarik;jumlah;keterangan')
+    submit = SubmitField('Posting Semua')
+
 class KonfigurasiLaporanForm(FlaskForm):
     nama_lembaga = StringField('Nama Lembaga', validators=[DataRequired()])
     alamat_lembaga = TextAreaField('Alamat Lembaga', validators=[DataRequired()])
@@ -49,15 +57,30 @@ class LaporanKeuanganForm(FlaskForm):
     cetak_pdf = SubmitField('Cetak PDF')
 
 class PembayaranForm(FlaskForm):
-    santri_id = SelectField('Santri', coerce=int, validators=[DataRequired()])
-    bulan = SelectField('Bulan', choices=[
-        ('Januari', 'Januari'), ('Februari', 'Februari'), ('Maret', 'Maret'),
-        ('April', 'April'), ('Mei', 'Mei'), ('Juni', 'Juni'),
-        ('Juli', 'Juli'), ('Agustus', 'Agustus'), ('September', 'September'),
-        ('Oktober', 'Oktober'), ('November', 'November'), ('Desember', 'Desember')
-    ], validators=[DataRequired()])
+    santri_id = SantriField('Santri', validators=[DataRequired()])
+    bulan = SelectField('Bulan', choices=[(b, b) for b in NAMA_BULAN], validators=[DataRequired()])
     tahun = SelectField('Tahun', coerce=int, validators=[DataRequired()])
     jumlah = DecimalField('Jumlah (Rp)', validators=[DataRequired(), NumberRange(min=0)])
     status = SelectField('Status', choices=[('Lunas', 'Lunas'), ('Belum Lunas', 'Belum Lunas')], validators=[DataRequired()])
     tanggal_bayar = DateField('Tanggal Bayar', validators=[DataRequired()])
     submit = SubmitField('Simpan')
+
+class TagihanSppForm(FlaskForm):
+    bulan = SelectField('Bulan', choices=[(b, b) for b in NAMA_BULAN], validators=[DataRequired()])
+    tahun = SelectField('Tahun', coerce=int, validators=[DataRequired()])
+    jumlah = DecimalField('Jumlah SPP (Rp)', validators=[DataRequired(), NumberRange(min=0)])
+    jenjang = SelectField('Jenjang', choices=[('', '-- Semua Jenjang --'), ('SD', 'SD'), ('SMP', 'SMP'), ('SMA', 'SMA')],
+                          validators=[Optional()])
+    kelas_id = SelectField('Kelas', coerce=int, validators=[Optional()])
+    submit = SubmitField('Buat Tagihan')
+
+class MutasiBankForm(FlaskForm):
+    berkas = FileField('File Mutasi (CSV)', validators=[FileRequired(), FileAllowed(['csv', 'txt'], 'CSV only!')],
+                       description='Kolom yang dikenali: Tanggal, Keterangan, Jumlah atau Debet/Kredit')
+    submit = SubmitField('Impor Mutasi')
+
+class RekonsiliasiForm(FlaskForm):
+    start_date = DateField('Dari Tanggal', validators=[DataRequired()])
+    end_date = DateField('Sampai Tanggal', validators=[DataRequired()])
+    toleransi = IntegerField('Toleransi (hari)', default=3, validators=[Optional(), NumberRange(min=0, max=7)])
+    submit = SubmitField('Cocokkan')
@@ -1,7 +1,8 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, SelectField, DateField, TextAreaField, SubmitField
+from wtforms import StringField, SelectField, DateField, TextAreaField, SubmitField, FileField
 from wtforms.validators import DataRequired, Length, ValidationError
-from app.models.akademik import Santri
+from flask_wtf.file import FileAllowed, FileRequired
+from app.models.akademik import Santri, Semester
 
 class SantriForm(FlaskForm):
     nis = StringField('NIS', validators=[DataRequired(), Length(max=20)])
@@ -25,6 +26,16 @@ class SantriForm(FlaskForm):
         if user:
             raise ValidationError('NIS sudah terdaftar.')
 
+class ImporSantriForm(FlaskForm):
+    berkas = FileField('File Data Santri (CSV/XLSX)', validators=[FileRequired(), FileAllowed(['csv', 'xlsx'], 'CSV atau XLSX saja!')],
+                       description='Kolom: NIS, Nama, Jenis Kelamin (L/P), Tanggal Lahir, Alamat, Jenjang, Kelas, Status')
+    submit = SubmitField('Impor')
+
+class KenaikanKelasForm(FlaskForm):
+    semester = SelectField('Semester Raport', choices=[], validators=[DataRequired()])
+    pratinjau = SubmitField('Pratinjau')
+    terapkan = SubmitField('Terapkan Kenaikan')
+
 class PengajarForm(FlaskForm):
     nama = StringField('Nama Lengkap', validators=[DataRequired(), Length(max=100)])
     no_hp = StringField('No. HP', validators=[Length(max=20)])
@@ -41,3 +52,23 @@ class MapelForm(FlaskForm):
     nama_mapel = StringField('Nama Mata Pelajaran', validators=[DataRequired(), Length(max=100)])
     jenjang = SelectField('Jenjang', choices=[('SD', 'SD'), ('SMP', 'SMP'), ('SMA', 'SMA')], validators=[DataRequired()])
     submit = SubmitField('Simpan')
+
+class SemesterForm(FlaskForm):
+    nama = StringField('Nama Semester', validators=[DataRequired(), Length(max=50)])
+    tanggal_mulai = DateField('Tanggal Mulai', validators=[DataRequired()])
+    tanggal_selesai = DateField('Tanggal Selesai', validators=[DataRequired()])
+    submit = SubmitField('Simpan')
+
+    def __init__(self, original_nama=None, *args, **kwargs):
+        super(SemesterForm, self).__init__(*args, **kwargs)
+        self.original_nama = original_nama
+
+    def validate_nama(self, nama):
+        if self.original_nama and nama.data == self.original_nama:
+            return
+        if Semester.query.filter_by(nama=nama.data).first():
+            raise ValidationError('Semester sudah terdaftar.')
+
+    def validate_tanggal_selesai(self, tanggal_selesai):
+        if self.tanggal_mulai.data and tanggal_selesai.data < self.tanggal_mulai.data:
+            raise ValidationError('Tanggal selesai harus setelah tanggal mulai.')
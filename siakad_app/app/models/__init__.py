@@ -1,3 +1,5 @@
 from app.models.user import User
-from app.models.akademik import Santri, Pengajar, Kelas, MataPelajaran, Nilai, Tahfidz, Absensi
-from app.models.keuangan import Keuangan, PosKeuangan, TransaksiKeuangan, TabunganSantri, KonfigurasiLaporan
+from app.models.akademik import Santri, Pengajar, Kelas, MataPelajaran, Nilai, Tahfidz, Absensi, AbsensiRekap, Semester
+from app.models.keuangan import Keuangan, PosKeuangan, TransaksiKeuangan, SaldoHarian, TabunganSantri, SaldoTabungan, MutasiBank, KonfigurasiLaporan
+from app.models.job import PdfJob
+from app.models.berkas import Berkas
@@ -1,5 +1,6 @@
 from app import db
-from datetime import datetime
+from sqlalchemy.orm import validates
+from datetime import datetime, date
 
 class Santri(db.Model):
     __tablename__ = 'santri'
@@ -7,6 +8,7 @@ class Santri(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     nis = db.Column(db.String(20), unique=True, nullable=False)
     nama = db.Column(db.String(100), nullable=False)
+    nama_cari = db.Column(db.String(100)) # normalize_nama(nama), prefix search key
     jenis_kelamin = db.Column(db.String(10), nullable=False) # L/P
     tanggal_lahir = db.Column(db.Date, nullable=False)
     alamat = db.Column(db.Text)
@@ -22,6 +24,22 @@ class Santri(db.Model):
     absensi = db.relationship('Absensi', backref='santri', lazy='dynamic')
     raport = db.relationship('Raport', backref='santri', lazy='dynamic')
 
+    __table_args__ = (
+        # Prefix search (LIKE 'abc%') of the santri autocomplete; text_pattern_ops lets
+        # PostgreSQL use the index for LIKE under any collation
+        db.Index('ix_santri_nama_cari', 'nama_cari', postgresql_ops={'nama_cari': 'text_pattern_ops'}),
+        db.Index('ix_santri_nis_pattern', 'nis', postgresql_ops={'nis': 'text_pattern_ops'}),
+    )
+
+    @staticmethod
+    def normalize_nama(nama):
+        return ' '.join((nama or '').lower().split())
+
+    @validates('nama')
+    def _set_nama_cari(self, key, nama):
+        self.nama_cari = Santri.normalize_nama(nama)
+        return nama
+
 class Pengajar(db.Model):
     __tablename__ = 'pengajar'
     
@@ -51,13 +69,38 @@ class MataPelajaran(db.Model):
     jenjang = db.Column(db.String(20))
     kkm = db.Column(db.Float, default=70.0)
 
+class Semester(db.Model):
+    __tablename__ = 'semester'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    nama = db.Column(db.String(50), unique=True, nullable=False) # e.g. "Ganjil 2024/2025"
+    tanggal_mulai = db.Column(db.Date, nullable=False)
+    tanggal_selesai = db.Column(db.Date, nullable=False)
+
+    @staticmethod
+    def choices():
+        from app.services.referensi import ReferensiCache
+        return [(s['nama'], s['nama']) for s in ReferensiCache.rows(Semester)]
+
+    @staticmethod
+    def current():
+        """Semester containing today, or the latest one if none does."""
+        from app.services.referensi import ReferensiCache
+        today = date.today()
+        semesters = ReferensiCache.all(Semester)
+        return next((s for s in semesters if s.tanggal_mulai <= today <= s.tanggal_selesai), None) \
+            or (semesters[-1] if semesters else None)
+
+    def __repr__(self):
+        return f'<Semester {self.nama}>'
+
 class Nilai(db.Model):
     __tablename__ = 'nilai'
     
     id = db.Column(db.Integer, primary_key=True)
     santri_id = db.Column(db.Integer, db.ForeignKey('santri.id'), index=True)
     mapel_id = db.Column(db.Integer, db.ForeignKey('mata_pelajaran.id'), index=True)
-    semester = db.Column(db.String(20)) # Ganjil/Genap 2023/2024
+    semester = db.Column(db.String(50), db.ForeignKey('semester.nama')) # Ganjil/Genap 2023/2024
     
     nilai_harian = db.Column(db.Float, default=0)
     nilai_uts = db.Column(db.Float, default=0)
@@ -66,17 +109,46 @@ class Nilai(db.Model):
     
     mapel = db.relationship('MataPelajaran')
 
+    __table_args__ = (
+        # One grade row per santri, mapel and semester (upsert key of the grade grid)
+        db.UniqueConstraint('santri_id', 'mapel_id', 'semester', name='uq_nilai_santri_id_mapel_id_semester'),
+        # Keyset pagination order of the Nilai list (semester, santri_id, id)
+        db.Index('ix_nilai_semester_santri_id_id', 'semester', 'santri_id', 'id'),
+        # Mapel + semester filter of the Nilai list
+        db.Index('ix_nilai_mapel_id_semester', 'mapel_id', 'semester'),
+    )
+
+class Surah(db.Model):
+    __tablename__ = 'surah'
+
+    nomor = db.Column(db.Integer, primary_key=True, autoincrement=False) # 1-114
+    nama = db.Column(db.String(50), nullable=False)
+    jumlah_ayat = db.Column(db.Integer, nullable=False)
+
+    def __repr__(self):
+        return f'<Surah {self.nomor} {self.nama}>'
+
 class Tahfidz(db.Model):
     __tablename__ = 'tahfidz'
     
     id = db.Column(db.Integer, primary_key=True)
     santri_id = db.Column(db.Integer, db.ForeignKey('santri.id'))
-    nama_surat = db.Column(db.String(50))
-    ayat = db.Column(db.String(50))
+    surah_nomor = db.Column(db.Integer, db.ForeignKey('surah.nomor'))
+    ayat_mulai = db.Column(db.Integer)
+    ayat_selesai = db.Column(db.Integer)
+    nama_surat = db.Column(db.String(50)) # Display text, derived from surah_nomor
+    ayat = db.Column(db.String(50)) # Display text, e.g. "1-10"
     kelancaran = db.Column(db.String(20)) # Lancar, Kurang, Ulang
     tajwid = db.Column(db.String(20)) # Bagus, Cukup, Kurang
     tanggal_setor = db.Column(db.Date, default=datetime.utcnow)
 
+    surah = db.relationship('Surah')
+
+    __table_args__ = (
+        # Per-santri deposit history (progress, raport), newest first
+        db.Index('ix_tahfidz_santri_id_tanggal_setor', 'santri_id', 'tanggal_setor'),
+    )
+
 class Absensi(db.Model):
     __tablename__ = 'absensi'
     
@@ -85,12 +157,38 @@ class Absensi(db.Model):
     tanggal = db.Column(db.Date, default=datetime.utcnow, index=True)
     status = db.Column(db.String(10)) # Hadir, Izin, Sakit, Alpha
 
+    __table_args__ = (
+        # One attendance row per santri per day (upsert key of the class roll-call).
+        # Also the composite index behind per-santri date range scans (raport, rekap).
+        db.UniqueConstraint('santri_id', 'tanggal', name='uq_absensi_santri_id_tanggal'),
+    )
+
+class AbsensiRekap(db.Model):
+    """
+    Monthly attendance counters per santri, maintained by AbsensiRekapService
+    in the same transaction as every Absensi write.
+    """
+    __tablename__ = 'absensi_rekap'
+
+    id = db.Column(db.Integer, primary_key=True)
+    santri_id = db.Column(db.Integer, db.ForeignKey('santri.id'), nullable=False)
+    tahun = db.Column(db.Integer, nullable=False)
+    bulan = db.Column(db.Integer, nullable=False)
+    hadir = db.Column(db.Integer, nullable=False, default=0)
+    sakit = db.Column(db.Integer, nullable=False, default=0)
+    izin = db.Column(db.Integer, nullable=False, default=0)
+    alpha = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('santri_id', 'tahun', 'bulan', name='uq_absensi_rekap_santri_id_tahun_bulan'),
+    )
+
 class Raport(db.Model):
     __tablename__ = 'raport'
     
     id = db.Column(db.Integer, primary_key=True)
     santri_id = db.Column(db.Integer, db.ForeignKey('santri.id'))
-    semester = db.Column(db.String(50)) # e.g. "Ganjil 2023/2024"
+    semester = db.Column(db.String(50), db.ForeignKey('semester.nama')) # e.g. "Ganjil 2023/2024"
     catatan_wali_kelas = db.Column(db.Text)
     status_kenaikan = db.Column(db.String(50)) # "Naik ke Kelas ...", "Lulus", "Tinggal Kelas"
     tanggal_bagi = db.Column(db.Date, default=datetime.utcnow)
@@ -0,0 +1,20 @@
+from app import db
+from datetime import datetime
+
+class Berkas(db.Model):
+    """
+    An uploaded file, stored once per content under BERKAS_DIR (see BerkasService).
+    Rows referencing an upload (e.g. TransaksiKeuangan.bukti_pembayaran) hold its sha256.
+    """
+    __tablename__ = 'berkas'
+
+    sha256 = db.Column(db.String(64), primary_key=True) # Hex digest of the content
+    ekstensi = db.Column(db.String(10), nullable=False) # jpg, png, pdf
+    ukuran = db.Column(db.Integer, nullable=False) # Bytes
+    thumbnail = db.Column(db.String(10), nullable=False, default='pending', index=True) # pending, running, done, failed, none
+    claimed_at = db.Column(db.DateTime) # When a worker set thumbnail to 'running'
+    attempts = db.Column(db.Integer, nullable=False, default=0, server_default='0') # Thumbnail renders started
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Berkas {self.sha256[:12]}.{self.ekstensi}>'
@@ -0,0 +1,22 @@
+from app import db
+from datetime import datetime
+import uuid
+
+class PdfJob(db.Model):
+    __tablename__ = 'pdf_jobs'
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True) # Who requested it
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True) # queued, running, done, failed
+    html = db.Column(db.Text, nullable=False) # Rendered template, cleared once the PDF exists
+    filename = db.Column(db.String(255), nullable=False) # Download name
+    output_path = db.Column(db.String(255)) # Rendered PDF on disk
+    error = db.Column(db.Text)
+    attempts = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime) # Refreshed by the rendering worker while it is alive
+    finished_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<PdfJob {self.id} {self.status}>'
@@ -1,6 +1,11 @@
 from app import db
+from sqlalchemy.orm import validates
 from datetime import datetime
 
+# Keuangan.bulan values, in calendar order
+NAMA_BULAN = ('Januari', 'Februari', 'Maret', 'April', 'Mei', 'Juni',
+              'Juli', 'Agustus', 'September', 'Oktober', 'November', 'Desember')
+
 class Keuangan(db.Model):
     __tablename__ = 'keuangan'
     
@@ -11,9 +16,37 @@ class Keuangan(db.Model):
     jumlah = db.Column(db.Numeric(10, 2))
     status = db.Column(db.String(20)) # Lunas, Belum Lunas
     tanggal_bayar = db.Column(db.Date, nullable=True)
+    periode = db.Column(db.Integer) # tahun * 100 + month number (202407), set from bulan/tahun
 
     santri = db.relationship('Santri', backref='pembayaran')
 
+    __table_args__ = (
+        # One bill per santri and month
+        db.UniqueConstraint('santri_id', 'tahun', 'bulan', name='uq_keuangan_santri_id_tahun_bulan'),
+        # Arrears anti-join (santri, periode) and period filters
+        db.Index('ix_keuangan_santri_id_periode', 'santri_id', 'periode', 'status'),
+        db.Index('ix_keuangan_periode', 'periode'),
+    )
+
+    @staticmethod
+    def hitung_periode(tahun, bulan):
+        """Numeric period of a month name and year (Juli 2024 -> 202407); None if incomplete."""
+        if not tahun or bulan not in NAMA_BULAN:
+            return None
+        return int(tahun) * 100 + NAMA_BULAN.index(bulan) + 1
+
+    @staticmethod
+    def nama_periode(periode):
+        """Inverse of hitung_periode: 202407 -> 'Juli 2024'."""
+        return f'{NAMA_BULAN[periode % 100 - 1]} {periode // 100}'
+
+    @validates('bulan', 'tahun')
+    def _set_periode(self, key, value):
+        tahun = value if key == 'tahun' else self.tahun
+        bulan = value if key == 'bulan' else self.bulan
+        self.periode = Keuangan.hitung_periode(tahun, bulan)
+        return value
+
     def __repr__(self):
         return f'<Keuangan {self.santri.nama} - {self.bulan} {self.tahun}>'
 
@@ -48,10 +81,32 @@ class TransaksiKeuangan(db.Model):
     
     santri = db.relationship('Santri', backref='transaksi_keuangan')
     user = db.relationship('User', backref='transaksi_keuangan')
+    # Uploads before content-addressed storage kept a plain file name, which matches no Berkas
+    berkas = db.relationship('Berkas', primaryjoin='foreign(TransaksiKeuangan.bukti_pembayaran) == Berkas.sha256',
+                             viewonly=True)
 
     def __repr__(self):
         return f'<TransaksiKeuangan {self.jenis} - {self.jumlah}>'
 
+class SaldoHarian(db.Model):
+    """
+    Daily totals per pos keuangan, maintained by SaldoHarianService on every
+    TransaksiKeuangan write. Balances as of any date are read from here
+    instead of summing the whole transaction history.
+    """
+    __tablename__ = 'saldo_harian'
+
+    id = db.Column(db.Integer, primary_key=True)
+    pos_id = db.Column(db.Integer, db.ForeignKey('pos_keuangan.id'), nullable=False)
+    tanggal = db.Column(db.Date, nullable=False)
+    masuk = db.Column(db.Numeric(15, 2), nullable=False, default=0)
+    keluar = db.Column(db.Numeric(15, 2), nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('pos_id', 'tanggal', name='uq_saldo_harian_pos_id_tanggal'),
+        db.Index('ix_saldo_harian_tanggal', 'tanggal'),
+    )
+
 class TabunganSantri(db.Model):
     __tablename__ = 'tabungan_santri'
     
@@ -70,6 +125,52 @@ class TabunganSantri(db.Model):
     def __repr__(self):
         return f'<TabunganSantri {self.santri.nama} - {self.jenis} {self.jumlah}>'
 
+class SaldoTabungan(db.Model):
+    """
+    Current savings balance per santri. Only changed by TabunganService with a
+    conditional UPDATE, in the same transaction as the TabunganSantri ledger row.
+    """
+    __tablename__ = 'saldo_tabungan'
+
+    santri_id = db.Column(db.Integer, db.ForeignKey('santri.id'), primary_key=True, autoincrement=False)
+    saldo = db.Column(db.Numeric(15, 2), nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    santri = db.relationship('Santri', backref=db.backref('saldo_tabungan', uselist=False))
+
+    def __repr__(self):
+        return f'<SaldoTabungan {self.santri_id} - {self.saldo}>'
+
+class MutasiBank(db.Model):
+    """
+    One line of an imported bank statement, reconciled against TransaksiKeuangan
+    or Keuangan by RekonsiliasiService.
+    """
+    __tablename__ = 'mutasi_bank'
+
+    id = db.Column(db.Integer, primary_key=True)
+    sidik = db.Column(db.String(64), nullable=False, unique=True) # Hash of the line, makes re-imports idempotent
+    tanggal = db.Column(db.Date, nullable=False)
+    jenis = db.Column(db.String(10), nullable=False) # 'masuk' (kredit), 'keluar' (debet)
+    jumlah = db.Column(db.Numeric(15, 2), nullable=False)
+    keterangan = db.Column(db.String(255))
+    status = db.Column(db.String(10), nullable=False, default='belum') # belum, cocok, tinjau, abaikan
+    transaksi_id = db.Column(db.Integer, db.ForeignKey('transaksi_keuangan.id'), unique=True)
+    keuangan_id = db.Column(db.Integer, db.ForeignKey('keuangan.id'), unique=True)
+    kandidat = db.Column(db.Text) # JSON list of possible matches while status is 'tinjau'
+    otomatis = db.Column(db.Boolean, default=False) # Matched by the engine rather than by a reviewer
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    transaksi = db.relationship('TransaksiKeuangan', backref=db.backref('mutasi_bank', uselist=False))
+    keuangan = db.relationship('Keuangan', backref=db.backref('mutasi_bank', uselist=False))
+
+    __table_args__ = (
+        db.Index('ix_mutasi_bank_status_tanggal', 'status', 'tanggal'),
+    )
+
+    def __repr__(self):
+        return f'<MutasiBank {self.tanggal} {self.jenis} {self.jumlah}>'
+
 class KonfigurasiLaporan(db.Model):
     __tablename__ = 'konfigurasi_laporan'
     
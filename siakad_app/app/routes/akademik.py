@@ -1,30 +1,85 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, make_response
+from flask import Blueprint, render_template, redirect, url_for, flash, request, make_response, jsonify, send_file, abort
 from flask_login import login_required, current_user
+from datetime import date, datetime
+import os
+import hashlib
 from sqlalchemy.orm import joinedload
 from app import db
-from app.models.akademik import Santri, MataPelajaran, Nilai, Absensi, Tahfidz, Raport
-from app.forms.akademik import NilaiForm, AbsensiForm, TahfidzForm, RaportForm
+from app.models.akademik import Santri, Kelas, MataPelajaran, Nilai, Absensi, Tahfidz, Raport, Semester
+from app.models.job import PdfJob
+from app.forms.akademik import NilaiForm, NilaiKelasForm, AbsensiForm, AbsensiKelasForm, TahfidzForm, RaportForm, ABSENSI_STATUS_CHOICES
 from app.decorators import role_required
 from app.services.raport import RaportService
-from app.services.audit_service import log_audit
-try:
-    from weasyprint import HTML
-except OSError:
-    HTML = None
+from app.services.pdf_service import PdfService, PdfQueueFull
+from app.services.raport_cache import RaportCache
+from app.services.audit_service import log_audit, record_audit
+from app.services.bulk import bulk_upsert
+from app.services.absensi_rekap import AbsensiRekapService
+from app.services.tahfidz import TahfidzProgressService
+from app.services.statistik import StatistikKelasService
+from app.services.quran import SURAH
+from app.services.pagination import keyset_paginate
+from app.services.referensi import ReferensiCache
+from app.services.scoping import scope_santri
+from app.services.dashboard import DashboardService
 
 bp = Blueprint('akademik', __name__, url_prefix='/akademik')
 
+NILAI_PER_PAGE = 50
+NILAI_KOMPONEN = ('nilai_harian', 'nilai_uts', 'nilai_uas', 'nilai_praktik')
+
+def _versi_absensi(existing):
+    """
+    Fingerprint of the attendance a roll-call page was built from ('' when the day
+    was still empty). The POST is accepted only if the rows still match it.
+    """
+    if not existing:
+        return ''
+    return hashlib.sha256(repr(sorted(existing.items())).encode('utf-8')).hexdigest()[:16]
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+    except ValueError:
+        return None
+
 # --- NILAI ---
 @bp.route('/nilai')
 @login_required
 def nilai_list():
-    if current_user.role == 'wali_santri':
-        santris = Santri.query.filter_by(wali_user_id=current_user.id).all()
-        santri_ids = [s.id for s in santris]
-        nilais = Nilai.query.filter(Nilai.santri_id.in_(santri_ids)).options(joinedload(Nilai.santri).joinedload(Santri.kelas), joinedload(Nilai.mapel)).all()
-    else:
-        nilais = Nilai.query.options(joinedload(Nilai.santri).joinedload(Santri.kelas), joinedload(Nilai.mapel)).all()
-    return render_template('akademik/nilai_list.html', title='Data Nilai', nilais=nilais)
+    kelas_id = request.args.get('kelas_id', type=int)
+    mapel_id = request.args.get('mapel_id', type=int)
+    semester = request.args.get('semester') or None
+
+    query = scope_santri(Nilai.query, Nilai.santri_id)
+
+    # Server-side filters, each served by a composite index on nilai / santri
+    if semester:
+        query = query.filter(Nilai.semester == semester)
+    if mapel_id:
+        query = query.filter(Nilai.mapel_id == mapel_id)
+    if kelas_id:
+        kelas_santri = db.session.query(Santri.id).filter(Santri.kelas_id == kelas_id)
+        query = query.filter(Nilai.santri_id.in_(kelas_santri))
+
+    # Only the current page is joined and rendered
+    query = query.options(joinedload(Nilai.santri).joinedload(Santri.kelas), joinedload(Nilai.mapel))
+    page = keyset_paginate(
+        query,
+        [Nilai.semester, Nilai.santri_id, Nilai.id],
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        per_page=NILAI_PER_PAGE
+    )
+
+    filters = {'kelas_id': kelas_id, 'mapel_id': mapel_id, 'semester': semester}
+    return render_template('akademik/nilai_list.html', title='Data Nilai',
+                           nilais=page.items,
+                           page=page,
+                           filters=filters,
+                           kelas_list=ReferensiCache.all(Kelas),
+                           mapel_list=ReferensiCache.all(MataPelajaran),
+                           semester_choices=Semester.choices())
 
 @bp.route('/nilai/add', methods=['GET', 'POST'])
 @login_required
@@ -33,13 +88,15 @@ def nilai_list():
 def nilai_add():
     form = NilaiForm()
     
-    # Populate choices with eager loading
-    santris = Santri.query.options(joinedload(Santri.kelas)).all()
-    form.santri_id.choices = [(s.id, f"{s.nama} ({s.kelas.nama_kelas if s.kelas else '-'})") for s in santris]
-    mapels = MataPelajaran.query.all()
+    mapels = ReferensiCache.all(MataPelajaran)
     form.mapel_id.choices = [(m.id, f"{m.nama_mapel} ({m.jenjang})") for m in mapels]
+    form.semester.choices = Semester.choices()
     
     if form.validate_on_submit():
+        if Nilai.query.filter_by(santri_id=form.santri_id.data, mapel_id=form.mapel_id.data, semester=form.semester.data).first():
+            flash('Nilai santri untuk mapel dan semester ini sudah ada. Silakan edit data yang ada.', 'warning')
+            return render_template('akademik/nilai_form.html', title='Input Nilai', form=form)
+
         nilai = Nilai(
             santri_id=form.santri_id.data,
             mapel_id=form.mapel_id.data,
@@ -56,6 +113,91 @@ def nilai_add():
         
     return render_template('akademik/nilai_form.html', title='Input Nilai', form=form)
 
+@bp.route('/nilai/kelas', methods=['GET', 'POST'])
+@login_required
+@role_required('admin', 'ustadz')
+def nilai_kelas():
+    """
+    Grade grid for one kelas x mapel x semester. Only changed cells are posted;
+    they are saved with one bulk upsert in one transaction.
+    """
+    form = NilaiKelasForm()
+    form.kelas_id.choices = [(k.id, k.nama_kelas) for k in ReferensiCache.all(Kelas)]
+    form.mapel_id.choices = [(m.id, f"{m.nama_mapel} ({m.jenjang})") for m in ReferensiCache.all(MataPelajaran)]
+    form.semester.choices = Semester.choices()
+
+    if request.method == 'GET':
+        form.kelas_id.data = request.args.get('kelas_id', type=int)
+        form.mapel_id.data = request.args.get('mapel_id', type=int)
+        current_semester = Semester.current()
+        form.semester.data = request.args.get('semester') or (current_semester.nama if current_semester else None)
+
+    roster = []
+    existing = {}
+    if form.kelas_id.data and form.mapel_id.data and form.semester.data:
+        kelas = Kelas.query.get_or_404(form.kelas_id.data)
+        roster = kelas.santri_list.filter(Santri.status == 'aktif').order_by(Santri.nama).all()
+        existing = {
+            n.santri_id: n for n in Nilai.query.filter(
+                Nilai.mapel_id == form.mapel_id.data,
+                Nilai.semester == form.semester.data,
+                Nilai.santri_id.in_([s.id for s in roster])
+            ).all()
+        }
+
+    if form.validate_on_submit():
+        changes = {}
+        errors = []
+        roster_ids = {s.id for s in roster}
+        for key, value in request.form.items():
+            # Cell inputs are named nilai-<santri_id>-<field>
+            parts = key.split('-')
+            if len(parts) != 3 or parts[0] != 'nilai' or parts[2] not in NILAI_KOMPONEN:
+                continue
+            try:
+                santri_id = int(parts[1])
+                score = float(value) if value.strip() else 0.0
+            except ValueError:
+                errors.append(key)
+                continue
+            if santri_id not in roster_ids or not 0 <= score <= 100:
+                errors.append(key)
+                continue
+            changes.setdefault(santri_id, {})[parts[2]] = score
+
+        if errors:
+            flash(f'{len(errors)} isian nilai tidak valid (harus angka 0-100). Tidak ada nilai yang disimpan.', 'danger')
+            return render_template('akademik/nilai_kelas.html', title='Input Nilai Kelas', form=form,
+                                   roster=roster, existing=existing, komponen=NILAI_KOMPONEN)
+
+        rows = []
+        for santri_id, cells in changes.items():
+            current = existing.get(santri_id)
+            row = {'santri_id': santri_id, 'mapel_id': form.mapel_id.data, 'semester': form.semester.data}
+            for field in NILAI_KOMPONEN:
+                row[field] = cells.get(field, getattr(current, field, None) or 0)
+            rows.append(row)
+
+        bulk_upsert(Nilai, rows, index_elements=['santri_id', 'mapel_id', 'semester'],
+                    update_columns=list(NILAI_KOMPONEN))
+        RaportCache.mark_dirty(changes.keys())
+        db.session.commit()
+
+        if rows:
+            record_audit('UPDATE', 'Nilai', {
+                'kelas_id': kelas.id,
+                'mapel_id': form.mapel_id.data,
+                'semester': form.semester.data,
+                'changes': {str(k): v for k, v in changes.items()}
+            })
+
+        flash(f'Nilai {len(rows)} santri berhasil disimpan', 'success')
+        return redirect(url_for('akademik.nilai_kelas', kelas_id=kelas.id,
+                                mapel_id=form.mapel_id.data, semester=form.semester.data))
+
+    return render_template('akademik/nilai_kelas.html', title='Input Nilai Kelas', form=form,
+                           roster=roster, existing=existing, komponen=NILAI_KOMPONEN)
+
 @bp.route('/nilai/edit/<int:id>', methods=['GET', 'POST'])
 @login_required
 @role_required('admin', 'ustadz')
@@ -64,12 +206,21 @@ def nilai_edit(id):
     nilai = Nilai.query.get_or_404(id)
     form = NilaiForm(obj=nilai)
     
-    santris = Santri.query.options(joinedload(Santri.kelas)).all()
-    form.santri_id.choices = [(s.id, f"{s.nama} ({s.kelas.nama_kelas if s.kelas else '-'})") for s in santris]
-    mapels = MataPelajaran.query.all()
+    mapels = ReferensiCache.all(MataPelajaran)
     form.mapel_id.choices = [(m.id, f"{m.nama_mapel} ({m.jenjang})") for m in mapels]
+    form.semester.choices = Semester.choices()
     
     if form.validate_on_submit():
+        duplicate = Nilai.query.filter(
+            Nilai.santri_id == form.santri_id.data,
+            Nilai.mapel_id == form.mapel_id.data,
+            Nilai.semester == form.semester.data,
+            Nilai.id != nilai.id
+        ).first()
+        if duplicate:
+            flash('Nilai santri untuk mapel dan semester ini sudah ada.', 'warning')
+            return render_template('akademik/nilai_form.html', title='Edit Nilai', form=form)
+
         form.populate_obj(nilai)
         db.session.commit()
         flash('Nilai berhasil diperbarui', 'success')
@@ -92,12 +243,8 @@ def nilai_delete(id):
 @bp.route('/absensi')
 @login_required
 def absensi_list():
-    if current_user.role == 'wali_santri':
-        santris = Santri.query.filter_by(wali_user_id=current_user.id).all()
-        santri_ids = [s.id for s in santris]
-        absensis = Absensi.query.filter(Absensi.santri_id.in_(santri_ids)).options(joinedload(Absensi.santri).joinedload(Santri.kelas)).order_by(Absensi.tanggal.desc()).all()
-    else:
-        absensis = Absensi.query.options(joinedload(Absensi.santri).joinedload(Santri.kelas)).order_by(Absensi.tanggal.desc()).all()
+    absensis = scope_santri(Absensi.query, Absensi.santri_id)\
+        .options(joinedload(Absensi.santri).joinedload(Santri.kelas)).order_by(Absensi.tanggal.desc()).all()
     return render_template('akademik/absensi_list.html', title='Data Absensi', absensis=absensis)
 
 @bp.route('/absensi/add', methods=['GET', 'POST'])
@@ -106,22 +253,96 @@ def absensi_list():
 @log_audit('CREATE', 'Absensi')
 def absensi_add():
     form = AbsensiForm()
-    santris = Santri.query.options(joinedload(Santri.kelas)).all()
-    form.santri_id.choices = [(s.id, f"{s.nama} ({s.kelas.nama_kelas if s.kelas else '-'})") for s in santris]
     
     if form.validate_on_submit():
+        if Absensi.query.filter_by(santri_id=form.santri_id.data, tanggal=form.tanggal.data).first():
+            flash('Absensi santri ini pada tanggal tersebut sudah ada. Silakan edit data yang ada.', 'warning')
+            return render_template('akademik/absensi_form.html', title='Input Absensi', form=form)
+
         absen = Absensi(
             santri_id=form.santri_id.data,
             tanggal=form.tanggal.data,
             status=form.status.data
         )
         db.session.add(absen)
+        AbsensiRekapService.record(new=(absen.santri_id, absen.tanggal, absen.status))
         db.session.commit()
         flash('Absensi berhasil disimpan', 'success')
         return redirect(url_for('akademik.absensi_list'))
         
     return render_template('akademik/absensi_form.html', title='Input Absensi', form=form)
 
+@bp.route('/absensi/kelas', methods=['GET', 'POST'])
+@login_required
+@role_required('admin', 'ustadz')
+def absensi_kelas():
+    """
+    Roll-call for a whole kelas on one date: one POST, one bulk upsert, one audit record.
+    """
+    form = AbsensiKelasForm()
+    form.kelas_id.choices = [(k.id, k.nama_kelas) for k in ReferensiCache.all(Kelas)]
+
+    if request.method == 'GET':
+        form.kelas_id.data = request.args.get('kelas_id', type=int)
+        form.tanggal.data = _parse_date(request.args.get('tanggal')) or date.today()
+
+    roster = []
+    existing = {}
+    if form.kelas_id.data and form.tanggal.data:
+        kelas = Kelas.query.get_or_404(form.kelas_id.data)
+        roster = kelas.santri_list.filter(Santri.status == 'aktif').order_by(Santri.nama).all()
+        existing = dict(
+            db.session.query(Absensi.santri_id, Absensi.status)
+            .filter(Absensi.tanggal == form.tanggal.data,
+                    Absensi.santri_id.in_([s.id for s in roster]))
+            .all()
+        )
+
+    if form.validate_on_submit():
+        # The page carries the fingerprint of the rows it showed; if they changed since
+        # (double submit, second ustadz), reject instead of overwriting.
+        if request.form.get('versi', '') != _versi_absensi(existing):
+            flash(f'Absensi kelas {kelas.nama_kelas} tanggal {form.tanggal.data.strftime("%d/%m/%Y")} sudah tersimpan. '
+                  'Periksa kembali sebelum mengubah.', 'warning')
+            return redirect(url_for('akademik.absensi_kelas', kelas_id=kelas.id,
+                                    tanggal=form.tanggal.data.isoformat()))
+
+        allowed = {value for value, _ in ABSENSI_STATUS_CHOICES}
+        rows = []
+        for santri in roster:
+            status = request.form.get(f'status_{santri.id}', 'Hadir')
+            if status not in allowed:
+                status = 'Hadir'
+            rows.append({'santri_id': santri.id, 'tanggal': form.tanggal.data, 'status': status})
+
+        bulk_upsert(Absensi, rows, index_elements=['santri_id', 'tanggal'], update_columns=['status'])
+        changes = []
+        for row in rows:
+            if row['santri_id'] in existing:
+                changes.append((row['santri_id'], row['tanggal'], existing[row['santri_id']], -1))
+            changes.append((row['santri_id'], row['tanggal'], row['status'], 1))
+        AbsensiRekapService.apply(changes)
+        RaportCache.mark_dirty(row['santri_id'] for row in rows)
+        DashboardService.mark_dirty()
+        db.session.commit()
+
+        rekap = {value: 0 for value in allowed}
+        for row in rows:
+            rekap[row['status']] += 1
+        record_audit('UPDATE' if existing else 'CREATE', 'Absensi', {
+            'kelas_id': kelas.id,
+            'tanggal': form.tanggal.data.isoformat(),
+            'jumlah_santri': len(rows),
+            'rekap': rekap
+        })
+
+        flash(f'Absensi {len(rows)} santri kelas {kelas.nama_kelas} berhasil disimpan', 'success')
+        return redirect(url_for('akademik.absensi_list'))
+
+    return render_template('akademik/absensi_kelas.html', title='Absensi Kelas', form=form,
+                           roster=roster, existing=existing, versi=_versi_absensi(existing),
+                           status_choices=ABSENSI_STATUS_CHOICES)
+
 @bp.route('/absensi/edit/<int:id>', methods=['GET', 'POST'])
 @login_required
 @role_required('admin', 'ustadz')
@@ -129,11 +350,17 @@ def absensi_add():
 def absensi_edit(id):
     absen = Absensi.query.get_or_404(id)
     form = AbsensiForm(obj=absen)
-    santris = Santri.query.options(joinedload(Santri.kelas)).all()
-    form.santri_id.choices = [(s.id, f"{s.nama} ({s.kelas.nama_kelas if s.kelas else '-'})") for s in santris]
     
     if form.validate_on_submit():
+        duplicate = Absensi.query.filter(Absensi.santri_id == form.santri_id.data, Absensi.tanggal == form.tanggal.data,
+                                         Absensi.id != absen.id).first()
+        if duplicate:
+            flash('Absensi santri ini pada tanggal tersebut sudah ada. Silakan edit data yang ada.', 'warning')
+            return render_template('akademik/absensi_form.html', title='Edit Absensi', form=form)
+
+        old = (absen.santri_id, absen.tanggal, absen.status)
         form.populate_obj(absen)
+        AbsensiRekapService.record(old=old, new=(absen.santri_id, absen.tanggal, absen.status))
         db.session.commit()
         flash('Absensi berhasil diperbarui', 'success')
         return redirect(url_for('akademik.absensi_list'))
@@ -146,41 +373,63 @@ def absensi_edit(id):
 @log_audit('DELETE', 'Absensi')
 def absensi_delete(id):
     absen = Absensi.query.get_or_404(id)
+    AbsensiRekapService.record(old=(absen.santri_id, absen.tanggal, absen.status))
     db.session.delete(absen)
     db.session.commit()
     flash('Absensi berhasil dihapus', 'success')
     return redirect(url_for('akademik.absensi_list'))
 
 # --- TAHFIDZ ---
+def _set_tahfidz_label(tahfidz):
+    # Keep the display columns (raport, lists) in sync with the structured range
+    tahfidz.nama_surat = SURAH[tahfidz.surah_nomor - 1][1]
+    if tahfidz.ayat_mulai == tahfidz.ayat_selesai:
+        tahfidz.ayat = str(tahfidz.ayat_mulai)
+    else:
+        tahfidz.ayat = f'{tahfidz.ayat_mulai}-{tahfidz.ayat_selesai}'
+
 @bp.route('/tahfidz')
 @login_required
 def tahfidz_list():
-    if current_user.role == 'wali_santri':
-        santris = Santri.query.filter_by(wali_user_id=current_user.id).all()
-        santri_ids = [s.id for s in santris]
-        hafalan = Tahfidz.query.filter(Tahfidz.santri_id.in_(santri_ids)).options(joinedload(Tahfidz.santri).joinedload(Santri.kelas)).order_by(Tahfidz.tanggal_setor.desc()).all()
-    else:
-        hafalan = Tahfidz.query.options(joinedload(Tahfidz.santri).joinedload(Santri.kelas)).order_by(Tahfidz.tanggal_setor.desc()).all()
+    hafalan = scope_santri(Tahfidz.query, Tahfidz.santri_id)\
+        .options(joinedload(Tahfidz.santri).joinedload(Santri.kelas)).order_by(Tahfidz.tanggal_setor.desc()).all()
     return render_template('akademik/tahfidz_list.html', title='Data Tahfidz', hafalan=hafalan)
 
+@bp.route('/tahfidz/progress')
+@login_required
+def tahfidz_progress():
+    """
+    Memorisation progress (distinct ayat and juz) per santri, optionally for one kelas.
+    """
+    kelas_id = request.args.get('kelas_id', type=int)
+    query = scope_santri(Santri.query.options(joinedload(Santri.kelas)).filter(Santri.status == 'aktif'))
+    if kelas_id and current_user.role != 'wali_santri':
+        query = query.filter(Santri.kelas_id == kelas_id)
+    santris = query.order_by(Santri.nama).all()
+
+    progress = TahfidzProgressService.get_progress_many([s.id for s in santris])
+    kelas_list = ReferensiCache.all(Kelas)
+    return render_template('akademik/tahfidz_progress.html', title='Progress Tahfidz',
+                           santris=santris, progress=progress, kelas_list=kelas_list, kelas_id=kelas_id)
+
 @bp.route('/tahfidz/add', methods=['GET', 'POST'])
 @login_required
 @role_required('admin', 'ustadz')
 @log_audit('CREATE', 'Tahfidz')
 def tahfidz_add():
     form = TahfidzForm()
-    santris = Santri.query.options(joinedload(Santri.kelas)).all()
-    form.santri_id.choices = [(s.id, f"{s.nama} ({s.kelas.nama_kelas if s.kelas else '-'})") for s in santris]
     
     if form.validate_on_submit():
         tahfidz = Tahfidz(
             santri_id=form.santri_id.data,
-            nama_surat=form.nama_surat.data,
-            ayat=form.ayat.data,
+            surah_nomor=form.surah_nomor.data,
+            ayat_mulai=form.ayat_mulai.data,
+            ayat_selesai=form.ayat_selesai.data,
             kelancaran=form.kelancaran.data,
             tajwid=form.tajwid.data,
             tanggal_setor=form.tanggal_setor.data
         )
+        _set_tahfidz_label(tahfidz)
         db.session.add(tahfidz)
         db.session.commit()
         flash('Hafalan berhasil disimpan', 'success')
@@ -195,11 +444,10 @@ def tahfidz_add():
 def tahfidz_edit(id):
     hafalan = Tahfidz.query.get_or_404(id)
     form = TahfidzForm(obj=hafalan)
-    santris = Santri.query.options(joinedload(Santri.kelas)).all()
-    form.santri_id.choices = [(s.id, f"{s.nama} ({s.kelas.nama_kelas if s.kelas else '-'})") for s in santris]
     
     if form.validate_on_submit():
         form.populate_obj(hafalan)
+        _set_tahfidz_label(hafalan)
         db.session.commit()
         flash('Hafalan berhasil diperbarui', 'success')
         return redirect(url_for('akademik.tahfidz_list'))
@@ -221,11 +469,13 @@ def tahfidz_delete(id):
 @bp.route('/raport')
 @login_required
 def raport_list():
+    # Wali santri pick from their own children; everyone else searches (santri autocomplete)
+    santris = []
     if current_user.role == 'wali_santri':
-        santris = Santri.query.filter_by(wali_user_id=current_user.id).options(joinedload(Santri.kelas)).all()
-    else:
-        santris = Santri.query.options(joinedload(Santri.kelas)).all()
-    return render_template('akademik/raport_list.html', title='E-Raport', santris=santris)
+        santris = scope_santri(Santri.query.options(joinedload(Santri.kelas))).all()
+    kelas_list = ReferensiCache.all(Kelas) if current_user.role != 'wali_santri' else []
+    return render_template('akademik/raport_list.html', title='E-Raport', santris=santris,
+                           kelas_list=kelas_list, semester_choices=Semester.choices())
 
 @bp.route('/raport/generate', methods=['GET'])
 @login_required
@@ -239,25 +489,136 @@ def raport_generate():
         
     service = RaportService()
     data = service.get_raport_data(santri_id, semester)
+    body = RaportCache.render('akademik/_raport_detail_body.html', data)
     
     if request.args.get('format') == 'pdf':
-        if HTML is None:
+        filename = f'Raport_{data["santri"].nama}_{semester}.pdf'
+        # Unchanged inputs -> the PDF rendered earlier is still valid, send it as a static file
+        pdf_path = RaportCache.path(data, 'akademik/raport_pdf.html', 'pdf')
+        if os.path.exists(pdf_path):
+            return send_file(pdf_path, mimetype='application/pdf', download_name=filename)
+
+        if not PdfService.is_available():
             flash('Fitur PDF belum tersedia di server ini (Missing GTK libraries).', 'warning')
-            return render_template('akademik/raport_detail.html', title='Detail Raport', data=data)
+            return render_template('akademik/raport_detail.html', title='Detail Raport', data=data, body=body)
 
-        # For immediate download, we still need to wait, but this structure allows future async expansion.
-        # In a full async implementation, we would return a "Processing" status and poll for completion.
-        # For now, we keep it synchronous but refactored, or we could save to file and serve static.
-        
-        html = render_template('akademik/raport_pdf.html', data=data)
-        pdf = HTML(string=html).write_pdf()
-        
-        response = make_response(pdf)
-        response.headers['Content-Type'] = 'application/pdf'
-        response.headers['Content-Disposition'] = f'inline; filename=Raport_{data["santri"].nama}_{semester}.pdf'
-        return response
+        # Same PDF already being rendered for this user
+        pending = PdfJob.query.filter(
+            PdfJob.output_path == pdf_path,
+            PdfJob.user_id == current_user.id,
+            PdfJob.status.in_(PdfService.ACTIVE_STATUSES)
+        ).first()
+        if pending:
+            return redirect(url_for('akademik.pdf_job', job_id=pending.id))
+
+        # Rendering happens in the PDF worker pool; the request only queues it
+        try:
+            RaportCache.prune(pdf_path)
+            job = PdfService.enqueue('akademik/raport_pdf.html', filename,
+                                     user_id=current_user.id, output_path=pdf_path, data=data)
+        except PdfQueueFull:
+            flash('Antrian pembuatan PDF sedang penuh. Silakan coba lagi beberapa saat lagi.', 'warning')
+            response = make_response(render_template('akademik/raport_detail.html', title='Detail Raport', data=data, body=body), 503)
+            response.headers['Retry-After'] = '30'
+            return response
+        return redirect(url_for('akademik.pdf_job', job_id=job.id))
         
-    return render_template('akademik/raport_detail.html', title='Detail Raport', data=data)
+    return render_template('akademik/raport_detail.html', title='Detail Raport', data=data, body=body)
+
+@bp.route('/statistik', methods=['GET'])
+@login_required
+@role_required('admin', 'ustadz', 'wali_kelas')
+def statistik_kelas():
+    """
+    Class analytics: ranking and per-mapel statistics for one kelas and semester.
+    """
+    kelas_id = request.args.get('kelas_id', type=int)
+    semester = request.args.get('semester')
+    if not semester:
+        current_semester = Semester.current()
+        semester = current_semester.nama if current_semester else None
+
+    kelas = Kelas.query.get_or_404(kelas_id) if kelas_id else None
+    statistik = StatistikKelasService.hitung(kelas.id, semester) if kelas and semester else None
+
+    return render_template('akademik/statistik_kelas.html', title='Statistik Kelas',
+                           kelas=kelas, semester=semester, statistik=statistik,
+                           kelas_list=ReferensiCache.all(Kelas),
+                           semester_choices=Semester.choices())
+
+@bp.route('/raport/kelas', methods=['GET'])
+@login_required
+@role_required('admin', 'ustadz', 'wali_kelas')
+def raport_kelas():
+    """
+    Print every raport of a kelas in one pass (one document, one page per santri).
+    """
+    kelas_id = request.args.get('kelas_id', type=int)
+    semester = request.args.get('semester')
+
+    if not kelas_id or not semester:
+        flash('Pilih Kelas dan Semester terlebih dahulu', 'warning')
+        return redirect(url_for('akademik.raport_list'))
+
+    kelas = Kelas.query.get_or_404(kelas_id)
+    raports = RaportService().get_raport_data_bulk(kelas.id, semester)
+    if not raports:
+        flash('Tidak ada santri aktif di kelas ini.', 'warning')
+        return redirect(url_for('akademik.raport_list'))
+
+    if request.args.get('format') == 'pdf' and PdfService.is_available():
+        try:
+            job = PdfService.enqueue('akademik/raport_pdf.html', f'Raport_{kelas.nama_kelas}_{semester}.pdf',
+                                     user_id=current_user.id, raports=raports)
+        except PdfQueueFull:
+            response = make_response('Antrian pembuatan PDF sedang penuh. Silakan coba lagi beberapa saat lagi.', 503)
+            response.headers['Retry-After'] = '30'
+            return response
+        return redirect(url_for('akademik.pdf_job', job_id=job.id))
+
+    return render_template('akademik/raport_pdf.html', raports=raports)
+
+# --- PDF JOBS ---
+def _get_own_job_or_404(job_id):
+    job = PdfJob.query.get_or_404(job_id)
+    if job.user_id != current_user.id and current_user.role != 'admin':
+        abort(404)
+    return job
+
+@bp.route('/pdf/<job_id>')
+@login_required
+def pdf_job(job_id):
+    job = _get_own_job_or_404(job_id)
+    return render_template('akademik/pdf_job.html', title='Membuat PDF', job=job)
+
+@bp.route('/pdf/<job_id>/status')
+@login_required
+def pdf_job_status(job_id):
+    job = _get_own_job_or_404(job_id)
+    payload = {'status': job.status, 'filename': job.filename}
+    if job.status == 'queued':
+        payload['position'] = PdfJob.query.filter(PdfJob.status == 'queued', PdfJob.created_at <= job.created_at).count()
+    elif job.status == 'done':
+        payload['download_url'] = url_for('akademik.pdf_job_download', job_id=job.id)
+    elif job.status == 'failed':
+        payload['message'] = job.error
+    return jsonify(payload)
+
+@bp.route('/pdf/<job_id>/download')
+@login_required
+def pdf_job_download(job_id):
+    job = _get_own_job_or_404(job_id)
+    if job.status != 'done' or not job.output_path:
+        return redirect(url_for('akademik.pdf_job', job_id=job.id))
+    if not os.path.exists(job.output_path):
+        # Removed by RaportCache after the raport data changed (or purged); the HTML
+        # was cleared when the job finished, so it has to be requested again
+        job.status = 'failed'
+        job.error = 'File PDF sudah tidak tersedia karena data raport berubah. Silakan buat ulang.'
+        db.session.commit()
+        flash(job.error, 'warning')
+        return redirect(url_for('akademik.raport_list'))
+    return send_file(job.output_path, mimetype='application/pdf', download_name=job.filename)
 
 @bp.route('/raport/input', methods=['GET', 'POST'])
 @login_required
@@ -268,8 +629,7 @@ def raport_input():
     semester = request.args.get('semester')
     
     form = RaportForm()
-    santris = Santri.query.options(joinedload(Santri.kelas)).all()
-    form.santri_id.choices = [(s.id, f"{s.nama} ({s.kelas.nama_kelas if s.kelas else '-'})") for s in santris]
+    form.semester.choices = Semester.choices()
     
     if request.method == 'GET' and santri_id and semester:
         form.santri_id.data = int(santri_id)
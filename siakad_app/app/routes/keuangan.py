@@ -1,34 +1,72 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app
+from flask import Blueprint, render_template, redirect, url_for, flash, request, abort, current_app, Response, send_file, stream_template, jsonify
 from flask_login import login_required, current_user
 from sqlalchemy.orm import joinedload
 from app import db
-from app.models.keuangan import Keuangan, PosKeuangan, TransaksiKeuangan, TabunganSantri, KonfigurasiLaporan
-from app.models.akademik import Santri
-from app.forms.keuangan import PembayaranForm, PosKeuanganForm, TransaksiKeuanganForm, TabunganForm, KonfigurasiLaporanForm, LaporanKeuanganForm
+from app.models.akademik import Kelas
+from app.models.berkas import Berkas
+from app.models.keuangan import NAMA_BULAN, Keuangan, PosKeuangan, TransaksiKeuangan, SaldoHarian, TabunganSantri, MutasiBank, KonfigurasiLaporan
+from app.forms.keuangan import PembayaranForm, PosKeuanganForm, TransaksiKeuanganForm, TabunganForm, TabunganBatchForm, KonfigurasiLaporanForm, LaporanKeuanganForm, TagihanSppForm, MutasiBankForm, RekonsiliasiForm
 from app.decorators import role_required
+import os
+import json
 from datetime import datetime
+from decimal import Decimal, InvalidOperation
 from werkzeug.utils import secure_filename
-from app.services.audit_service import log_audit
+from app.services.audit_service import log_audit, record_audit
+from app.services.referensi import ReferensiCache
+from app.services.scoping import scope_santri
+from app.services.laporan_keuangan import LaporanKeuanganService
+from app.services.tabungan import TabunganService, SaldoTidakCukup
+from app.services.tagihan import TagihanSppService
+from app.services.tunggakan import TunggakanService, daftar_periode, MAKS_BULAN
+from app.services.berkas import BerkasService
+from app.services.rekonsiliasi import RekonsiliasiService, FormatMutasiTidakDikenal, TOLERANSI_HARI
+from app.services.pagination import keyset_paginate
+from app.services.ekspor import EksporService, FORMATS as EKSPOR_FORMATS
+from app.services.dashboard import DashboardService
 
 bp = Blueprint('keuangan', __name__, url_prefix='/keuangan')
 
+PEMBAYARAN_PER_PAGE = 50
+MUTASI_PER_PAGE = 50
+STATUS_MUTASI = ('tinjau', 'belum', 'cocok', 'abaikan')
+BERKAS_MAX_AGE = 365 * 24 * 3600
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+    except ValueError:
+        return None
+
+def _parse_periode(value):
+    """'2024-07' (an <input type="month"> value) -> 202407, or None."""
+    try:
+        bulan = datetime.strptime(value, '%Y-%m') if value else None
+    except ValueError:
+        return None
+    return bulan.year * 100 + bulan.month if bulan else None
+
+def _format_periode(periode):
+    return f'{periode // 100:04d}-{periode % 100:02d}'
+
 @bp.route('/')
 @login_required
 def index():
     # Admin/Ustadz can see all, Wali Santri only sees their child's data
-    if current_user.role == 'wali_santri':
-        # Assuming there is a relationship or logic to filter by wali_santri
-        # For now, let's assume filtering by santri related to user if applicable, 
-        # but based on models, User doesn't directly link to Santri except via 'wali_user_id' in Santri model
-        # Let's check Santri model again.
-        # Santri has wali_user_id.
-        santris = Santri.query.filter_by(wali_user_id=current_user.id).all()
-        santri_ids = [s.id for s in santris]
-        pembayaran_list = Keuangan.query.filter(Keuangan.santri_id.in_(santri_ids)).options(joinedload(Keuangan.santri)).order_by(Keuangan.tanggal_bayar.desc()).all()
-    else:
-        pembayaran_list = Keuangan.query.options(joinedload(Keuangan.santri)).order_by(Keuangan.tanggal_bayar.desc()).all()
-        
-    return render_template('keuangan/pembayaran_list.html', title='Data Keuangan', pembayaran_list=pembayaran_list)
+    query = scope_santri(Keuangan.query, Keuangan.santri_id)
+    periode = _parse_periode(request.args.get('periode'))
+    if periode:
+        query = query.filter(Keuangan.periode == periode)
+
+    # Newest period first, one page at a time
+    page = request.args.get('page', 1, type=int)
+    pembayaran_list = query.options(joinedload(Keuangan.santri))\
+        .order_by(Keuangan.periode.desc(), Keuangan.id.desc())\
+        .paginate(page=page, per_page=PEMBAYARAN_PER_PAGE, error_out=False)
+
+    return render_template('keuangan/pembayaran_list.html', title='Data Keuangan',
+                           pembayaran_list=pembayaran_list,
+                           filters={'periode': request.args.get('periode') if periode else None})
 
 @bp.route('/add', methods=['GET', 'POST'])
 @login_required
@@ -36,15 +74,16 @@ def index():
 @log_audit('CREATE', 'Keuangan')
 def add():
     form = PembayaranForm()
-    # Populate santri choices
-    santris = Santri.query.options(joinedload(Santri.kelas)).all()
-    form.santri_id.choices = [(s.id, f"{s.nama} ({s.kelas.nama_kelas if s.kelas else '-'})") for s in santris]
     
     # Populate tahun choices (current year - 2 to current year + 2)
     current_year = datetime.now().year
     form.tahun.choices = [(y, y) for y in range(current_year - 2, current_year + 3)]
     
     if form.validate_on_submit():
+        if Keuangan.query.filter_by(santri_id=form.santri_id.data, tahun=form.tahun.data, bulan=form.bulan.data).first():
+            flash('Tagihan/pembayaran santri untuk bulan ini sudah ada. Silakan edit data yang ada.', 'warning')
+            return render_template('keuangan/pembayaran_form.html', title='Input Pembayaran', form=form)
+
         pembayaran = Keuangan(
             santri_id=form.santri_id.data,
             bulan=form.bulan.data,
@@ -75,12 +114,19 @@ def edit(id):
     pembayaran = Keuangan.query.get_or_404(id)
     form = PembayaranForm(obj=pembayaran)
     
-    santris = Santri.query.options(joinedload(Santri.kelas)).all()
-    form.santri_id.choices = [(s.id, f"{s.nama} ({s.kelas.nama_kelas if s.kelas else '-'})") for s in santris]
     current_year = datetime.now().year
     form.tahun.choices = [(y, y) for y in range(current_year - 2, current_year + 3)]
     
     if form.validate_on_submit():
+        duplicate = Keuangan.query.filter(
+            Keuangan.santri_id == form.santri_id.data,
+            Keuangan.tahun == form.tahun.data,
+            Keuangan.bulan == form.bulan.data,
+            Keuangan.id != pembayaran.id
+        ).first()
+        if duplicate:
+            flash('Tagihan/pembayaran santri untuk bulan ini sudah ada.', 'warning')
+            return render_template('keuangan/pembayaran_form.html', title='Edit Pembayaran', form=form)
         form.populate_obj(pembayaran)
         db.session.commit()
         flash('Data pembayaran berhasil diperbarui', 'success')
@@ -94,11 +140,50 @@ def edit(id):
 @log_audit('DELETE', 'Keuangan')
 def delete(id):
     pembayaran = Keuangan.query.get_or_404(id)
+    RekonsiliasiService.lepaskan(keuangan_id=pembayaran.id)
     db.session.delete(pembayaran)
     db.session.commit()
     flash('Data pembayaran berhasil dihapus', 'success')
     return redirect(url_for('keuangan.index'))
 
+@bp.route('/tagihan', methods=['GET', 'POST'])
+@login_required
+@role_required('admin')
+def tagihan_spp():
+    """
+    Bill SPP for one month to every active santri (optionally one jenjang or kelas) in one statement.
+    """
+    form = TagihanSppForm()
+    current_year = datetime.now().year
+    form.tahun.choices = [(y, y) for y in range(current_year - 2, current_year + 3)]
+    form.kelas_id.choices = [(0, '-- Semua Kelas --')] + [(k.id, k.nama_kelas) for k in ReferensiCache.all(Kelas)]
+
+    if form.validate_on_submit():
+        hasil = TagihanSppService.generate(
+            tahun=form.tahun.data,
+            bulan=form.bulan.data,
+            jumlah=form.jumlah.data,
+            jenjang=form.jenjang.data or None,
+            kelas_id=form.kelas_id.data or None
+        )
+        # Core INSERT ... SELECT bypasses the flush hooks
+        DashboardService.mark_dirty()
+        db.session.commit()
+        record_audit('CREATE', 'Keuangan', {
+            'tagihan_spp': f'{form.bulan.data} {form.tahun.data}',
+            'jenjang': form.jenjang.data or None,
+            'kelas_id': form.kelas_id.data or None,
+            **hasil
+        })
+        flash(f"Tagihan SPP {form.bulan.data} {form.tahun.data}: {hasil['dibuat']} dibuat, "
+              f"{hasil['dilewati']} dilewati (sudah ada) dari {hasil['sasaran']} santri aktif.", 'success')
+        return redirect(url_for('keuangan.index'))
+
+    if not form.tahun.data:
+        form.tahun.data = current_year
+        form.bulan.data = NAMA_BULAN[datetime.now().month - 1]
+    return render_template('keuangan/tagihan_form.html', title='Buat Tagihan SPP', form=form)
+
 # --- POS KEUANGAN (CATEGORIES) ---
 @bp.route('/kategori')
 @login_required
@@ -146,6 +231,8 @@ def kategori_edit(id):
 @log_audit('DELETE', 'PosKeuangan')
 def kategori_delete(id):
     pos = PosKeuangan.query.get_or_404(id)
+    # Daily totals only exist for pos that have transactions; those still block the delete
+    SaldoHarian.query.filter_by(pos_id=pos.id).delete(synchronize_session=False)
     db.session.delete(pos)
     db.session.commit()
     flash('Kategori keuangan berhasil dihapus', 'success')
@@ -157,32 +244,50 @@ def kategori_delete(id):
 def transaksi_list():
     transaksi_list = TransaksiKeuangan.query.options(
         joinedload(TransaksiKeuangan.pos),
-        joinedload(TransaksiKeuangan.santri)
+        joinedload(TransaksiKeuangan.santri),
+        joinedload(TransaksiKeuangan.berkas)
     ).order_by(TransaksiKeuangan.tanggal.desc()).all()
     return render_template('keuangan/transaksi_list.html', title='Transaksi Keuangan', transaksi_list=transaksi_list)
 
+@bp.route('/bukti/<sha256>')
+@login_required
+def bukti(sha256):
+    berkas = db.get_or_404(Berkas, sha256)
+    return _send_berkas(BerkasService.path(berkas), BerkasService.mimetype(berkas))
+
+@bp.route('/bukti/<sha256>/thumbnail')
+@login_required
+def bukti_thumbnail(sha256):
+    berkas = db.get_or_404(Berkas, sha256)
+    if berkas.thumbnail != 'done':
+        abort(404)
+    return _send_berkas(BerkasService.thumbnail_path(berkas), 'image/jpeg')
+
+def _send_berkas(path, mimetype):
+    if not os.path.exists(path):
+        abort(404)
+    response = send_file(path, mimetype=mimetype, conditional=True)
+    # Content-addressed: the file behind a URL never changes, but it is not public
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.max_age = BERKAS_MAX_AGE
+    response.cache_control.immutable = True
+    return response
+
 @bp.route('/transaksi/add', methods=['GET', 'POST'])
 @login_required
 @role_required('admin', 'ustadz')
 def transaksi_add():
     form = TransaksiKeuanganForm()
-    form.pos_id.choices = [(p.id, f"{p.nama} ({p.tipe})") for p in PosKeuangan.query.all()]
-    santris = Santri.query.all()
-    # Add empty option for non-santri transactions
-    form.santri_id.choices = [(0, '- Umum -')] + [(s.id, f"{s.nama}") for s in santris]
+    form.pos_id.choices = [(p.id, f"{p.nama} ({p.tipe})") for p in ReferensiCache.all(PosKeuangan)]
     
     if form.validate_on_submit():
-        filename = None
+        bukti = None
         if form.bukti_pembayaran.data:
-            file = form.bukti_pembayaran.data
-            filename = secure_filename(file.filename)
-            # Ensure upload folder exists
-            upload_dir = os.path.join(current_app.root_path, 'static', 'uploads', 'bukti_bayar')
-            if not os.path.exists(upload_dir):
-                os.makedirs(upload_dir)
-            file.save(os.path.join(upload_dir, filename))
+            # Stored once per content; the thumbnail is made later by the worker
+            bukti = BerkasService.simpan(form.bukti_pembayaran.data).sha256
             
-        santri_id = form.santri_id.data if form.santri_id.data != 0 else None
+        santri_id = form.santri_id.data # None for general (non-santri) transactions
         
         transaksi = TransaksiKeuangan(
             pos_id=form.pos_id.data,
@@ -192,7 +297,7 @@ def transaksi_add():
             tanggal=form.tanggal.data,
             keterangan=form.keterangan.data,
             metode_pembayaran=form.metode_pembayaran.data,
-            bukti_pembayaran=filename,
+            bukti_pembayaran=bukti,
             user_id=current_user.id
         )
         db.session.add(transaksi)
@@ -206,7 +311,8 @@ def transaksi_add():
 @bp.route('/tabungan')
 @login_required
 def tabungan_list():
-    tabungan_list = TabunganSantri.query.options(joinedload(TabunganSantri.santri)).order_by(TabunganSantri.tanggal.desc()).all()
+    tabungan_list = scope_santri(TabunganSantri.query, TabunganSantri.santri_id)\
+        .options(joinedload(TabunganSantri.santri)).order_by(TabunganSantri.tanggal.desc()).all()
     return render_template('keuangan/tabungan_list.html', title='Tabungan Santri', tabungan_list=tabungan_list)
 
 @bp.route('/tabungan/add', methods=['GET', 'POST'])
@@ -214,102 +320,353 @@ def tabungan_list():
 @role_required('admin', 'ustadz')
 def tabungan_add():
     form = TabunganForm()
-    santris = Santri.query.all()
-    form.santri_id.choices = [(s.id, s.nama) for s in santris]
     
     if form.validate_on_submit():
-        last_tx = TabunganSantri.query.filter_by(santri_id=form.santri_id.data).order_by(TabunganSantri.id.desc()).first()
-        current_saldo = last_tx.saldo_akhir if last_tx else 0
-        
-        if form.jenis.data == 'tarik' and current_saldo < form.jumlah.data:
-            flash(f'Saldo tidak mencukupi! Saldo saat ini: {current_saldo}', 'danger')
+        # Balance check and update happen atomically in the database
+        try:
+            TabunganService.posting(
+                santri_id=form.santri_id.data,
+                jenis=form.jenis.data,
+                jumlah=form.jumlah.data,
+                tanggal=form.tanggal.data,
+                keterangan=form.keterangan.data,
+                user_id=current_user.id
+            )
+        except SaldoTidakCukup as e:
+            db.session.rollback()
+            flash(f'Saldo tidak mencukupi! Saldo saat ini: {e.saldo:,.0f}', 'danger')
+            return render_template('keuangan/tabungan_form.html', title='Transaksi Tabungan', form=form)
+        except ValueError as e:
+            # e.g. Infinity or 0, which the form's NumberRange lets through
+            db.session.rollback()
+            flash(str(e), 'danger')
             return render_template('keuangan/tabungan_form.html', title='Transaksi Tabungan', form=form)
-            
-        if form.jenis.data == 'setor':
-            new_saldo = float(current_saldo) + float(form.jumlah.data)
-        else:
-            new_saldo = float(current_saldo) - float(form.jumlah.data)
-            
-        tabungan = TabunganSantri(
-            santri_id=form.santri_id.data,
-            jenis=form.jenis.data,
-            jumlah=form.jumlah.data,
-            tanggal=form.tanggal.data,
-            keterangan=form.keterangan.data,
-            user_id=current_user.id,
-            saldo_akhir=new_saldo
-        )
-        db.session.add(tabungan)
         db.session.commit()
         flash('Transaksi tabungan berhasil disimpan', 'success')
         return redirect(url_for('keuangan.tabungan_list'))
         
     return render_template('keuangan/tabungan_form.html', title='Transaksi Tabungan', form=form)
 
+def _parse_batch_lines(text):
+    """Lines of 'NIS;jenis;jumlah;keterangan' (tab-separated also accepted) -> item dicts."""
+    items = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        parts = [p.strip() for p in line.replace('\t', ';').split(';')]
+        parts += [''] * (4 - len(parts))
+        items.append({'nis': parts[0], 'jenis': parts[1], 'jumlah': parts[2], 'keterangan': parts[3] or None})
+    return items
+
+@bp.route('/tabungan/batch', methods=['GET', 'POST'])
+@login_required
+@role_required('admin', 'ustadz')
+def tabungan_batch():
+    """
+    Post many deposits/withdrawals (e.g. a canteen session) in one request and one transaction.
+    Accepts the form below, or JSON {"tanggal": "YYYY-MM-DD", "items": [{"santri_id"|"nis", "jenis", "jumlah", "keterangan"}]}.
+    """
+    if request.is_json:
+        payload = request.get_json(silent=True) or {}
+        items = payload.get('items')
+        if not isinstance(items, list) or not items or not all(isinstance(i, dict) for i in items):
+            return jsonify({'error': 'items wajib berupa daftar transaksi.'}), 400
+        tanggal = _parse_date(payload.get('tanggal')) or datetime.today().date()
+        results = TabunganService.posting_batch(items, tanggal=tanggal, user_id=current_user.id)
+        db.session.commit()
+        posted = [r for r in results if r[1] is not None]
+        if posted:
+            record_audit('CREATE', 'TabunganSantri', {'batch': len(posted)})
+        return jsonify({
+            'berhasil': len(posted),
+            'gagal': len(results) - len(posted),
+            'hasil': [
+                {'index': index, 'id': tx.id if tx else None, 'saldo_akhir': str(tx.saldo_akhir) if tx else None,
+                 'error': error}
+                for index, tx, error in results
+            ]
+        })
+
+    form = TabunganBatchForm()
+    results = None
+    if form.validate_on_submit():
+        items = _parse_batch_lines(form.entri.data)
+        results = TabunganService.posting_batch(items, tanggal=form.tanggal.data, user_id=current_user.id)
+        db.session.commit()
+        posted = sum(1 for r in results if r[1] is not None)
+        if posted:
+            record_audit('CREATE', 'TabunganSantri', {'batch': posted})
+        flash(f'{posted} transaksi tabungan diposting, {len(results) - posted} gagal.',
+              'success' if posted == len(results) else 'warning')
+        results = [(items[index], tx, error) for index, tx, error in results]
+
+    if not form.tanggal.data:
+        form.tanggal.data = datetime.today().date()
+    return render_template('keuangan/tabungan_batch.html', title='Posting Tabungan Massal', form=form, results=results)
+
 # --- LAPORAN & KONFIGURASI ---
+LAPORAN_PER_PAGE = 50
+TUNGGAKAN_PER_PAGE = 50
+
 @bp.route('/laporan', methods=['GET', 'POST'])
 @login_required
 def laporan():
     form = LaporanKeuanganForm()
     
+    # Period from the filter form, or from the query string when paging through the items
+    if request.method == 'GET':
+        form.start_date.data = _parse_date(request.args.get('start_date')) or form.start_date.data
+        form.end_date.data = _parse_date(request.args.get('end_date')) or form.end_date.data
+
     # Default date range: 1st of current month to today
     if not form.start_date.data:
-        today = datetime.today()
+        today = datetime.today().date()
         form.start_date.data = today.replace(day=1)
         form.end_date.data = today
         
     laporan_data = None
-    konfigurasi = KonfigurasiLaporan.query.first()
+    konfigurasi = ReferensiCache.first(KonfigurasiLaporan)
     
     if form.validate_on_submit() or request.method == 'GET':
         start_date = form.start_date.data
         end_date = form.end_date.data
         
-        # Get Transactions
-        transaksi = TransaksiKeuangan.query.filter(
-            TransaksiKeuangan.tanggal >= start_date,
-            TransaksiKeuangan.tanggal <= end_date
-        ).options(
-            joinedload(TransaksiKeuangan.pos),
-            joinedload(TransaksiKeuangan.santri)
-        ).order_by(TransaksiKeuangan.tanggal.asc()).all()
-        
-        # Calculate Totals per Category
-        summary = {}
-        total_masuk = 0
-        total_keluar = 0
-        
-        for tx in transaksi:
-            cat_name = tx.pos.nama
-            if cat_name not in summary:
-                summary[cat_name] = {'tipe': tx.pos.tipe, 'total': 0}
-            
-            summary[cat_name]['total'] += float(tx.jumlah)
-            
-            if tx.jenis == 'masuk':
-                total_masuk += float(tx.jumlah)
-            else:
-                total_keluar += float(tx.jumlah)
-                
-        laporan_data = {
-            'transaksi': transaksi,
-            'summary': summary,
-            'total_masuk': total_masuk,
-            'total_keluar': total_keluar,
-            'saldo': total_masuk - total_keluar,
-            'periode': f"{start_date.strftime('%d %B %Y')} s/d {end_date.strftime('%d %B %Y')}"
-        }
+        # Totals per kategori and jenis are summed by the database, in Decimal
+        laporan_data = LaporanKeuanganService.ringkasan(start_date, end_date)
+        laporan_data['periode'] = f"{start_date.strftime('%d %B %Y')} s/d {end_date.strftime('%d %B %Y')}"
         
         if form.cetak_pdf.data:
             # Render PDF Template (For now just a print-friendly HTML page)
-            return render_template('keuangan/laporan_print.html', 
-                                   data=laporan_data, 
-                                   config=konfigurasi,
-                                   title='Laporan Keuangan',
-                                   now=datetime.now())
+            # Streamed: the item rows are fetched in batches while the page is sent
+            laporan_data['transaksi'] = LaporanKeuanganService.iter_transaksi(start_date, end_date)
+            return Response(stream_template('keuangan/laporan_print.html', 
+                                            data=laporan_data, 
+                                            config=konfigurasi,
+                                            title='Laporan Keuangan',
+                                            now=datetime.now()))
+
+        # Only one page of the itemised list is loaded
+        page = LaporanKeuanganService.transaksi_page(
+            start_date, end_date,
+            after=request.args.get('after'),
+            before=request.args.get('before'),
+            per_page=LAPORAN_PER_PAGE
+        )
+        laporan_data['transaksi'] = page.items
+        laporan_data['page'] = page
+        laporan_data['filters'] = {'start_date': start_date.strftime('%Y-%m-%d'),
+                                   'end_date': end_date.strftime('%Y-%m-%d')}
 
     return render_template('keuangan/laporan_index.html', title='Laporan Keuangan', form=form, data=laporan_data)
 
+@bp.route('/tunggakan')
+@login_required
+@role_required('admin', 'ustadz')
+def tunggakan():
+    """
+    Unpaid or unbilled SPP months of active santri, totalled per kelas.
+    ?format=csv exports every unpaid month of the filter.
+    """
+    today = datetime.today()
+    sampai = _parse_periode(request.args.get('sampai')) or today.year * 100 + today.month
+    dari = _parse_periode(request.args.get('dari')) or sampai // 100 * 100 + 1
+    dari = min(dari, sampai)
+    periode_list = daftar_periode(dari, sampai)
+    if len(periode_list) == MAKS_BULAN and periode_list[-1] != sampai:
+        flash(f'Rentang dibatasi {MAKS_BULAN} bulan.', 'warning')
+        sampai = periode_list[-1]
+    kelas_id = request.args.get('kelas_id', type=int)
+    tarif_arg = request.args.get('tarif') or None
+    try:
+        tarif = Decimal(tarif_arg or 0)
+    except InvalidOperation:
+        tarif = None
+    # NaN/Infinity parse as Decimal but cannot be stored in a Numeric(10, 2) literal
+    if tarif is None or not tarif.is_finite() or tarif < 0:
+        flash('Tarif harus berupa angka tidak negatif; tarif diabaikan.', 'warning')
+        tarif, tarif_arg = Decimal(0), None
+
+    filters = {'dari': _format_periode(dari), 'sampai': _format_periode(sampai),
+               'kelas_id': kelas_id, 'tarif': tarif_arg}
+
+    fmt = request.args.get('format')
+    if fmt in EKSPOR_FORMATS:
+        if fmt == 'xlsx' and not EksporService.xlsx_available():
+            flash('Ekspor XLSX belum tersedia (paket openpyxl belum terpasang).', 'warning')
+            return redirect(url_for('keuangan.tunggakan', **filters))
+
+        def rows():
+            for nama_kelas, nis, nama, periode, status, nominal in \
+                    TunggakanService.iter_rincian(dari, sampai, tarif, kelas_id):
+                yield [nama_kelas or '-', nis, nama, Keuangan.nama_periode(periode), status,
+                       Decimal(nominal or 0).quantize(Decimal('0.01'))]
+
+        return EksporService.response(
+            f"tunggakan_{filters['dari']}_{filters['sampai']}",
+            ['Kelas', 'NIS', 'Nama', 'Periode', 'Status', 'Nominal'], rows(), fmt, title='Tunggakan'
+        )
+
+    per_kelas, total = TunggakanService.per_kelas(dari, sampai, tarif, kelas_id)
+    page = TunggakanService.santri_page(
+        dari, sampai, tarif, kelas_id,
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        per_page=TUNGGAKAN_PER_PAGE
+    )
+    return render_template('keuangan/tunggakan.html', title='Laporan Tunggakan SPP',
+                           per_kelas=per_kelas, total=total, page=page, filters=filters,
+                           nama_periode=Keuangan.nama_periode,
+                           kelas_list=ReferensiCache.all(Kelas))
+
+@bp.route('/ekspor/<jenis>')
+@login_required
+@role_required('admin', 'ustadz')
+def ekspor(jenis):
+    """
+    Download transaksi, pembayaran (SPP) or tabungan as ?format=csv|xlsx.
+    Filters: start_date/end_date (YYYY-MM-DD) for transaksi and tabungan,
+    dari/sampai (YYYY-MM) for pembayaran. Rows are streamed, so any range is safe.
+    """
+    fmt = request.args.get('format', 'csv')
+    if jenis not in ('transaksi', 'pembayaran', 'tabungan') or fmt not in EKSPOR_FORMATS:
+        abort(404)
+    if fmt == 'xlsx' and not EksporService.xlsx_available():
+        flash('Ekspor XLSX belum tersedia (paket openpyxl belum terpasang).', 'warning')
+        return redirect(request.referrer or url_for('keuangan.index'))
+
+    if jenis == 'pembayaran':
+        dari = _parse_periode(request.args.get('dari'))
+        sampai = _parse_periode(request.args.get('sampai'))
+        header, rows = EksporService.pembayaran(dari, sampai)
+        rentang = [_format_periode(p) for p in (dari, sampai) if p]
+    else:
+        start_date = _parse_date(request.args.get('start_date'))
+        end_date = _parse_date(request.args.get('end_date'))
+        dataset = EksporService.transaksi if jenis == 'transaksi' else EksporService.tabungan
+        header, rows = dataset(start_date, end_date)
+        rentang = [d.strftime('%Y-%m-%d') for d in (start_date, end_date) if d]
+
+    record_audit('EXPORT', jenis.capitalize(), {'format': fmt, **request.args.to_dict()})
+    filename = '_'.join([jenis] + rentang)
+    return EksporService.response(filename, header, rows, fmt, title=jenis.capitalize())
+
+# --- REKONSILIASI BANK ---
+@bp.route('/rekonsiliasi')
+@login_required
+@role_required('admin', 'ustadz')
+def rekonsiliasi():
+    """
+    Bank statement lines by status (review queue first), with the import and matching forms.
+    """
+    status = request.args.get('status', 'tinjau')
+    if status not in STATUS_MUTASI:
+        status = 'tinjau'
+
+    impor_form = MutasiBankForm()
+    cocokkan_form = RekonsiliasiForm()
+    if not cocokkan_form.start_date.data:
+        today = datetime.today().date()
+        cocokkan_form.start_date.data = today.replace(day=1)
+        cocokkan_form.end_date.data = today
+
+    jumlah_status = dict(db.session.query(MutasiBank.status, db.func.count(MutasiBank.id))
+                         .group_by(MutasiBank.status).all())
+    page = keyset_paginate(
+        MutasiBank.query.filter(MutasiBank.status == status),
+        [MutasiBank.tanggal, MutasiBank.id],
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        per_page=MUTASI_PER_PAGE
+    )
+
+    # Candidates (review queue) or the chosen match, labelled with one query per table
+    items = []
+    for mutasi in page.items:
+        if mutasi.status == 'tinjau':
+            kandidat = json.loads(mutasi.kandidat or '[]')
+        elif mutasi.transaksi_id or mutasi.keuangan_id:
+            kandidat = [{'jenis': 'transaksi' if mutasi.transaksi_id else 'keuangan',
+                         'id': mutasi.transaksi_id or mutasi.keuangan_id, 'skor': None}]
+        else:
+            kandidat = []
+        items.append((mutasi, kandidat))
+    labels = RekonsiliasiService.label_kandidat([k for _, kandidat in items for k in kandidat])
+
+    return render_template('keuangan/rekonsiliasi.html', title='Rekonsiliasi Bank',
+                           impor_form=impor_form, cocokkan_form=cocokkan_form,
+                           status=status, status_list=STATUS_MUTASI, jumlah_status=jumlah_status,
+                           items=items, labels=labels, page=page)
+
+@bp.route('/rekonsiliasi/impor', methods=['POST'])
+@login_required
+@role_required('admin', 'ustadz')
+def rekonsiliasi_impor():
+    form = MutasiBankForm()
+    if not form.validate_on_submit():
+        for error in form.berkas.errors:
+            flash(error, 'danger')
+        return redirect(url_for('keuangan.rekonsiliasi'))
+
+    try:
+        hasil = RekonsiliasiService.impor(form.berkas.data.stream)
+    except FormatMutasiTidakDikenal as e:
+        db.session.rollback()
+        flash(str(e), 'danger')
+        return redirect(url_for('keuangan.rekonsiliasi'))
+    db.session.commit()
+    record_audit('IMPORT', 'MutasiBank', {'file': form.berkas.data.filename, **hasil})
+    flash(f"{hasil['baru']} mutasi diimpor, {hasil['duplikat']} sudah ada sebelumnya, "
+          f"{hasil['dilewati']} baris dilewati.", 'success')
+    return redirect(url_for('keuangan.rekonsiliasi', status='belum'))
+
+@bp.route('/rekonsiliasi/cocokkan', methods=['POST'])
+@login_required
+@role_required('admin', 'ustadz')
+def rekonsiliasi_cocokkan():
+    form = RekonsiliasiForm()
+    if not form.validate_on_submit():
+        flash('Periode rekonsiliasi tidak valid.', 'danger')
+        return redirect(url_for('keuangan.rekonsiliasi'))
+
+    toleransi = form.toleransi.data if form.toleransi.data is not None else TOLERANSI_HARI
+    hasil = RekonsiliasiService.cocokkan(form.start_date.data, form.end_date.data, toleransi_hari=toleransi)
+    db.session.commit()
+    record_audit('RECONCILE', 'MutasiBank', {
+        'start_date': form.start_date.data.isoformat(), 'end_date': form.end_date.data.isoformat(),
+        'toleransi': toleransi, **hasil
+    })
+    flash(f"{hasil['cocok']} mutasi cocok otomatis, {hasil['tinjau']} perlu ditinjau, "
+          f"{hasil['belum']} belum ada pasangannya.", 'success')
+    return redirect(url_for('keuangan.rekonsiliasi', status='tinjau' if hasil['tinjau'] else 'cocok'))
+
+@bp.route('/rekonsiliasi/<int:id>/<aksi>', methods=['POST'])
+@login_required
+@role_required('admin', 'ustadz')
+def rekonsiliasi_aksi(id, aksi):
+    """Review queue actions: tetapkan (pick a candidate), abaikan, buka (back to 'belum')."""
+    mutasi = db.get_or_404(MutasiBank, id)
+    status = mutasi.status
+    if aksi == 'tetapkan':
+        target_id = request.form.get('target_id', type=int)
+        if target_id is None:
+            abort(400)
+        try:
+            RekonsiliasiService.tetapkan(mutasi, request.form.get('jenis'), target_id)
+        except ValueError as e:
+            flash(str(e), 'danger')
+            return redirect(url_for('keuangan.rekonsiliasi', status=status))
+    elif aksi == 'abaikan':
+        RekonsiliasiService.abaikan(mutasi)
+    elif aksi == 'buka':
+        RekonsiliasiService.lepaskan(mutasi_id=mutasi.id)
+    else:
+        abort(404)
+    db.session.commit()
+    record_audit('UPDATE', 'MutasiBank', {'id': id, 'aksi': aksi, 'transaksi_id': mutasi.transaksi_id,
+                                          'keuangan_id': mutasi.keuangan_id})
+    flash('Mutasi diperbarui.', 'success')
+    return redirect(url_for('keuangan.rekonsiliasi', status=status))
+
 @bp.route('/konfigurasi', methods=['GET', 'POST'])
 @login_required
 @role_required('admin')
@@ -1,22 +1,31 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app
+from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app, jsonify, abort
 import datetime
 from flask_login import login_required, current_user
 from sqlalchemy.orm import joinedload
-from app import db
-from app.models.akademik import Santri, Pengajar, Kelas, MataPelajaran
+from app import db, cache, limiter
+from app.models.akademik import Santri, Pengajar, Kelas, MataPelajaran, Semester, Nilai, Raport
 from app.models.user import User
-from app.forms.master import SantriForm, PengajarForm, KelasForm, MapelForm
+from app.forms.master import SantriForm, ImporSantriForm, KenaikanKelasForm, PengajarForm, KelasForm, MapelForm, SemesterForm
 from app.forms.auth import UserForm, UserEditForm
-from app.decorators import admin_required
-from app.services.audit_service import log_audit
+from app.forms.fields import santri_label
+from app.decorators import admin_required, role_required
+from app.services.audit_service import log_audit, record_audit
+from app.services.referensi import ReferensiCache
+from app.services.impor_santri import ImporSantriService, FormatImporTidakDikenal
+from app.services.kenaikan import KenaikanKelasService, LULUS
+from app.services.dashboard import DashboardService
+from app.services.raport_cache import RaportCache
 
 from app.services.backup_service import BackupService
 import os
+import re
 from flask import send_file
 from werkzeug.utils import secure_filename
 
 bp = Blueprint('master', __name__, url_prefix='/master')
 
+SANTRI_SEARCH_LIMIT = 20
+
 # --- BACKUP & RESTORE ---
 @bp.route('/backup')
 @login_required
@@ -106,7 +115,14 @@ def backup_restore():
             file.save(temp_path)
             
             # Perform restore
-            BackupService.restore_system_snapshot(temp_path)
+            try:
+                BackupService.restore_system_snapshot(temp_path)
+            finally:
+                # The tables were replaced behind the session hooks: drop the reference
+                # versions, dashboard generation and tahfidz progress (all in the shared
+                # cache; versions reseed from the clock) and the rendered raport files
+                cache.clear()
+                RaportCache.clear()
             
             # Clean up
             if os.path.exists(temp_path):
@@ -198,6 +214,37 @@ def santri_list():
     santris = Santri.query.options(joinedload(Santri.kelas)).all()
     return render_template('master/santri_list.html', title='Data Santri', santris=santris)
 
+@bp.route('/santri/search')
+@login_required
+@role_required('admin', 'ustadz', 'wali_kelas')
+@limiter.limit("120 per minute") # Called on every keystroke (debounced) by the santri autocomplete
+def santri_search():
+    """
+    JSON autocomplete for santri pickers: top matches by NIS or name prefix.
+    """
+    q = (request.args.get('q') or '').strip()
+    limit = max(1, min(request.args.get('limit', SANTRI_SEARCH_LIMIT, type=int), SANTRI_SEARCH_LIMIT))
+    if len(q) < 2:
+        return jsonify([])
+
+    # Escape LIKE wildcards typed by the user
+    def prefix(value):
+        return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+    santris = Santri.query.options(joinedload(Santri.kelas)).filter(db.or_(
+        Santri.nama_cari.like(prefix(Santri.normalize_nama(q)), escape='\\'),
+        Santri.nis.like(prefix(q), escape='\\')
+    )).order_by(Santri.nama_cari, Santri.id).limit(limit).all()
+
+    return jsonify([{
+        'id': s.id,
+        'nis': s.nis,
+        'nama': s.nama,
+        'kelas': s.kelas.nama_kelas if s.kelas else None,
+        'status': s.status,
+        'label': santri_label(s)
+    } for s in santris])
+
 @bp.route('/santri/add', methods=['GET', 'POST'])
 @login_required
 @admin_required
@@ -205,7 +252,7 @@ def santri_list():
 def santri_add():
     form = SantriForm()
     # Populate kelas choices
-    kelas_list = Kelas.query.all()
+    kelas_list = ReferensiCache.all(Kelas)
     form.kelas_id.choices = [(k.id, k.nama_kelas) for k in kelas_list]
 
     if form.validate_on_submit():
@@ -225,6 +272,46 @@ def santri_add():
         return redirect(url_for('master.santri_list'))
     return render_template('master/santri_form.html', title='Tambah Santri', form=form)
 
+@bp.route('/santri/impor', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def santri_impor():
+    """
+    Bulk import (PPDB) from CSV/XLSX. Valid rows are saved, rejected rows are
+    listed and can be downloaded as a CSV report.
+    """
+    form = ImporSantriForm()
+    hasil = None
+    if form.validate_on_submit():
+        berkas = form.berkas.data
+        fmt = os.path.splitext(berkas.filename or '')[1].lower().lstrip('.')
+        ImporSantriService.bersihkan_laporan()
+        try:
+            hasil = ImporSantriService.impor(berkas.stream, fmt)
+        except FormatImporTidakDikenal as e:
+            db.session.rollback()
+            flash(str(e), 'danger')
+            return render_template('master/santri_impor.html', title='Impor Santri', form=form)
+        # bulk_insert_mappings bypasses the flush hooks the dashboard listens to
+        DashboardService.mark_dirty()
+        db.session.commit()
+        record_audit('IMPORT', 'Santri', {'file': berkas.filename, 'baris': hasil['baris'],
+                                          'dibuat': hasil['dibuat'], 'ditolak': hasil['ditolak']})
+        flash(f"{hasil['dibuat']} santri berhasil diimpor, {hasil['ditolak']} baris ditolak.",
+              'success' if not hasil['ditolak'] else 'warning')
+    return render_template('master/santri_impor.html', title='Impor Santri', form=form, hasil=hasil)
+
+@bp.route('/santri/impor/laporan/<token>')
+@login_required
+@admin_required
+def santri_impor_laporan(token):
+    if not re.fullmatch(r'[0-9a-f]{32}', token):
+        abort(404)
+    path = ImporSantriService.laporan_path(token)
+    if not os.path.exists(path):
+        abort(404)
+    return send_file(path, mimetype='text/csv', as_attachment=True, download_name='santri_ditolak.csv')
+
 @bp.route('/santri/edit/<int:id>', methods=['GET', 'POST'])
 @login_required
 @admin_required
@@ -233,7 +320,7 @@ def santri_edit(id):
     santri = Santri.query.get_or_404(id)
     form = SantriForm(obj=santri, original_nis=santri.nis)
     # Populate kelas choices
-    kelas_list = Kelas.query.all()
+    kelas_list = ReferensiCache.all(Kelas)
     form.kelas_id.choices = [(k.id, k.nama_kelas) for k in kelas_list]
     
     if form.validate_on_submit():
@@ -254,6 +341,56 @@ def santri_delete(id):
     flash('Data Santri berhasil dihapus', 'success')
     return redirect(url_for('master.santri_list'))
 
+# --- KENAIKAN KELAS ---
+@bp.route('/kenaikan', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def kenaikan():
+    """
+    Year-end promotion. The kelas -> kelas (or Lulus) mapping is posted as
+    tujuan-<kelas_id> fields; 'Pratinjau' shows what would change, 'Terapkan'
+    applies it in one transaction with one audit record.
+    """
+    form = KenaikanKelasForm()
+    form.semester.choices = Semester.choices()
+    kelas_list = ReferensiCache.all(Kelas)
+    kelas_ids = {k.id for k in kelas_list}
+    if request.method == 'GET':
+        current_semester = Semester.current()
+        form.semester.data = current_semester.nama if current_semester else None
+
+    mapping = {}
+    for kelas in kelas_list:
+        tujuan = request.form.get(f'tujuan-{kelas.id}', '')
+        if tujuan == LULUS:
+            mapping[kelas.id] = LULUS
+        elif tujuan.isdigit() and int(tujuan) in kelas_ids and int(tujuan) != kelas.id:
+            mapping[kelas.id] = int(tujuan)
+
+    pratinjau = rincian = None
+    if form.validate_on_submit():
+        if not mapping:
+            flash('Pilih tujuan untuk minimal satu kelas.', 'warning')
+        elif form.terapkan.data:
+            hasil = KenaikanKelasService.terapkan(form.semester.data, mapping)
+            # Core UPDATEs bypass the flush hooks the dashboard listens to
+            DashboardService.mark_dirty()
+            db.session.commit()
+            record_audit('UPDATE', 'Santri', {
+                'kenaikan_kelas': form.semester.data,
+                'mapping': {str(k): v for k, v in mapping.items()},
+                **hasil
+            })
+            flash(f"Kenaikan kelas diterapkan: {hasil['naik']} santri naik kelas, {hasil['lulus']} santri lulus.", 'success')
+            return redirect(url_for('master.kenaikan'))
+        else:
+            pratinjau = KenaikanKelasService.pratinjau(form.semester.data, mapping)
+            rincian = KenaikanKelasService.rincian(form.semester.data, mapping)
+
+    return render_template('master/kenaikan.html', title='Kenaikan Kelas', form=form, kelas_list=kelas_list,
+                           nama_kelas={k.id: k.nama_kelas for k in kelas_list}, mapping=mapping,
+                           pratinjau=pratinjau, rincian=rincian, LULUS=LULUS)
+
 @bp.route('/kelas')
 @login_required
 @admin_required
@@ -408,3 +545,63 @@ def mapel_delete(id):
     db.session.commit()
     flash('Mata Pelajaran berhasil dihapus', 'success')
     return redirect(url_for('master.mapel_list'))
+
+# --- SEMESTER ---
+@bp.route('/semester')
+@login_required
+@admin_required
+def semester_list():
+    semesters = Semester.query.order_by(Semester.tanggal_mulai.desc()).all()
+    return render_template('master/semester_list.html', title='Semester', semesters=semesters)
+
+@bp.route('/semester/add', methods=['GET', 'POST'])
+@login_required
+@admin_required
+@log_audit('CREATE', 'Semester')
+def semester_add():
+    form = SemesterForm()
+    if form.validate_on_submit():
+        semester = Semester(
+            nama=form.nama.data,
+            tanggal_mulai=form.tanggal_mulai.data,
+            tanggal_selesai=form.tanggal_selesai.data
+        )
+        db.session.add(semester)
+        db.session.commit()
+        flash('Semester berhasil ditambahkan', 'success')
+        return redirect(url_for('master.semester_list'))
+    return render_template('master/semester_form.html', title='Tambah Semester', form=form)
+
+@bp.route('/semester/edit/<int:id>', methods=['GET', 'POST'])
+@login_required
+@admin_required
+@log_audit('UPDATE', 'Semester')
+def semester_edit(id):
+    semester = Semester.query.get_or_404(id)
+    form = SemesterForm(original_nama=semester.nama, obj=semester)
+    # The name is the key Nilai/Raport refer to; only the date range may change once it is in use
+    in_use = Nilai.query.filter_by(semester=semester.nama).first() is not None \
+        or Raport.query.filter_by(semester=semester.nama).first() is not None
+    if form.validate_on_submit():
+        if in_use and form.nama.data != semester.nama:
+            flash('Nama semester sudah dipakai oleh data nilai/raport dan tidak dapat diubah.', 'warning')
+            return render_template('master/semester_form.html', title='Edit Semester', form=form)
+        form.populate_obj(semester)
+        db.session.commit()
+        flash('Semester berhasil diperbarui', 'success')
+        return redirect(url_for('master.semester_list'))
+    return render_template('master/semester_form.html', title='Edit Semester', form=form)
+
+@bp.route('/semester/delete/<int:id>', methods=['POST'])
+@login_required
+@admin_required
+@log_audit('DELETE', 'Semester')
+def semester_delete(id):
+    semester = Semester.query.get_or_404(id)
+    if Nilai.query.filter_by(semester=semester.nama).first() or Raport.query.filter_by(semester=semester.nama).first():
+        flash('Semester masih dipakai oleh data nilai/raport dan tidak dapat dihapus.', 'danger')
+        return redirect(url_for('master.semester_list'))
+    db.session.delete(semester)
+    db.session.commit()
+    flash('Semester berhasil dihapus', 'success')
+    return redirect(url_for('master.semester_list'))
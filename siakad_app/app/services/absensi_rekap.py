@@ -0,0 +1,161 @@
+from collections import defaultdict
+from datetime import timedelta
+from sqlalchemy import func, extract, tuple_
+from app import db
+from app.models.akademik import Absensi, AbsensiRekap
+from app.services.bulk import upsert_insert
+
+# Absensi.status -> counter column of AbsensiRekap
+STATUS_COLUMNS = {
+    'Hadir': 'hadir',
+    'Sakit': 'sakit',
+    'Izin': 'izin',
+    'Alpha': 'alpha',
+}
+
+
+def _month_key(tanggal):
+    return tanggal.year, tanggal.month
+
+
+class AbsensiRekapService:
+    """
+    Keeps `absensi_rekap` (monthly counters per santri) in step with `absensi`.
+
+    Routes that write Absensi call `apply` with the +1/-1 changes before they commit,
+    so the rollup is always updated in the same transaction. Reads then touch one
+    row per month instead of one row per day.
+    """
+
+    @staticmethod
+    def apply(changes):
+        """
+        Apply attendance changes. `changes` is an iterable of (santri_id, tanggal, status, delta),
+        e.g. (5, date(2024, 8, 1), 'Hadir', 1) for a new row or -1 for a removed one.
+        Does not commit; the caller owns the transaction.
+        """
+        deltas = defaultdict(lambda: dict.fromkeys(STATUS_COLUMNS.values(), 0))
+        for santri_id, tanggal, status, delta in changes:
+            column = STATUS_COLUMNS.get(status)
+            if column is None or santri_id is None or tanggal is None:
+                continue
+            deltas[(santri_id,) + _month_key(tanggal)][column] += delta
+
+        rows = [
+            dict(santri_id=santri_id, tahun=tahun, bulan=bulan, **counts)
+            for (santri_id, tahun, bulan), counts in deltas.items()
+            if any(counts.values())
+        ]
+        if rows:
+            AbsensiRekapService._increment(rows)
+        return len(rows)
+
+    @staticmethod
+    def record(old=None, new=None):
+        """
+        Apply the change of a single Absensi row. `old`/`new` are (santri_id, tanggal, status)
+        before and after the write; pass None for an insert (old) or delete (new).
+        """
+        changes = []
+        if old is not None:
+            changes.append(tuple(old) + (-1,))
+        if new is not None:
+            changes.append(tuple(new) + (1,))
+        return AbsensiRekapService.apply(changes)
+
+    @staticmethod
+    def _increment(rows):
+        table = AbsensiRekap.__table__
+        counters = list(STATUS_COLUMNS.values())
+        insert = upsert_insert()
+        if insert is not None:
+            stmt = insert(table).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['santri_id', 'tahun', 'bulan'],
+                set_={col: table.c[col] + stmt.excluded[col] for col in counters}
+            )
+            db.session.execute(stmt)
+            return
+
+        # Other databases: UPDATE first, INSERT the months that did not exist yet
+        for row in rows:
+            updated = db.session.execute(
+                table.update()
+                .where(table.c.santri_id == row['santri_id'], table.c.tahun == row['tahun'],
+                       table.c.bulan == row['bulan'])
+                .values({col: table.c[col] + row[col] for col in counters})
+            ).rowcount
+            if not updated:
+                db.session.execute(table.insert().values(row))
+
+    @staticmethod
+    def rebuild(santri_ids=None):
+        """
+        Recompute the rollup from `absensi` (backfill / repair). Limited to `santri_ids` when given.
+        Does not commit.
+        """
+        delete = AbsensiRekap.query
+        if santri_ids is not None:
+            delete = delete.filter(AbsensiRekap.santri_id.in_(santri_ids))
+        delete.delete(synchronize_session=False)
+
+        tahun = extract('year', Absensi.tanggal)
+        bulan = extract('month', Absensi.tanggal)
+        counters = [
+            func.sum(db.case((Absensi.status == status, 1), else_=0))
+            for status in STATUS_COLUMNS
+        ]
+        select = db.select(Absensi.santri_id, tahun, bulan, *counters)\
+            .where(Absensi.santri_id.isnot(None), Absensi.tanggal.isnot(None))\
+            .group_by(Absensi.santri_id, tahun, bulan)
+        if santri_ids is not None:
+            select = select.where(Absensi.santri_id.in_(santri_ids))
+
+        result = db.session.execute(
+            AbsensiRekap.__table__.insert().from_select(
+                ['santri_id', 'tahun', 'bulan'] + list(STATUS_COLUMNS.values()), select
+            )
+        )
+        return result.rowcount
+
+    @staticmethod
+    def summary(santri_ids, start, end):
+        """
+        Attendance counts per santri between `start` and `end` (inclusive):
+        {santri_id: {'Hadir': n, 'Sakit': n, 'Izin': n, 'Alpha': n}}.
+
+        Whole months are read from the rollup; only the days of a partial first or last
+        month fall back to `absensi` (an index range scan on (santri_id, tanggal)).
+        """
+        summary = {sid: dict.fromkeys(STATUS_COLUMNS, 0) for sid in santri_ids}
+        if not santri_ids or start > end:
+            return summary
+
+        # First day of the first whole month, and first day after the last whole month
+        full_start = start if start.day == 1 else (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+        next_day = end + timedelta(days=1)
+        full_end = next_day if next_day.day == 1 else end.replace(day=1)
+
+        if full_start < full_end:
+            last_month = full_end - timedelta(days=1)
+            periode = tuple_(AbsensiRekap.tahun, AbsensiRekap.bulan)
+            for rekap in AbsensiRekap.query.filter(
+                    AbsensiRekap.santri_id.in_(santri_ids),
+                    periode >= tuple_(*_month_key(full_start)),
+                    periode <= tuple_(*_month_key(last_month))).all():
+                counts = summary[rekap.santri_id]
+                for status, column in STATUS_COLUMNS.items():
+                    counts[status] += getattr(rekap, column)
+            edges = [(start, full_start - timedelta(days=1)), (full_end, end)]
+        else:
+            edges = [(start, end)]
+
+        ranges = [db.and_(Absensi.tanggal >= lo, Absensi.tanggal <= hi) for lo, hi in edges if lo <= hi]
+        if ranges:
+            for santri_id, status, count in db.session.query(
+                    Absensi.santri_id, Absensi.status, func.count(Absensi.id)
+            ).filter(Absensi.santri_id.in_(santri_ids), db.or_(*ranges))\
+                    .group_by(Absensi.santri_id, Absensi.status).all():
+                if status in summary[santri_id]:
+                    summary[santri_id][status] += count
+        return summary
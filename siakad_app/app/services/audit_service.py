@@ -1,14 +1,15 @@
 from functools import wraps
-from flask import request
+from flask import request, current_app
 from flask_login import current_user
-from app import db
-from app.models.audit import AuditLog
 import json
 
 def record_audit(action, model_name=None, details=None, user_id=None):
     """
     Standalone function to log user actions.
     Can be used manually in routes (e.g., login/logout).
+
+    The event is handed to the AuditWriter and written in the background on its
+    own connection; the caller's session is neither flushed nor committed.
     """
     try:
         # Determine user_id: pass explicitly or use current_user
@@ -28,16 +29,14 @@ def record_audit(action, model_name=None, details=None, user_id=None):
         # With ProxyFix, remote_addr is the real client IP.
         ip_address = request.remote_addr
         
-        log = AuditLog(
-            user_id=user_id,
-            action=action,
-            model_name=model_name,
-            details=details_json,
-            ip_address=ip_address,
-            user_agent=request.user_agent.string if request.user_agent else None
-        )
-        db.session.add(log)
-        db.session.commit()
+        current_app.extensions['audit_writer'].submit({
+            'user_id': user_id,
+            'action': action,
+            'model_name': model_name,
+            'details': details_json,
+            'ip_address': ip_address,
+            'user_agent': request.user_agent.string if request.user_agent else None,
+        })
     except Exception as e:
         # Fail silently to not disrupt the main flow
         print(f"Audit Log Error: {e}")
@@ -0,0 +1,232 @@
+import os
+import json
+import queue
+import atexit
+import threading
+import time
+from datetime import datetime
+from app import db
+from app.models.audit import AuditLog
+
+# Marks the end of the queue on shutdown
+_STOP = object()
+
+
+class AuditWriter:
+    """
+    Writes audit events off the request path.
+
+    `submit` only puts the event on a bounded in-process queue; a daemon thread
+    collects up to AUDIT_BATCH_SIZE events (or whatever arrived within
+    AUDIT_FLUSH_INTERVAL_MS) and inserts them with one executemany INSERT on its
+    own connection, so an audited request never commits for the audit row and
+    never commits anything else left in its session.
+
+    Events that cannot be written (database down, or the queue is full) are
+    appended to the AUDIT_SPOOL_PATH file as JSON lines and replayed after the
+    next successful write, or with `flask replay-audit-spool`. The queue is
+    drained at interpreter exit.
+
+    With AUDIT_ASYNC off (tests) events are written synchronously, still on their
+    own connection.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._atexit = False
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.batch_size = app.config['AUDIT_BATCH_SIZE']
+        self.interval = app.config['AUDIT_FLUSH_INTERVAL_MS'] / 1000
+        self.spool_path = app.config['AUDIT_SPOOL_PATH']
+        self.asynchronous = app.config['AUDIT_ASYNC']
+        app.extensions['audit_writer'] = self
+
+    # --- Producer side ---
+
+    def submit(self, event):
+        """Queue one event (a dict of AuditLog columns). Never blocks, never raises."""
+        event.setdefault('timestamp', datetime.utcnow())
+        if not self.asynchronous:
+            self._write([event])
+            return
+        # Put under the lock, so nothing can land in a queue that `close` already detached
+        with self._lock:
+            self._ensure_thread()
+            try:
+                self._queue.put_nowait(event)
+                return
+            except queue.Full:
+                pass
+        self.app.logger.warning('Antrian audit penuh, event ditulis ke spool.')
+        self._spool([event])
+
+    def _ensure_thread(self):
+        # Called with the lock held. Started on first use, after close, and again in a
+        # forked worker, whose copy of the thread is gone
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        self._queue = queue.Queue(maxsize=self.app.config['AUDIT_QUEUE_MAX'])
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, args=(self._queue,), name='audit-writer', daemon=True)
+        self._thread.start()
+        if not self._atexit:
+            atexit.register(self.close)
+            self._atexit = True
+
+    def close(self, timeout=5.0):
+        """Write everything queued and stop the writer thread."""
+        with self._lock:
+            thread, events = self._thread, self._queue
+            if thread is None or self._pid != os.getpid():
+                return
+            # Detached: later submits start a fresh queue and thread
+            self._thread = self._queue = None
+        try:
+            events.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass # The thread is stuck; what it did not take is written below
+        thread.join(timeout)
+        # Left behind when the thread did not stop in time; written here (or spooled)
+        rest = []
+        while True:
+            try:
+                event = events.get_nowait()
+            except queue.Empty:
+                break
+            if event is not _STOP:
+                rest.append(event)
+        if rest:
+            self._write(rest)
+
+    def flush(self, timeout=5.0):
+        """Block until the events queued so far are written (at most `timeout` seconds)."""
+        events = self._queue
+        if events is None or self._pid != os.getpid():
+            return
+        # queue.join() with a deadline
+        deadline = time.monotonic() + timeout
+        with events.all_tasks_done:
+            while events.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not events.all_tasks_done.wait(remaining):
+                    return
+
+    # --- Writer thread ---
+
+    def _run(self, events):
+        stopping = False
+        while not stopping:
+            event = events.get()
+            if event is _STOP:
+                events.task_done()
+                break
+            batch = [event]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    event = events.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if event is _STOP:
+                    events.task_done()
+                    stopping = True
+                    break
+                batch.append(event)
+            self._write(batch)
+            for _ in batch:
+                events.task_done()
+
+    def _insert(self, events):
+        with self.app.app_context():
+            with db.engine.begin() as connection:
+                connection.execute(AuditLog.__table__.insert(), events)
+
+    def _write(self, events):
+        try:
+            self._insert(events)
+        except Exception as e:
+            self.app.logger.error(f'Audit log gagal ditulis ({len(events)} event), disimpan ke spool: {e}')
+            self._spool(events)
+            return
+        if os.path.exists(self.spool_path):
+            try:
+                self.replay_spool()
+            except Exception as e:
+                self.app.logger.error(f'Replay spool audit gagal: {e}')
+
+    # --- Spool file ---
+
+    def _spool(self, events):
+        try:
+            os.makedirs(os.path.dirname(self.spool_path), exist_ok=True)
+            with self._lock:
+                # A crash mid-write leaves a partial last line; start on a fresh one so
+                # only that line is unreadable, not the next event as well
+                partial = False
+                if os.path.exists(self.spool_path) and os.path.getsize(self.spool_path):
+                    with open(self.spool_path, 'rb') as f:
+                        f.seek(-1, os.SEEK_END)
+                        partial = f.read(1) != b'\n'
+                with open(self.spool_path, 'a', encoding='utf-8') as f:
+                    if partial:
+                        f.write('\n')
+                    for event in events:
+                        f.write(json.dumps({**event, 'timestamp': event['timestamp'].isoformat()}) + '\n')
+        except OSError as e:
+            self.app.logger.error(f'Spool audit gagal ditulis, {len(events)} event hilang: {e}')
+
+    def replay_spool(self):
+        """
+        Insert the spooled events. Returns the number written. Unreadable lines are
+        logged and skipped; events that cannot be written go back to the spool.
+        """
+        # Renamed first, so another worker replaying at the same time gets nothing twice
+        claimed = f'{self.spool_path}.{os.getpid()}.{threading.get_ident()}'
+        try:
+            os.replace(self.spool_path, claimed)
+        except FileNotFoundError:
+            return 0
+
+        events = []
+        try:
+            with open(claimed, encoding='utf-8', errors='replace') as f:
+                for nomor, line in enumerate(f, start=1):
+                    if not line.strip():
+                        continue
+                    try:
+                        event = json.loads(line)
+                        event['timestamp'] = datetime.fromisoformat(event['timestamp'])
+                    except (ValueError, KeyError, TypeError) as e:
+                        # Kept in the log so the event can still be recovered by hand
+                        self.app.logger.error(f'Baris {nomor} spool audit tidak valid, dilewati ({e}): {line.strip()}')
+                        continue
+                    events.append(event)
+        except OSError as e:
+            # Left under its claimed name rather than deleted unread
+            self.app.logger.error(f'Spool audit {claimed} gagal dibaca: {e}')
+            return 0
+
+        written = 0
+        try:
+            for start in range(0, len(events), self.batch_size):
+                batch = events[start:start + self.batch_size]
+                self._insert(batch)
+                written += len(batch)
+        except Exception as e:
+            self.app.logger.error(f'Replay spool audit gagal: {e}')
+        finally:
+            if written < len(events):
+                self._spool(events[written:])
+            os.remove(claimed)
+        return written
@@ -0,0 +1,163 @@
+import os
+import hashlib
+import mimetypes
+import tempfile
+from datetime import datetime, timedelta
+from flask import current_app
+from app import db
+from app.models.berkas import Berkas
+from app.services.bulk import upsert_insert
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+# Bytes read from the upload per step while hashing/writing
+CHUNK_SIZE = 64 * 1024
+
+# Extensions that get a preview; anything else (pdf) is stored with thumbnail='none'
+GAMBAR = ('jpg', 'png')
+
+# Spellings folded together so the same content is not stored twice under two names
+EKSTENSI_ALIAS = {'jpeg': 'jpg'}
+
+
+class BerkasService:
+    """
+    Content-addressed storage for uploads.
+
+    An upload is streamed to a temporary file while its SHA-256 is computed, then
+    moved to BERKAS_DIR/ab/cd/<sha256>.<ext> (sharded on the first hex pairs so no
+    directory grows too large). Identical content is kept once: the second upload
+    finds the file and the `berkas` row already there. Files never change after
+    they are written, so they can be served with a long cache lifetime.
+
+    Thumbnails are not made during the upload request; new images are queued
+    (thumbnail='pending') and rendered by the background worker (`flask pdf-worker`)
+    or `flask thumbnail-berkas`.
+    """
+
+    @staticmethod
+    def _dir(sha256):
+        return os.path.join(current_app.config['BERKAS_DIR'], sha256[:2], sha256[2:4])
+
+    @staticmethod
+    def path(berkas):
+        return os.path.join(BerkasService._dir(berkas.sha256), f'{berkas.sha256}.{berkas.ekstensi}')
+
+    @staticmethod
+    def thumbnail_path(berkas):
+        return os.path.join(BerkasService._dir(berkas.sha256), f'{berkas.sha256}.thumb.jpg')
+
+    @staticmethod
+    def mimetype(berkas):
+        return mimetypes.guess_type(f'x.{berkas.ekstensi}')[0] or 'application/octet-stream'
+
+    @staticmethod
+    def simpan(file_storage):
+        """
+        Store an uploaded werkzeug FileStorage and return its Berkas (added to the
+        session, not committed). Re-uploading known content returns the existing row.
+        """
+        ekstensi = os.path.splitext(file_storage.filename or '')[1].lower().lstrip('.')
+        ekstensi = EKSTENSI_ALIAS.get(ekstensi, ekstensi) or 'bin'
+
+        root = current_app.config['BERKAS_DIR']
+        os.makedirs(root, exist_ok=True)
+        digest = hashlib.sha256()
+        ukuran = 0
+        # Same filesystem as the final location, so the move below is a rename
+        with tempfile.NamedTemporaryFile(dir=root, suffix='.tmp', delete=False) as tmp:
+            try:
+                for chunk in iter(lambda: file_storage.stream.read(CHUNK_SIZE), b''):
+                    digest.update(chunk)
+                    tmp.write(chunk)
+                    ukuran += len(chunk)
+            except BaseException:
+                tmp.close()
+                os.remove(tmp.name)
+                raise
+        sha256 = digest.hexdigest()
+
+        berkas = db.session.get(Berkas, sha256)
+        path = os.path.join(BerkasService._dir(sha256), f'{sha256}.{berkas.ekstensi if berkas else ekstensi}')
+        if os.path.exists(path):
+            os.remove(tmp.name)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp.name, path)
+
+        if berkas is None:
+            row = {'sha256': sha256, 'ekstensi': ekstensi, 'ukuran': ukuran,
+                   'thumbnail': 'pending' if ekstensi in GAMBAR else 'none'}
+            insert = upsert_insert()
+            if insert is not None:
+                # A concurrent upload of the same content may have inserted it meanwhile
+                db.session.execute(insert(Berkas.__table__).values(row).on_conflict_do_nothing())
+                berkas = db.session.get(Berkas, sha256)
+            else:
+                berkas = Berkas(**row)
+                db.session.add(berkas)
+        return berkas
+
+    @staticmethod
+    def buat_thumbnail(berkas):
+        """Render the JPEG preview of an image Berkas. Raises on an unreadable image."""
+        if Image is None:
+            raise RuntimeError('Pillow tidak tersedia.')
+        size = current_app.config['THUMBNAIL_SIZE']
+        target = BerkasService.thumbnail_path(berkas)
+        with Image.open(BerkasService.path(berkas)) as image:
+            # draft() lets the JPEG decoder skip most of the full-size pixels
+            image.draft('RGB', (size, size))
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((size, size))
+            tmp_path = f'{target}.{os.getpid()}.tmp'
+            image.convert('RGB').save(tmp_path, 'JPEG', quality=80, optimize=True)
+        os.replace(tmp_path, target)
+
+    @staticmethod
+    def requeue_stale_thumbnails():
+        """
+        Put 'running' thumbnails whose worker died (claimed longer than THUMBNAIL_TIMEOUT
+        ago) back to 'pending'. One that already used THUMBNAIL_MAX_ATTEMPTS is marked
+        failed instead, so an image that crashes the renderer is not retried forever.
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=current_app.config['THUMBNAIL_TIMEOUT'])
+        max_attempts = current_app.config['THUMBNAIL_MAX_ATTEMPTS']
+        stale = [Berkas.thumbnail == 'running', Berkas.claimed_at < cutoff]
+        Berkas.query.filter(*stale, Berkas.attempts >= max_attempts)\
+            .update({'thumbnail': 'failed'}, synchronize_session=False)
+        count = Berkas.query.filter(*stale).update({'thumbnail': 'pending'}, synchronize_session=False)
+        db.session.commit()
+        return count
+
+    @staticmethod
+    def proses_thumbnail(limit=20, ulang=False):
+        """
+        Render up to `limit` pending thumbnails (also failed ones with `ulang`).
+        Each row is claimed with a conditional UPDATE, so several workers can share
+        the queue. Returns the number processed.
+        """
+        statuses = ('pending', 'failed') if ulang else ('pending',)
+        candidates = [sha for (sha,) in db.session.query(Berkas.sha256)
+                      .filter(Berkas.thumbnail.in_(statuses)).order_by(Berkas.created_at).limit(limit)]
+        processed = 0
+        for sha256 in candidates:
+            claimed = Berkas.query.filter(Berkas.sha256 == sha256, Berkas.thumbnail.in_(statuses))\
+                .update({'thumbnail': 'running', 'claimed_at': datetime.utcnow(),
+                         'attempts': Berkas.attempts + 1}, synchronize_session=False)
+            db.session.commit()
+            if not claimed:
+                continue # Another worker was faster
+
+            berkas = db.session.get(Berkas, sha256)
+            try:
+                BerkasService.buat_thumbnail(berkas)
+                berkas.thumbnail = 'done'
+            except Exception as e:
+                current_app.logger.error(f'Thumbnail {sha256} gagal: {e}')
+                berkas.thumbnail = 'failed'
+            db.session.commit()
+            processed += 1
+        return processed
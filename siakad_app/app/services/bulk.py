@@ -0,0 +1,64 @@
+from sqlalchemy import tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from app import db
+
+_UPSERT_DIALECTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+def upsert_insert(connection=None):
+    """
+    The dialect-specific `insert` supporting ON CONFLICT for `connection` (the
+    session's bind by default), or None on databases without one; callers then
+    take their own SELECT/UPDATE-then-INSERT path.
+    """
+    bind = connection if connection is not None else db.session.get_bind()
+    return _UPSERT_DIALECTS.get(bind.dialect.name)
+
+def bulk_upsert(model, rows, index_elements, update_columns):
+    """
+    Insert `rows` (list of dicts) into `model`'s table, updating `update_columns`
+    when a row with the same `index_elements` (a unique key) already exists.
+
+    Uses a single INSERT ... ON CONFLICT DO UPDATE on PostgreSQL and SQLite.
+    Does not commit; the caller owns the transaction.
+    """
+    if not rows:
+        return 0
+
+    insert = upsert_insert()
+    if insert is None:
+        return _bulk_upsert_fallback(model, rows, index_elements, update_columns)
+
+    stmt = insert(model.__table__).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={col: stmt.excluded[col] for col in update_columns}
+    )
+    db.session.execute(stmt)
+    return len(rows)
+
+def _bulk_upsert_fallback(model, rows, index_elements, update_columns):
+    # One SELECT for the existing keys, then one batched UPDATE and one batched INSERT
+    key_cols = [getattr(model, col) for col in index_elements]
+    keys = [tuple(row[col] for col in index_elements) for row in rows]
+    existing = {
+        tuple(r[:-1]): r[-1]
+        for r in db.session.query(*key_cols, model.id).filter(tuple_(*key_cols).in_(keys)).all()
+    }
+
+    updates, inserts = [], []
+    for key, row in zip(keys, rows):
+        if key in existing:
+            mapping = {col: row[col] for col in update_columns}
+            mapping['id'] = existing[key]
+            updates.append(mapping)
+        else:
+            inserts.append(row)
+
+    if updates:
+        db.session.bulk_update_mappings(model, updates)
+    if inserts:
+        db.session.bulk_insert_mappings(model, inserts)
+    return len(rows)
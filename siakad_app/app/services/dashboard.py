@@ -0,0 +1,151 @@
+import time
+from datetime import date
+from decimal import Decimal
+from flask import has_app_context
+from sqlalchemy import event, literal, cast, func, Numeric, String
+from app import db, cache
+from app.models.akademik import Santri, Pengajar, Kelas, MataPelajaran, Absensi
+from app.models.keuangan import Keuangan, TransaksiKeuangan
+
+GENERATION_KEY = 'dashboard_generation'
+CACHE_KEY = 'dashboard_stats:{generation}:{tanggal}:{scope}'
+
+# Roles that see the finance figures (same roles as the Keuangan menu)
+KEUANGAN_ROLES = ('admin', 'ustadz')
+
+# Models whose rows feed the dashboard figures
+_SOURCES = (Santri, Pengajar, Kelas, MataPelajaran, Absensi, Keuangan, TransaksiKeuangan)
+
+
+class DashboardService:
+    """
+    Dashboard figures, read with a single UNION ALL aggregate statement.
+
+    Results are cached in the shared cache under a role-aware key (wali_santri
+    users only see their own children, finance figures only go to KEUANGAN_ROLES).
+    Keys carry a generation number that is bumped after any commit touching the
+    source tables (see the session hooks below), so the dashboard costs no query
+    until something changes, and never shows figures older than the last commit.
+    """
+
+    @staticmethod
+    def _scope(user):
+        if user.role == 'wali_santri':
+            return f'wali_santri:{user.id}'
+        return user.role if user.role in KEUANGAN_ROLES else 'umum'
+
+    @staticmethod
+    def _generation():
+        generation = cache.get(GENERATION_KEY)
+        if generation is None:
+            # Seeded from the clock so keys written before an eviction are never reused
+            cache.add(GENERATION_KEY, time.time_ns(), timeout=0)
+            generation = cache.get(GENERATION_KEY)
+        return generation
+
+    @staticmethod
+    def get_stats(user, today=None):
+        today = today or date.today()
+        key = CACHE_KEY.format(generation=DashboardService._generation(), tanggal=today.isoformat(),
+                               scope=DashboardService._scope(user))
+        stats = cache.get(key)
+        if stats is None:
+            wali_user_id = user.id if user.role == 'wali_santri' else None
+            stats = DashboardService.compute(today, wali_user_id=wali_user_id,
+                                             keuangan=user.role in KEUANGAN_ROLES)
+            # Bounded by the day in the key; old generations simply age out
+            cache.set(key, stats, timeout=24 * 3600)
+        return stats
+
+    @staticmethod
+    def compute(today, wali_user_id=None, keuangan=True):
+        """
+        All figures in one statement of (metrik, kunci, nilai) rows.
+        With `wali_user_id`, santri and absensi figures only cover that user's children.
+        """
+        def row(metrik, value, kunci=None):
+            return (literal(metrik, String).label('metrik'),
+                    (kunci if kunci is not None else literal('', String)).label('kunci'),
+                    cast(value, Numeric(15, 2)).label('nilai'))
+
+        santri_filter = [Santri.wali_user_id == wali_user_id] if wali_user_id else []
+        absensi_filter = [Absensi.tanggal == today]
+        if wali_user_id:
+            absensi_filter.append(Absensi.santri_id.in_(db.select(Santri.id).where(*santri_filter)))
+
+        parts = [
+            db.select(*row('santri', func.count())).select_from(Santri).where(*santri_filter),
+            db.select(*row('pengajar', func.count())).select_from(Pengajar),
+            db.select(*row('kelas', func.count())).select_from(Kelas),
+            db.select(*row('mapel', func.count())).select_from(MataPelajaran),
+            db.select(*row('santri_aktif', func.count(), func.coalesce(Santri.jenjang, '-')))
+                .where(Santri.status == 'aktif', *santri_filter)
+                .group_by(func.coalesce(Santri.jenjang, '-')),
+            db.select(*row('absensi', func.count(), Absensi.status))
+                .where(*absensi_filter).group_by(Absensi.status),
+        ]
+        if keuangan:
+            awal_bulan = today.replace(day=1)
+            parts += [
+                db.select(*row('pemasukan', func.coalesce(func.sum(TransaksiKeuangan.jumlah), 0)))
+                    .where(TransaksiKeuangan.jenis == 'masuk',
+                           TransaksiKeuangan.tanggal >= awal_bulan, TransaksiKeuangan.tanggal <= today),
+                db.select(*row('spp', func.coalesce(func.sum(Keuangan.jumlah), 0)))
+                    .where(Keuangan.status == 'Lunas',
+                           Keuangan.tanggal_bayar >= awal_bulan, Keuangan.tanggal_bayar <= today),
+            ]
+
+        stats = {
+            'total_santri': 0, 'total_pengajar': 0, 'total_kelas': 0, 'total_mapel': 0,
+            'santri_aktif': {}, 'absensi': {}, 'absensi_total': 0, 'kehadiran_persen': None,
+            'pemasukan_bulan_ini': None, 'spp_bulan_ini': None,
+        }
+        for metrik, kunci, nilai in db.session.execute(db.union_all(*parts)):
+            nilai = Decimal(nilai or 0)
+            if metrik in ('santri', 'pengajar', 'kelas', 'mapel'):
+                stats[f'total_{metrik}'] = int(nilai)
+            elif metrik == 'santri_aktif':
+                stats['santri_aktif'][kunci] = int(nilai)
+            elif metrik == 'absensi':
+                stats['absensi'][kunci] = int(nilai)
+            else:
+                stats[f'{metrik}_bulan_ini'] = nilai
+
+        stats['santri_aktif'] = dict(sorted(stats['santri_aktif'].items()))
+        stats['absensi_total'] = sum(stats['absensi'].values())
+        if stats['absensi_total']:
+            stats['kehadiran_persen'] = round(stats['absensi'].get('Hadir', 0) * 100 / stats['absensi_total'], 1)
+        return stats
+
+    @staticmethod
+    def mark_dirty():
+        """
+        Invalidate on the next commit. Needed for bulk Core statements
+        (e.g. bulk_upsert) which bypass the ORM flush hooks.
+        """
+        db.session.info['dashboard_dirty'] = True
+
+    @staticmethod
+    def invalidate():
+        if cache.get(GENERATION_KEY) is None:
+            cache.set(GENERATION_KEY, time.time_ns(), timeout=0)
+        else:
+            # Backend increment: atomic on Redis/Memcached
+            cache.cache.inc(GENERATION_KEY)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_dashboard_changes(session, flush_context):
+    if any(isinstance(obj, _SOURCES) for obj in list(session.new) + list(session.dirty) + list(session.deleted)):
+        session.info['dashboard_dirty'] = True
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_dashboard(session):
+    if session.info.pop('dashboard_dirty', False) and has_app_context():
+        DashboardService.invalidate()
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_dashboard_changes(session):
+    session.info.pop('dashboard_dirty', None)
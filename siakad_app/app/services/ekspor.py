@@ -0,0 +1,143 @@
+import csv
+import io
+import tempfile
+from datetime import datetime, time, timedelta
+from flask import Response, stream_with_context
+from app import db
+from app.models.akademik import Santri
+from app.models.keuangan import Keuangan, PosKeuangan, TransaksiKeuangan, TabunganSantri
+try:
+    from openpyxl import Workbook
+except ImportError:
+    Workbook = None
+
+FORMATS = ('csv', 'xlsx')
+
+MIMETYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+# Rows read from the database per round trip (server-side cursor on PostgreSQL)
+BATCH_SIZE = 1000
+
+# CSV rows buffered per chunk sent to the client
+CSV_ROWS_PER_CHUNK = 200
+
+# Bytes per chunk when sending the finished XLSX file
+XLSX_CHUNK_SIZE = 64 * 1024
+
+
+def _iter_rows(query):
+    # A generator function, so the query only runs once the response iterates it
+    for row in query.yield_per(BATCH_SIZE):
+        yield list(row)
+
+
+class EksporService:
+    """
+    Spreadsheet exports of the finance tables with constant memory.
+
+    Rows come from `yield_per` queries (a server-side cursor on PostgreSQL) and
+    pass through a generator straight into the response. CSV is sent while it is
+    being read; XLSX is written by openpyxl in write-only mode, which spools rows
+    to a temporary file, and that file is sent in chunks once complete.
+
+    Each dataset method returns (header, rows) where `rows` is a generator that
+    only touches the database when the response starts iterating it.
+    """
+
+    @staticmethod
+    def xlsx_available():
+        return Workbook is not None
+
+    # --- Datasets ---
+
+    @staticmethod
+    def transaksi(start_date=None, end_date=None):
+        query = db.session.query(
+            TransaksiKeuangan.tanggal, PosKeuangan.nama, TransaksiKeuangan.jenis,
+            TransaksiKeuangan.keterangan, TransaksiKeuangan.metode_pembayaran, TransaksiKeuangan.jumlah
+        ).join(PosKeuangan, TransaksiKeuangan.pos_id == PosKeuangan.id)
+        if start_date:
+            query = query.filter(TransaksiKeuangan.tanggal >= start_date)
+        if end_date:
+            query = query.filter(TransaksiKeuangan.tanggal <= end_date)
+        query = query.order_by(TransaksiKeuangan.tanggal, TransaksiKeuangan.id)
+
+        header = ['Tanggal', 'Kategori', 'Jenis', 'Keterangan', 'Metode', 'Jumlah']
+        return header, _iter_rows(query)
+
+    @staticmethod
+    def pembayaran(dari=None, sampai=None):
+        """SPP payments of the periods `dari`..`sampai` (tahun*100+bulan, both optional)."""
+        query = db.session.query(
+            Keuangan.tahun, Keuangan.bulan, Santri.nis, Santri.nama,
+            Keuangan.jumlah, Keuangan.status, Keuangan.tanggal_bayar
+        ).join(Santri, Keuangan.santri_id == Santri.id)
+        if dari:
+            query = query.filter(Keuangan.periode >= dari)
+        if sampai:
+            query = query.filter(Keuangan.periode <= sampai)
+        query = query.order_by(Keuangan.periode, Santri.nama, Keuangan.id)
+
+        header = ['Tahun', 'Bulan', 'NIS', 'Nama', 'Jumlah', 'Status', 'Tanggal Bayar']
+        return header, _iter_rows(query)
+
+    @staticmethod
+    def tabungan(start_date=None, end_date=None):
+        query = db.session.query(
+            TabunganSantri.tanggal, Santri.nis, Santri.nama, TabunganSantri.jenis,
+            TabunganSantri.jumlah, TabunganSantri.saldo_akhir, TabunganSantri.keterangan
+        ).join(Santri, TabunganSantri.santri_id == Santri.id)
+        # tanggal is a DateTime: compare against day boundaries so the index is used
+        if start_date:
+            query = query.filter(TabunganSantri.tanggal >= datetime.combine(start_date, time.min))
+        if end_date:
+            query = query.filter(TabunganSantri.tanggal < datetime.combine(end_date + timedelta(days=1), time.min))
+        query = query.order_by(TabunganSantri.tanggal, TabunganSantri.id)
+
+        header = ['Tanggal', 'NIS', 'Nama', 'Jenis', 'Jumlah', 'Saldo Akhir', 'Keterangan']
+        return header, _iter_rows(query)
+
+    # --- Writers ---
+
+    @staticmethod
+    def iter_csv(header, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(header)
+        for count, row in enumerate(rows, start=1):
+            writer.writerow(['' if value is None else value for value in row])
+            if count % CSV_ROWS_PER_CHUNK == 0:
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue().encode('utf-8')
+
+    @staticmethod
+    def iter_xlsx(header, rows, title='Data'):
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet(title[:31])
+        sheet.append(header)
+        for row in rows:
+            sheet.append(row)
+        with tempfile.TemporaryFile() as output:
+            workbook.save(output)
+            output.seek(0)
+            yield from iter(lambda: output.read(XLSX_CHUNK_SIZE), b'')
+
+    @staticmethod
+    def response(filename, header, rows, fmt='csv', title='Data'):
+        """
+        Streamed download of `rows` as `filename`.`fmt`. The database is read
+        while the response is sent, inside the request context.
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f'Format ekspor tidak dikenal: {fmt}')
+        if fmt == 'xlsx':
+            body = EksporService.iter_xlsx(header, rows, title)
+        else:
+            body = EksporService.iter_csv(header, rows)
+        return Response(stream_with_context(body), mimetype=MIMETYPES[fmt],
+                        headers={'Content-Disposition': f'attachment; filename={filename}.{fmt}'})
@@ -0,0 +1,248 @@
+import io
+import os
+import csv
+import time
+import uuid
+import itertools
+from datetime import date, datetime
+from flask import current_app
+from app import db
+from app.models.akademik import Santri, Kelas
+from app.services.referensi import ReferensiCache
+from app.services.rekonsiliasi import parse_tanggal
+try:
+    from openpyxl import load_workbook
+except ImportError:
+    load_workbook = None
+
+FORMATS = ('csv', 'xlsx')
+
+# Valid rows inserted per bulk_insert_mappings call
+BATCH_SIZE = 500
+
+# Rejected rows kept in memory for the result page; all of them go to the report file
+CONTOH_DITOLAK = 20
+
+# Accepted header names per field (lowercase)
+KOLOM = {
+    'nis': ('nis', 'no induk', 'nomor induk'),
+    'nama': ('nama', 'nama lengkap', 'nama santri'),
+    'jenis_kelamin': ('jenis kelamin', 'jenis_kelamin', 'jk', 'l/p'),
+    'tanggal_lahir': ('tanggal lahir', 'tanggal_lahir', 'tgl lahir'),
+    'alamat': ('alamat',),
+    'jenjang': ('jenjang',),
+    'kelas': ('kelas', 'nama kelas', 'nama_kelas'),
+    'status': ('status',),
+}
+KOLOM_WAJIB = ('nis', 'nama', 'jenis_kelamin', 'tanggal_lahir')
+
+JENIS_KELAMIN = {'l': 'L', 'laki-laki': 'L', 'laki laki': 'L', 'p': 'P', 'perempuan': 'P'}
+JENJANG = ('SD', 'SMP', 'SMA')
+STATUS = ('aktif', 'lulus', 'keluar')
+
+
+class FormatImporTidakDikenal(ValueError):
+    """The file is not a CSV/XLSX with the required columns."""
+    pass
+
+
+def _teks(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value) # NIS typed as a number in a spreadsheet
+    return ' '.join(str(value).split())
+
+
+class ImporSantriService:
+    """
+    Bulk santri import (PPDB) from an uploaded CSV or XLSX.
+
+    The file is read row by row (XLSX through openpyxl's read-only mode) and
+    every row is validated in memory: NIS uniqueness against one preloaded set
+    of existing NIS (extended with the rows accepted so far), kelas names
+    against the cached kelas map. Valid rows are written with
+    `bulk_insert_mappings` in batches of BATCH_SIZE; rejected rows are written
+    to a CSV report under IMPOR_DIR that can be downloaded afterwards.
+    """
+
+    @staticmethod
+    def _baris_csv(stream):
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace', newline='')
+        head = text.read(4096) + text.readline()
+        try:
+            dialect = csv.Sniffer().sniff(head, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        yield from csv.reader(itertools.chain(io.StringIO(head), text), dialect=dialect)
+
+    @staticmethod
+    def _baris_xlsx(stream):
+        if load_workbook is None:
+            raise FormatImporTidakDikenal('Impor XLSX membutuhkan paket openpyxl.')
+        try:
+            workbook = load_workbook(stream, read_only=True, data_only=True)
+        except Exception:
+            raise FormatImporTidakDikenal('File XLSX tidak dapat dibaca.')
+        try:
+            yield from workbook.active.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+
+    @staticmethod
+    def baca(stream, fmt):
+        """
+        Rows of the uploaded file as (nomor_baris, {field: value}) using the header
+        aliases of KOLOM. Empty lines are skipped.
+        """
+        baris = ImporSantriService._baris_xlsx(stream) if fmt == 'xlsx' else ImporSantriService._baris_csv(stream)
+        header = next(baris, None) or []
+        posisi = {}
+        normal = [_teks(h).lower() for h in header]
+        for field, aliases in KOLOM.items():
+            for i, name in enumerate(normal):
+                if name in aliases:
+                    posisi[field] = i
+                    break
+        hilang = [f for f in KOLOM_WAJIB if f not in posisi]
+        if hilang:
+            raise FormatImporTidakDikenal(f"Kolom wajib tidak ditemukan: {', '.join(hilang)}.")
+
+        for nomor, row in enumerate(baris, start=2):
+            if not row or all(v is None or _teks(v) == '' for v in row):
+                continue
+            yield nomor, {f: (row[i] if i < len(row) else None) for f, i in posisi.items()}
+
+    @staticmethod
+    def validasi(row, nis_terpakai, kelas_map):
+        """
+        Check one row; returns (mapping, None) for a valid row or (None, alasan).
+        `nis_terpakai` is the set of NIS already taken; `kelas_map` maps
+        lowercase kelas names to (id, jenjang).
+        """
+        nis = _teks(row.get('nis'))
+        nama = _teks(row.get('nama'))
+        if not nis:
+            return None, 'NIS kosong'
+        if len(nis) > 20:
+            return None, 'NIS lebih dari 20 karakter'
+        if nis in nis_terpakai:
+            return None, 'NIS sudah terdaftar'
+        if not nama:
+            return None, 'Nama kosong'
+        if len(nama) > 100:
+            return None, 'Nama lebih dari 100 karakter'
+
+        jenis_kelamin = JENIS_KELAMIN.get(_teks(row.get('jenis_kelamin')).lower())
+        if jenis_kelamin is None:
+            return None, 'Jenis kelamin harus L atau P'
+
+        tanggal_lahir = row.get('tanggal_lahir')
+        if isinstance(tanggal_lahir, datetime):
+            tanggal_lahir = tanggal_lahir.date()
+        elif not isinstance(tanggal_lahir, date):
+            tanggal_lahir = parse_tanggal(_teks(tanggal_lahir))
+        if tanggal_lahir is None:
+            return None, 'Tanggal lahir tidak valid'
+
+        kelas_id = None
+        jenjang = _teks(row.get('jenjang')).upper() or None
+        nama_kelas = _teks(row.get('kelas'))
+        if nama_kelas:
+            kelas = kelas_map.get(nama_kelas.lower())
+            if kelas is None:
+                return None, f'Kelas "{nama_kelas}" tidak ditemukan'
+            kelas_id = kelas[0]
+            jenjang = jenjang or kelas[1]
+        if jenjang not in JENJANG:
+            return None, 'Jenjang harus SD, SMP atau SMA'
+
+        status = _teks(row.get('status')).lower() or 'aktif'
+        if status not in STATUS:
+            return None, 'Status harus aktif, lulus atau keluar'
+
+        return {
+            'nis': nis,
+            'nama': nama,
+            # Set by Santri's validator for ORM inserts; bulk_insert_mappings bypasses it
+            'nama_cari': Santri.normalize_nama(nama),
+            'jenis_kelamin': jenis_kelamin,
+            'tanggal_lahir': tanggal_lahir,
+            'alamat': _teks(row.get('alamat')) or None,
+            'jenjang': jenjang,
+            'status': status,
+            'kelas_id': kelas_id,
+        }, None
+
+    @staticmethod
+    def _laporan_dir():
+        path = current_app.config['IMPOR_DIR']
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    @staticmethod
+    def laporan_path(token):
+        return os.path.join(current_app.config['IMPOR_DIR'], f'{token}.csv')
+
+    @staticmethod
+    def bersihkan_laporan():
+        """Remove error reports older than IMPOR_RETENTION seconds."""
+        path = current_app.config['IMPOR_DIR']
+        if not os.path.isdir(path):
+            return
+        batas = time.time() - current_app.config['IMPOR_RETENTION']
+        for name in os.listdir(path):
+            full = os.path.join(path, name)
+            if name.endswith('.csv') and os.path.getmtime(full) < batas:
+                os.remove(full)
+
+    @staticmethod
+    def impor(stream, fmt):
+        """
+        Import santri from a binary stream of a CSV or XLSX file. Returns
+        {'baris', 'dibuat', 'ditolak', 'contoh', 'laporan'}: `contoh` holds the first
+        rejected rows as (nomor_baris, nis, nama, alasan), `laporan` the token of the
+        error report (None when every row was accepted). Does not commit.
+        """
+        if fmt not in FORMATS:
+            raise FormatImporTidakDikenal('Format file harus CSV atau XLSX.')
+        rows = ImporSantriService.baca(stream, fmt)
+        # Reads the header, so an unusable file fails before anything is written
+        first = next(rows, None)
+
+        nis_terpakai = {nis for (nis,) in db.session.query(Santri.nis)}
+        kelas_map = {k['nama_kelas'].strip().lower(): (k['id'], k['jenjang']) for k in ReferensiCache.rows(Kelas)}
+
+        hasil = {'baris': 0, 'dibuat': 0, 'ditolak': 0, 'contoh': [], 'laporan': None}
+        laporan = writer = None
+        batch = []
+        try:
+            for nomor, row in itertools.chain([first] if first else [], rows):
+                hasil['baris'] += 1
+                mapping, alasan = ImporSantriService.validasi(row, nis_terpakai, kelas_map)
+                if mapping is not None:
+                    nis_terpakai.add(mapping['nis'])
+                    batch.append(mapping)
+                    if len(batch) >= BATCH_SIZE:
+                        db.session.bulk_insert_mappings(Santri, batch)
+                        hasil['dibuat'] += len(batch)
+                        batch = []
+                    continue
+
+                hasil['ditolak'] += 1
+                if len(hasil['contoh']) < CONTOH_DITOLAK:
+                    hasil['contoh'].append((nomor, _teks(row.get('nis')), _teks(row.get('nama')), alasan))
+                if writer is None:
+                    hasil['laporan'] = uuid.uuid4().hex
+                    laporan = open(os.path.join(ImporSantriService._laporan_dir(), f"{hasil['laporan']}.csv"),
+                                   'w', encoding='utf-8', newline='')
+                    writer = csv.writer(laporan)
+                    writer.writerow(['Baris', 'Alasan'] + list(KOLOM))
+                writer.writerow([nomor, alasan] + [_teks(row.get(f)) for f in KOLOM])
+        finally:
+            if laporan is not None:
+                laporan.close()
+        if batch:
+            db.session.bulk_insert_mappings(Santri, batch)
+            hasil['dibuat'] += len(batch)
+        return hasil
@@ -0,0 +1,109 @@
+from sqlalchemy import case, func, literal, or_, and_
+from app import db
+from app.models.akademik import Santri, Raport
+
+# Target of a kelas whose promoted santri graduate instead of moving up
+LULUS = 'lulus'
+
+# Outcomes of one santri, from Raport.status_kenaikan ('Naik Kelas', 'Tinggal Kelas', 'Lulus')
+NAIK = 'naik'
+TINGGAL = 'tinggal'
+TANPA_RAPORT = 'tanpa_raport'
+
+
+class KenaikanKelasService:
+    """
+    Year-end promotion of the active santri of the mapped kelas, driven by the
+    status_kenaikan of their raport for one semester.
+
+    `mapping` is {kelas_asal_id: kelas_tujuan_id or LULUS}. Per santri:
+      - 'Naik Kelas': moves to the target kelas, or graduates when the target is LULUS
+      - 'Lulus': graduates (status 'lulus', kelas kept for the record)
+      - 'Tinggal Kelas' or no raport: stays where they are
+
+    The preview is one GROUP BY over santri joined to their raport; applying is
+    two UPDATE ... WHERE statements (graduations, then all moves with one CASE on
+    kelas_id, so chained moves like 7->8, 8->9 cannot cascade).
+    """
+
+    @staticmethod
+    def _raport(semester):
+        # One status per santri even if a raport was entered twice
+        return db.select(Raport.santri_id, func.max(Raport.status_kenaikan).label('status_kenaikan'))\
+            .where(Raport.semester == semester).group_by(Raport.santri_id).subquery('raport_semester')
+
+    @staticmethod
+    def _keputusan(mapping, raport):
+        lulus_asal = [k for k, t in mapping.items() if t == LULUS]
+        naik = raport.c.status_kenaikan.like('Naik%')
+        return case(
+            (raport.c.status_kenaikan == 'Lulus', literal(LULUS)),
+            (and_(naik, Santri.kelas_id.in_(lulus_asal)), literal(LULUS)),
+            (naik, literal(NAIK)),
+            (raport.c.status_kenaikan.is_(None), literal(TANPA_RAPORT)),
+            else_=literal(TINGGAL),
+        )
+
+    @staticmethod
+    def pratinjau(semester, mapping):
+        """
+        Counts per source kelas: {kelas_id: {NAIK, LULUS, TINGGAL, TANPA_RAPORT}}.
+        """
+        raport = KenaikanKelasService._raport(semester)
+        keputusan = KenaikanKelasService._keputusan(mapping, raport).label('keputusan')
+        rows = db.session.query(Santri.kelas_id, keputusan, func.count())\
+            .outerjoin(raport, raport.c.santri_id == Santri.id)\
+            .filter(Santri.status == 'aktif', Santri.kelas_id.in_(list(mapping)))\
+            .group_by(Santri.kelas_id, keputusan).all()
+
+        hasil = {k: {NAIK: 0, LULUS: 0, TINGGAL: 0, TANPA_RAPORT: 0} for k in mapping}
+        for kelas_id, jenis, jumlah in rows:
+            hasil[kelas_id][jenis] = jumlah
+        return hasil
+
+    @staticmethod
+    def rincian(semester, mapping):
+        """
+        Santri whose kelas or status changes, as (id, nis, nama, kelas_id, keputusan),
+        ordered by kelas and name.
+        """
+        raport = KenaikanKelasService._raport(semester)
+        keputusan = KenaikanKelasService._keputusan(mapping, raport)
+        return db.session.query(Santri.id, Santri.nis, Santri.nama, Santri.kelas_id, keputusan)\
+            .outerjoin(raport, raport.c.santri_id == Santri.id)\
+            .filter(Santri.status == 'aktif', Santri.kelas_id.in_(list(mapping)),
+                    or_(raport.c.status_kenaikan == 'Lulus', raport.c.status_kenaikan.like('Naik%')))\
+            .order_by(Santri.kelas_id, Santri.nama, Santri.id).all()
+
+    @staticmethod
+    def terapkan(semester, mapping):
+        """
+        Apply the promotion. Returns {'naik', 'lulus'} row counts. Does not commit.
+        """
+        lulus_asal = [k for k, t in mapping.items() if t == LULUS]
+        pindah = {k: t for k, t in mapping.items() if t != LULUS}
+        santri = Santri.__table__
+
+        raport = KenaikanKelasService._raport(semester)
+        lulus_ids = db.select(raport.c.santri_id).where(raport.c.status_kenaikan == 'Lulus')
+        naik_ids = db.select(raport.c.santri_id).where(raport.c.status_kenaikan.like('Naik%'))
+
+        lulus = db.session.execute(
+            santri.update().where(
+                santri.c.status == 'aktif',
+                santri.c.kelas_id.in_(list(mapping)),
+                or_(santri.c.id.in_(lulus_ids),
+                    and_(santri.c.kelas_id.in_(lulus_asal), santri.c.id.in_(naik_ids)))
+            ).values(status='lulus')
+        ).rowcount
+
+        naik = 0
+        if pindah:
+            naik = db.session.execute(
+                santri.update().where(
+                    santri.c.status == 'aktif',
+                    santri.c.kelas_id.in_(list(pindah)),
+                    santri.c.id.in_(naik_ids)
+                ).values(kelas_id=case(pindah, value=santri.c.kelas_id))
+            ).rowcount
+        return {'naik': naik, 'lulus': lulus}
@@ -0,0 +1,87 @@
+from decimal import Decimal
+from app import db
+from app.models.keuangan import PosKeuangan, TransaksiKeuangan
+from app.services.pagination import keyset_paginate
+from app.services.referensi import ReferensiCache
+from app.services.saldo_harian import SaldoHarianService
+
+NOL = Decimal('0.00')
+
+
+class LaporanKeuanganService:
+    """
+    Finance report for a date range.
+
+    Totals are aggregated by the database (GROUP BY pos_id, jenis) on the Numeric
+    column and kept as Decimal, so the cost of the summary does not depend on the
+    number of transactions. Opening/closing balances and the monthly comparison
+    come from the daily `saldo_harian` totals. The itemised list is read separately,
+    a page at a time or streamed for printing.
+    """
+
+    @staticmethod
+    def _periode(query, start_date, end_date):
+        return query.filter(TransaksiKeuangan.tanggal >= start_date, TransaksiKeuangan.tanggal <= end_date)
+
+    @staticmethod
+    def ringkasan(start_date, end_date):
+        rows = LaporanKeuanganService._periode(
+            db.session.query(
+                TransaksiKeuangan.pos_id, TransaksiKeuangan.jenis,
+                db.func.sum(TransaksiKeuangan.jumlah), db.func.count(TransaksiKeuangan.id)
+            ), start_date, end_date
+        ).group_by(TransaksiKeuangan.pos_id, TransaksiKeuangan.jenis).all()
+
+        pos = {p['id']: p for p in ReferensiCache.rows(PosKeuangan)}
+        summary = {}
+        total = {'masuk': NOL, 'keluar': NOL}
+        for pos_id, jenis, jumlah, banyak in rows:
+            jumlah = Decimal(jumlah or 0).quantize(NOL)
+            item = summary.setdefault(pos_id, {
+                'nama': pos[pos_id]['nama'] if pos_id in pos else '-',
+                'tipe': pos[pos_id]['tipe'] if pos_id in pos else '-',
+                'masuk': NOL, 'keluar': NOL, 'jumlah_transaksi': 0,
+            })
+            item[jenis] = item.get(jenis, NOL) + jumlah
+            item['jumlah_transaksi'] += banyak
+            total[jenis] = total.get(jenis, NOL) + jumlah
+
+        saldo_awal = SaldoHarianService.saldo_sebelum(start_date)
+        saldo = total['masuk'] - total['keluar']
+        return {
+            'summary': sorted(summary.values(), key=lambda s: (s['tipe'], s['nama'])),
+            'total_masuk': total['masuk'],
+            'total_keluar': total['keluar'],
+            'saldo': saldo,
+            'saldo_awal': saldo_awal,
+            'saldo_akhir': saldo_awal + saldo,
+            'bulanan': SaldoHarianService.bulanan(start_date, end_date),
+        }
+
+    @staticmethod
+    def _transaksi_query(start_date, end_date):
+        return LaporanKeuanganService._periode(
+            TransaksiKeuangan.query.options(db.joinedload(TransaksiKeuangan.pos)), start_date, end_date
+        )
+
+    @staticmethod
+    def transaksi_page(start_date, end_date, after=None, before=None, per_page=50):
+        return keyset_paginate(
+            LaporanKeuanganService._transaksi_query(start_date, end_date),
+            [TransaksiKeuangan.tanggal, TransaksiKeuangan.id],
+            after=after, before=before, per_page=per_page
+        )
+
+    @staticmethod
+    def iter_transaksi(start_date, end_date, batch_size=500):
+        """
+        Every transaction of the period in date order, fetched in batches so a long
+        period is never held in memory at once.
+        """
+        query = LaporanKeuanganService._periode(
+            db.session.query(TransaksiKeuangan.tanggal, PosKeuangan.nama.label('pos_nama'),
+                             TransaksiKeuangan.keterangan, TransaksiKeuangan.jenis, TransaksiKeuangan.jumlah)
+            .join(PosKeuangan, TransaksiKeuangan.pos_id == PosKeuangan.id),
+            start_date, end_date
+        ).order_by(TransaksiKeuangan.tanggal, TransaksiKeuangan.id)
+        return query.yield_per(batch_size)
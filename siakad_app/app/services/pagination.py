@@ -0,0 +1,88 @@
+import base64
+import json
+from sqlalchemy import tuple_
+
+
+def encode_cursor(values):
+    """
+    Encode the sort-key values of a row into an opaque, URL-safe cursor.
+    """
+    raw = json.dumps(list(values), default=str).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor. Returns None for a missing or tampered cursor.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+class KeysetPage:
+    """
+    One page of a keyset (seek) paginated query.
+    Unlike OFFSET paging, the cost of fetching a page does not grow with its position.
+    """
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+
+def keyset_paginate(query, columns, after=None, before=None, per_page=50):
+    """
+    Paginate `query` on the ascending composite key `columns`.
+
+    `columns` must be unique together (end it with the primary key) and should be
+    covered by an index so each page is a single index range scan.
+    Pass `after` for the next page or `before` for the previous one (cursors from KeysetPage).
+    """
+    key = tuple_(*columns)
+    after_values = decode_cursor(after)
+    before_values = decode_cursor(before)
+
+    backwards = before_values is not None and len(before_values) == len(columns)
+    if backwards:
+        query = query.filter(key < tuple_(*before_values)).order_by(*[c.desc() for c in columns])
+    else:
+        if after_values is not None and len(after_values) == len(columns):
+            query = query.filter(key > tuple_(*after_values))
+        else:
+            after_values = None
+        query = query.order_by(*columns)
+
+    # Fetch one extra row to know whether another page exists without a COUNT(*)
+    rows = query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    def cursor_for(row):
+        return encode_cursor(getattr(row, c.key) for c in columns)
+
+    next_cursor = prev_cursor = None
+    if rows:
+        if backwards:
+            next_cursor = cursor_for(rows[-1])
+            prev_cursor = cursor_for(rows[0]) if has_more else None
+        else:
+            next_cursor = cursor_for(rows[-1]) if has_more else None
+            prev_cursor = cursor_for(rows[0]) if after_values is not None else None
+
+    return KeysetPage(rows, next_cursor=next_cursor, prev_cursor=prev_cursor)
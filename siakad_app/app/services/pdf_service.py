@@ -1,32 +1,241 @@
+import os
+import time
+import uuid
+import signal
 import threading
+import multiprocessing
+from datetime import datetime, timedelta
 from flask import render_template, current_app
+from sqlalchemy import func, literal
+from app import db
+from app.models.job import PdfJob
+from app.services.berkas import BerkasService
 try:
     from weasyprint import HTML
-except OSError:
+except (ImportError, OSError):
     HTML = None
 
-def generate_pdf_task(html_content, output_path):
+# pg_advisory_xact_lock key serialising enqueues on PostgreSQL
+QUEUE_LOCK_KEY = 7301
+
+class PdfQueueFull(Exception):
+    """Raised when the PDF queue already holds PDF_QUEUE_MAX unfinished jobs."""
+    pass
+
+class PdfService:
     """
-    Background task to generate PDF.
-    In a real production environment, use Celery.
-    For this setup, we use a simple thread to demonstrate non-blocking behavior 
-    (though Python threads are still GIL-bound, WeasyPrint releases GIL for I/O).
+    Persistent PDF rendering queue.
+
+    Web requests only render the (cheap) HTML and insert a `pdf_jobs` row.
+    The (expensive) WeasyPrint step runs in a separate pool of worker processes
+    started with `flask pdf-worker`, so gunicorn workers are never blocked by it.
     """
-    if HTML:
-        HTML(string=html_content).write_pdf(output_path)
-    else:
-        print("WeasyPrint not available")
+    ACTIVE_STATUSES = ('queued', 'running')
+
+    @staticmethod
+    def is_available():
+        return HTML is not None
+
+    @staticmethod
+    def enqueue(template, filename, user_id=None, output_path=None, **context):
+        """
+        Render `template` to HTML and queue it for PDF conversion.
+        `output_path` lets the caller choose where the PDF lands (e.g. RaportCache);
+        by default it goes to PDF_OUTPUT_DIR.
+        Raises PdfQueueFull when the queue is at capacity (backpressure).
+        """
+        html = render_template(template, **context)
+        table = PdfJob.__table__
+        if db.session.get_bind().dialect.name == 'postgresql':
+            # INSERT ... SELECT alone does not stop two READ COMMITTED transactions from
+            # both seeing room for one more job; SQLite serialises the statement anyway
+            db.session.execute(db.text('SELECT pg_advisory_xact_lock(:key)'), {'key': QUEUE_LOCK_KEY})
+
+        # The capacity check and the insert are one statement
+        values = {
+            'id': str(uuid.uuid4()), 'html': html, 'filename': filename, 'user_id': user_id,
+            'output_path': output_path, 'status': 'queued', 'attempts': 0, 'created_at': datetime.utcnow(),
+        }
+        active = db.select(func.count()).select_from(table)\
+            .where(table.c.status.in_(PdfService.ACTIVE_STATUSES)).scalar_subquery()
+        select = db.select(*[literal(v, table.c[k].type) for k, v in values.items()])\
+            .where(active < current_app.config['PDF_QUEUE_MAX'])
+        inserted = db.session.execute(table.insert().from_select(list(values), select)).rowcount
+        if not inserted:
+            raise PdfQueueFull()
+        db.session.commit()
+        return db.session.get(PdfJob, values['id'])
+
+    @staticmethod
+    def claim_next_job():
+        """
+        Atomically move the oldest queued job to 'running'.
+        The conditional UPDATE makes it safe for several worker processes to poll the same table.
+        """
+        job = PdfJob.query.filter_by(status='queued').order_by(PdfJob.created_at).first()
+        if job is None:
+            return None
+
+        claimed = PdfJob.query.filter_by(id=job.id, status='queued').update({
+            'status': 'running',
+            'started_at': datetime.utcnow(),
+            'heartbeat_at': datetime.utcnow(),
+            'attempts': PdfJob.attempts + 1
+        }, synchronize_session=False)
+        db.session.commit()
+        if not claimed:
+            return None # Another worker was faster
+
+        db.session.refresh(job)
+        return job
+
+    @staticmethod
+    def process_next_job():
+        """
+        Render one queued job. Returns False when the queue is empty.
+        """
+        job = PdfService.claim_next_job()
+        if job is None:
+            return False
+
+        try:
+            if HTML is None:
+                raise RuntimeError('WeasyPrint tidak tersedia (Missing GTK libraries).')
+
+            output_path = job.output_path or os.path.join(current_app.config['PDF_OUTPUT_DIR'], f'{job.id}.pdf')
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            # Write then rename so a reader never sees a half-written file
+            tmp_path = f'{output_path}.{os.getpid()}.tmp'
+            with _Heartbeat(job.id):
+                HTML(string=job.html).write_pdf(tmp_path)
+            os.replace(tmp_path, output_path)
+
+            job.status = 'done'
+            job.output_path = output_path
+            job.html = '' # No longer needed, keep the table small
+        except Exception as e:
+            current_app.logger.error(f'PDF job {job.id} failed: {e}')
+            job.status = 'failed'
+            job.error = str(e)
+
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        return True
+
+    @staticmethod
+    def requeue_stale_jobs():
+        """
+        Put 'running' jobs whose worker died back in the queue: a live worker refreshes
+        heartbeat_at every PDF_JOB_HEARTBEAT seconds while rendering, so only jobs
+        without a heartbeat for PDF_JOB_TIMEOUT are taken, however long a render takes.
+        A job that already used PDF_JOB_MAX_ATTEMPTS is marked failed instead, so a
+        document that crashes the renderer is not retried forever.
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=current_app.config['PDF_JOB_TIMEOUT'])
+        max_attempts = current_app.config['PDF_JOB_MAX_ATTEMPTS']
+        stale = [PdfJob.status == 'running', func.coalesce(PdfJob.heartbeat_at, PdfJob.started_at) < cutoff]
+        PdfJob.query.filter(*stale, PdfJob.attempts >= max_attempts).update({
+            'status': 'failed',
+            'error': f'Worker berhenti saat merender ({max_attempts} kali percobaan).',
+            'finished_at': datetime.utcnow(),
+        }, synchronize_session=False)
+        count = PdfJob.query.filter(*stale).update({'status': 'queued'}, synchronize_session=False)
+        db.session.commit()
+        return count
+
+    @staticmethod
+    def purge_old_jobs():
+        """
+        Delete finished jobs older than PDF_JOB_RETENTION, and their files when
+        they live in PDF_OUTPUT_DIR (files placed elsewhere are owned by their cache).
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=current_app.config['PDF_JOB_RETENTION'])
+        output_dir = os.path.abspath(current_app.config['PDF_OUTPUT_DIR'])
+        old_jobs = PdfJob.query.filter(PdfJob.status.in_(('done', 'failed')), PdfJob.finished_at < cutoff).all()
+        for job in old_jobs:
+            if job.output_path and os.path.abspath(job.output_path).startswith(output_dir + os.sep) \
+                    and os.path.exists(job.output_path):
+                os.remove(job.output_path)
+            db.session.delete(job)
+        db.session.commit()
+        return len(old_jobs)
 
-class PdfService:
     @staticmethod
-    def generate_raport_pdf_async(data, output_path):
+    def run_worker_pool(processes=2, poll_interval=1.0):
         """
-        Starts a background thread to generate PDF.
+        Start `processes` render processes and wait for them. Blocks until SIGTERM/SIGINT.
+        The workers build their app from the same config class as the current app.
         """
-        # Render HTML in the main thread (requires app context)
-        html = render_template('akademik/raport_pdf.html', data=data)
-        
-        # Start background thread
-        thread = threading.Thread(target=generate_pdf_task, args=(html, output_path))
-        thread.start()
-        return thread
+        config_class = current_app.config['CONFIG_CLASS']
+        ctx = multiprocessing.get_context('spawn')
+        workers = [ctx.Process(target=_worker_loop, args=(poll_interval, config_class), daemon=True)
+                   for _ in range(processes)]
+        for w in workers:
+            w.start()
+
+        def shutdown(signum, frame):
+            for w in workers:
+                w.terminate()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+        for w in workers:
+            w.join()
+
+class _Heartbeat:
+    """
+    Refresh a running job's heartbeat_at from a side thread, on its own connection,
+    until the `with` block ends.
+    """
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.app = current_app._get_current_object()
+        self.interval = self.app.config['PDF_JOB_HEARTBEAT']
+        self.stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='pdf-heartbeat', daemon=True)
+
+    def _run(self):
+        table = PdfJob.__table__
+        while not self.stop.wait(self.interval):
+            try:
+                with self.app.app_context(), db.engine.begin() as connection:
+                    connection.execute(table.update()
+                                       .where(table.c.id == self.job_id, table.c.status == 'running')
+                                       .values(heartbeat_at=datetime.utcnow()))
+            except Exception as e:
+                self.app.logger.warning(f'Heartbeat PDF job {self.job_id} gagal: {e}')
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop.set()
+        self.thread.join()
+
+def _worker_loop(poll_interval, config_class):
+    # Runs in a fresh (spawned) process with its own app and DB connections
+    from app import create_app
+    app = create_app(config_class)
+    housekeeping_every = 60
+    last_housekeeping = 0
+
+    with app.app_context():
+        while True:
+            try:
+                if time.monotonic() - last_housekeeping > housekeeping_every:
+                    PdfService.requeue_stale_jobs()
+                    BerkasService.requeue_stale_thumbnails()
+                    PdfService.purge_old_jobs()
+                    last_housekeeping = time.monotonic()
+
+                # Upload thumbnails are rendered whenever no PDF is waiting
+                if not PdfService.process_next_job() and not BerkasService.proses_thumbnail():
+                    time.sleep(poll_interval)
+            except Exception as e:
+                db.session.rollback()
+                app.logger.error(f'PDF worker error: {e}')
+                time.sleep(poll_interval)
+            finally:
+                db.session.remove()
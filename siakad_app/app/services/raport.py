@@ -1,7 +1,9 @@
 from app import db
-from app.models.akademik import Nilai, Absensi, Tahfidz, Santri, MataPelajaran, Raport
-from sqlalchemy import func
+from app.models.akademik import Nilai, Tahfidz, Santri, MataPelajaran, Raport, Semester
+from app.services.absensi_rekap import AbsensiRekapService
+from app.services.statistik import StatistikKelasService
 from datetime import datetime
+from collections import defaultdict
 
 class RaportService:
     def get_raport_data(self, santri_id, semester):
@@ -12,7 +14,78 @@ class RaportService:
         # Optimize N+1 query: Eager load Mapel
         nilai_list = Nilai.query.options(db.joinedload(Nilai.mapel))\
             .filter_by(santri_id=santri_id, semester=semester).all()
+            
+        # 2. Absensi within the semester's date range, read from the monthly rollup
+        periode = Semester.query.filter_by(nama=semester).first()
+        absensi_counts = []
+        if periode:
+            absensi_counts = AbsensiRekapService.summary(
+                [santri.id], periode.tanggal_mulai, periode.tanggal_selesai
+            )[santri.id].items()
+                
+        # 3. Tahfidz
+        tahfidz_entries = Tahfidz.query.filter_by(santri_id=santri_id).order_by(Tahfidz.tanggal_setor.desc()).all()
         
+        # 4. Data Tambahan Raport (Catatan & Status)
+        raport_data = Raport.query.filter_by(santri_id=santri_id, semester=semester).first()
+
+        # 5. Peringkat & rata-rata kelas
+        statistik = StatistikKelasService.untuk_santri(santri.kelas_id, semester, santri.id) if santri.kelas_id else None
+        
+        return self._build_raport(santri, semester, nilai_list, absensi_counts, tahfidz_entries, raport_data, statistik)
+
+    def get_raport_data_bulk(self, kelas_id, semester):
+        """
+        Raport data for every active santri of a kelas.
+        Each table is read once for the whole class (7 queries instead of ~7 per santri)
+        and the per-santri dicts are assembled in memory.
+        """
+        santris = Santri.query.options(db.joinedload(Santri.kelas))\
+            .filter(Santri.kelas_id == kelas_id, Santri.status == 'aktif')\
+            .order_by(Santri.nama).all()
+        if not santris:
+            return []
+        santri_ids = [s.id for s in santris]
+
+        nilai_by_santri = defaultdict(list)
+        for n in Nilai.query.options(db.joinedload(Nilai.mapel))\
+                .filter(Nilai.santri_id.in_(santri_ids), Nilai.semester == semester)\
+                .order_by(Nilai.id).all():
+            nilai_by_santri[n.santri_id].append(n)
+
+        absensi_by_santri = defaultdict(list)
+        periode = Semester.query.filter_by(nama=semester).first()
+        if periode:
+            for santri_id, counts in AbsensiRekapService.summary(
+                    santri_ids, periode.tanggal_mulai, periode.tanggal_selesai).items():
+                absensi_by_santri[santri_id] = counts.items()
+
+        tahfidz_by_santri = defaultdict(list)
+        for t in Tahfidz.query.filter(Tahfidz.santri_id.in_(santri_ids))\
+                .order_by(Tahfidz.tanggal_setor.desc()).all():
+            tahfidz_by_santri[t.santri_id].append(t)
+
+        raport_by_santri = {
+            r.santri_id: r for r in Raport.query.filter(
+                Raport.santri_id.in_(santri_ids), Raport.semester == semester
+            ).all()
+        }
+
+        statistik = StatistikKelasService.hitung(kelas_id, semester)
+
+        return [
+            self._build_raport(
+                santri, semester,
+                nilai_by_santri[santri.id],
+                absensi_by_santri[santri.id],
+                tahfidz_by_santri[santri.id],
+                raport_by_santri.get(santri.id),
+                statistik
+            )
+            for santri in santris
+        ]
+
+    def _build_raport(self, santri, semester, nilai_list, absensi_counts, tahfidz_entries, raport_data, statistik=None):
         raport_nilai = []
         for n in nilai_list:
             # Simple average calculation
@@ -32,29 +105,17 @@ class RaportService:
                 'uas': a,
                 'praktik': p,
                 'nilai_akhir': round(rata_rata, 2),
+                'rata_kelas': statistik['rata_mapel'].get(n.mapel_id) if statistik else None,
                 'predikat': self.get_predikat(rata_rata),
                 'deskripsi': f"Ananda {self.get_predikat_desc(rata_rata)} dalam memahami materi {n.mapel.nama_mapel}."
             })
-            
-        # 2. Absensi (Total for the semester - strictly speaking should filter by date range of semester, 
-        # but for simplicity we'll just count all for now or I need a date range logic)
-        # Let's assume we count all for the santri for now as 'Semester' date range isn't defined in DB yet.
-        absensi_counts = db.session.query(
-            Absensi.status, func.count(Absensi.id)
-        ).filter_by(santri_id=santri_id).group_by(Absensi.status).all()
-        
+
         absensi_summary = {'Hadir': 0, 'Sakit': 0, 'Izin': 0, 'Alpha': 0}
         for status, count in absensi_counts:
             # Normalize status string just in case
             s = status.capitalize()
             if s in absensi_summary:
                 absensi_summary[s] = count
-                
-        # 3. Tahfidz
-        tahfidz_entries = Tahfidz.query.filter_by(santri_id=santri_id).order_by(Tahfidz.tanggal_setor.desc()).all()
-        
-        # 4. Data Tambahan Raport (Catatan & Status)
-        raport_data = Raport.query.filter_by(santri_id=santri_id, semester=semester).first()
         
         catatan = raport_data.catatan_wali_kelas if raport_data else "-"
         status_kenaikan = raport_data.status_kenaikan if raport_data else "-"
@@ -69,7 +130,9 @@ class RaportService:
             'catatan': catatan,
             'status_kenaikan': status_kenaikan,
             'tanggal_cetak': tanggal_bagi,
-            'raport_exists': True if raport_data else False
+            'raport_exists': True if raport_data else False,
+            'peringkat': statistik['peringkat'].get(santri.id) if statistik else None,
+            'jumlah_peringkat': statistik['jumlah_santri'] if statistik else 0
         }
         
     def get_predikat(self, nilai):
@@ -0,0 +1,142 @@
+import os
+import re
+import json
+import shutil
+import hashlib
+from flask import current_app, render_template, has_app_context
+from sqlalchemy import event, inspect
+from app import db
+from app.models.akademik import Santri, Nilai, Absensi, Tahfidz, Raport
+
+# Models whose rows feed RaportService, and the attribute that links them to a santri
+_RAPORT_SOURCES = {
+    Nilai: 'santri_id',
+    Absensi: 'santri_id',
+    Tahfidz: 'santri_id',
+    Raport: 'santri_id',
+    Santri: 'id',
+}
+
+class RaportCache:
+    """
+    On-disk cache of rendered raport HTML fragments and PDFs.
+
+    Files are content-addressed: the name is a SHA-256 of everything RaportService
+    returned plus the template source, so a changed input can never serve a stale file.
+    Directories are per santri and are dropped after any commit that touched that
+    santri's rows (see the session hooks below), which keeps the cache small.
+    """
+
+    @staticmethod
+    def _santri_dir(santri_id):
+        return os.path.join(current_app.config['RAPORT_CACHE_DIR'], str(int(santri_id)))
+
+    @staticmethod
+    def _fingerprint(data):
+        santri = data['santri']
+        return {
+            'santri': [santri.id, santri.nis, santri.nama, santri.kelas.nama_kelas if santri.kelas else None],
+            'semester': data['semester'],
+            'nilai': data['nilai'],
+            'absensi': data['absensi'],
+            'tahfidz': [
+                [t.id, t.nama_surat, t.ayat, t.kelancaran, t.tajwid, t.tanggal_setor]
+                for t in data['tahfidz']
+            ],
+            'catatan': data['catatan'],
+            'status_kenaikan': data['status_kenaikan'],
+            'tanggal_cetak': data['tanggal_cetak'],
+            'peringkat': [data.get('peringkat'), data.get('jumlah_peringkat')],
+        }
+
+    @staticmethod
+    def key(data, template):
+        source = current_app.jinja_env.loader.get_source(current_app.jinja_env, template)[0]
+        digest = hashlib.sha256()
+        digest.update(source.encode('utf-8'))
+        digest.update(json.dumps(RaportCache._fingerprint(data), sort_keys=True, default=str).encode('utf-8'))
+        return digest.hexdigest()
+
+    @staticmethod
+    def path(data, template, ext):
+        semester = re.sub(r'[^0-9A-Za-z]+', '_', data['semester'])
+        name = f"{semester}-{RaportCache.key(data, template)}.{ext}"
+        return os.path.join(RaportCache._santri_dir(data['santri'].id), name)
+
+    @staticmethod
+    def prune(path):
+        """
+        Remove older versions (other hashes) of the same santri/semester/extension.
+        """
+        directory, name = os.path.split(path)
+        prefix, ext = name.split('-', 1)[0], os.path.splitext(name)[1]
+        if not os.path.isdir(directory):
+            return
+        for other in os.listdir(directory):
+            if other != name and other.startswith(prefix + '-') and other.endswith(ext):
+                try:
+                    os.remove(os.path.join(directory, other))
+                except OSError:
+                    pass
+
+    @staticmethod
+    def render(template, data):
+        """
+        Render `template` with `data`, reusing the cached output when the inputs are unchanged.
+        """
+        path = RaportCache.path(data, template, 'html')
+        try:
+            with open(path, encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            pass
+
+        html = render_template(template, data=data)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        RaportCache.prune(path)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(html)
+        os.replace(tmp_path, path)
+        return html
+
+    @staticmethod
+    def invalidate(santri_ids):
+        for santri_id in santri_ids:
+            shutil.rmtree(RaportCache._santri_dir(santri_id), ignore_errors=True)
+
+    @staticmethod
+    def clear():
+        """Drop every cached file, e.g. after the database was replaced wholesale."""
+        shutil.rmtree(current_app.config['RAPORT_CACHE_DIR'], ignore_errors=True)
+
+    @staticmethod
+    def mark_dirty(santri_ids):
+        """
+        Invalidate these santri on the next commit. Needed for bulk Core statements
+        (e.g. bulk_upsert) which bypass the ORM flush hooks.
+        """
+        db.session.info.setdefault('raport_dirty', set()).update(santri_ids)
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_dirty_santri(session, flush_context):
+    dirty = session.info.setdefault('raport_dirty', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        attr = _RAPORT_SOURCES.get(type(obj))
+        if attr is None:
+            continue
+        value = getattr(obj, attr, None)
+        if value is not None:
+            dirty.add(value)
+        # A row moved to another santri dirties the previous owner as well
+        dirty.update(v for v in inspect(obj).attrs[attr].history.deleted if v is not None)
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_dirty_santri(session):
+    dirty = session.info.pop('raport_dirty', None)
+    if dirty and has_app_context():
+        RaportCache.invalidate(dirty)
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_dirty_santri(session):
+    session.info.pop('raport_dirty', None)
@@ -0,0 +1,123 @@
+import time
+from flask import g, has_app_context, has_request_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import attributes, make_transient_to_detached
+from app import db, cache
+from app.models.akademik import Kelas, MataPelajaran, Semester
+from app.models.keuangan import PosKeuangan, KonfigurasiLaporan
+
+# Small reference tables served from ReferensiCache, with the column they are listed by
+REFERENSI = {
+    Kelas: 'nama_kelas',
+    MataPelajaran: 'nama_mapel',
+    Semester: 'tanggal_mulai',
+    PosKeuangan: 'id',
+    KonfigurasiLaporan: 'id',
+}
+
+VERSION_KEY = 'referensi_version:{}'
+
+# Per-process store: {table name: (version, [column dicts])}
+_local = {}
+
+
+class ReferensiCache:
+    """
+    Read-through, per-worker cache of the small reference tables in REFERENSI.
+
+    Rows are kept in process memory together with the version they were read at.
+    The current version of each table lives in the shared cache backend and is
+    bumped after any commit that touched the table (see the session hooks below),
+    so every worker reloads on its next request instead of waiting for a TTL.
+    Within a request the shared version is read at most once per table.
+    """
+
+    @staticmethod
+    def _version(table):
+        versions = g.setdefault('referensi_versions', {}) if has_request_context() else {}
+        if table not in versions:
+            key = VERSION_KEY.format(table)
+            version = cache.get(key)
+            if version is None:
+                # Seeded from the clock so a version lost to eviction or a cache
+                # restart never matches what a worker loaded before.
+                cache.add(key, time.time_ns(), timeout=0)
+                version = cache.get(key)
+            versions[table] = version
+        return versions[table]
+
+    @staticmethod
+    def rows(model):
+        """
+        Column values of every row of `model` as dicts, ordered by its REFERENSI column.
+        Cheap to call; nothing is attached to the session.
+        """
+        table = model.__tablename__
+        version = ReferensiCache._version(table)
+        entry = _local.get(table)
+        if version is None or entry is None or entry[0] != version:
+            columns = [c.key for c in inspect(model).column_attrs]
+            result = db.session.execute(
+                db.select(*[getattr(model, c) for c in columns]).order_by(getattr(model, REFERENSI[model]))
+            )
+            entry = (version, [dict(zip(columns, row)) for row in result])
+            if version is not None:
+                _local[table] = entry
+        return entry[1]
+
+    @staticmethod
+    def all(model):
+        """
+        Every row of `model` as ORM instances in the current session, without a query.
+        Relationships still lazy-load as usual.
+        """
+        return [ReferensiCache._attach(model, data) for data in ReferensiCache.rows(model)]
+
+    @staticmethod
+    def first(model):
+        rows = ReferensiCache.rows(model)
+        return ReferensiCache._attach(model, rows[0]) if rows else None
+
+    @staticmethod
+    def _attach(model, data):
+        obj = inspect(model).class_manager.new_instance()
+        for key, value in data.items():
+            attributes.set_committed_value(obj, key, value)
+        make_transient_to_detached(obj)
+        return db.session.merge(obj, load=False)
+
+    @staticmethod
+    def invalidate(tables):
+        for table in tables:
+            key = VERSION_KEY.format(table)
+            if cache.get(key) is None:
+                cache.set(key, time.time_ns(), timeout=0)
+            else:
+                # Backend increment: atomic on Redis/Memcached
+                cache.cache.inc(key)
+            if has_request_context():
+                g.get('referensi_versions', {}).pop(table, None)
+
+
+_TABLES = {model.__tablename__ for model in REFERENSI}
+
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_referensi_tables(session, flush_context):
+    dirty = session.info.setdefault('referensi_dirty', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, '__tablename__', None)
+        if table in _TABLES:
+            dirty.add(table)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _bump_referensi_versions(session):
+    dirty = session.info.pop('referensi_dirty', None)
+    if dirty and has_app_context():
+        ReferensiCache.invalidate(dirty)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_referensi_tables(session):
+    session.info.pop('referensi_dirty', None)
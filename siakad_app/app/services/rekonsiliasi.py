@@ -0,0 +1,419 @@
+import io
+import re
+import itertools
+import csv
+import json
+import hashlib
+from collections import defaultdict, Counter
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import bindparam
+from app import db
+from app.models.akademik import Santri
+from app.models.keuangan import Keuangan, TransaksiKeuangan, MutasiBank
+from app.services.bulk import upsert_insert
+
+NOL = Decimal('0.00')
+
+# Statement lines inserted per statement during an import
+BATCH_SIZE = 500
+
+# Days a bank posting may lag or lead the recorded date
+TOLERANSI_HARI = 3
+
+# Scoring: a same-day match starts at SKOR_DASAR, each day apart costs SKOR_PER_HARI,
+# each description token shared with the candidate adds SKOR_PER_TOKEN (up to SKOR_TOKEN_MAKS)
+SKOR_DASAR = 100
+SKOR_PER_HARI = 10
+SKOR_PER_TOKEN = 15
+SKOR_TOKEN_MAKS = 45
+
+# The best candidate is taken automatically only when it leads the next one by this much
+SELISIH_MINIMUM = 20
+
+# Accepted header names per field (lowercase); a statement has either jumlah or debet/kredit
+KOLOM = {
+    'tanggal': ('tanggal', 'tgl', 'tanggal transaksi', 'date', 'transaction date', 'posting date'),
+    'keterangan': ('keterangan', 'deskripsi', 'uraian', 'description', 'remark', 'remarks'),
+    'jumlah': ('jumlah', 'nominal', 'mutasi', 'amount'),
+    'debet': ('debet', 'debit', 'db'),
+    'kredit': ('kredit', 'credit', 'cr'),
+    'tipe': ('tipe', 'd/k', 'db/cr', 'type'), # D/DB/Debet marks money going out
+}
+
+FORMAT_TANGGAL = ('%d/%m/%Y', '%Y-%m-%d', '%d-%m-%Y', '%d/%m/%y', '%d.%m.%Y')
+
+# Words in bank descriptions that say nothing about the payer (shorter words are always dropped)
+STOPWORDS = {
+    'trf', 'trsf', 'transfer', 'dari', 'kepada', 'untuk', 'pembayaran', 'bayar', 'setoran', 'setor',
+    'tunai', 'atm', 'bca', 'bri', 'bni', 'bsi', 'mandiri', 'rek', 'bin', 'binti', 'spp', 'bulan', 'dan',
+}
+
+
+class FormatMutasiTidakDikenal(ValueError):
+    """The CSV header has no recognisable date/amount columns."""
+    pass
+
+
+def token(text):
+    """Normalised description tokens: lowercase words of 3+ characters that are not stopwords."""
+    return {t for t in re.split(r'[^0-9a-z]+', (text or '').lower()) if len(t) >= 3 and t not in STOPWORDS}
+
+
+def parse_jumlah(value):
+    """
+    Amount as printed by Indonesian and international banks: '1.500.000,00',
+    '1,500,000.00', 'Rp 150000', '-25.000', '1,500,000.00 CR'. Returns a signed Decimal
+    (negative for debit markers) or None.
+    """
+    text = (value or '').strip().upper().replace('RP', '').replace(' ', '')
+    sign = 1
+    if text.endswith(('CR', 'DB', 'D', 'K')):
+        sign = -1 if text.endswith(('DB', 'D')) else 1
+        text = text.rstrip('CRDBK')
+    if text.startswith('(') and text.endswith(')'):
+        sign, text = -1, text[1:-1]
+    if text.startswith('-'):
+        sign, text = -sign, text[1:]
+    if not text:
+        return None
+
+    if ',' in text and '.' in text:
+        # The right-most separator is the decimal one
+        if text.rfind(',') > text.rfind('.'):
+            text = text.replace('.', '').replace(',', '.')
+        else:
+            text = text.replace(',', '')
+    elif ',' in text:
+        whole, _, frac = text.rpartition(',')
+        text = f"{whole.replace(',', '')}.{frac}" if len(frac) != 3 else text.replace(',', '')
+    elif text.count('.') > 1 or (text.count('.') == 1 and len(text.rpartition('.')[2]) == 3):
+        text = text.replace('.', '')
+    try:
+        return sign * Decimal(text).quantize(NOL)
+    except InvalidOperation:
+        return None
+
+
+def parse_tanggal(value):
+    value = (value or '').strip().split(' ')[0]
+    for fmt in FORMAT_TANGGAL:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+class RekonsiliasiService:
+    """
+    Bank statement import and reconciliation.
+
+    Statements are read line by line from the uploaded CSV and inserted in
+    batches, so their size does not matter. Each line gets a fingerprint (date,
+    amount, description and its occurrence number in the file), which makes
+    importing the same or an overlapping statement again harmless.
+
+    Matching loads the open statement lines and the candidate ledger rows of the
+    period once and builds two hash indexes: (jenis, tanggal, jumlah) -> rows and
+    description token -> rows. Every statement line is then resolved with a few
+    dictionary lookups (the date tolerance is probed day by day), scored, and
+    assigned greedily from the best score down so a ledger row is used only once.
+    Lines with one clear winner are matched; lines with competing candidates go to
+    the review queue ('tinjau') with their candidates.
+    """
+
+    # --- Import ---
+
+    @staticmethod
+    def _kolom(fieldnames):
+        normal = {(name or '').strip().lower(): name for name in fieldnames or []}
+        found = {}
+        for field, aliases in KOLOM.items():
+            for alias in aliases:
+                if alias in normal:
+                    found[field] = normal[alias]
+                    break
+        if 'tanggal' not in found or not ('jumlah' in found or 'debet' in found or 'kredit' in found):
+            raise FormatMutasiTidakDikenal(
+                'Kolom tanggal dan jumlah (atau debet/kredit) tidak ditemukan di header CSV.'
+            )
+        return found
+
+    @staticmethod
+    def impor(stream):
+        """
+        Import a CSV statement from a binary stream. Returns
+        {'baris', 'baru', 'duplikat', 'dilewati'}. Does not commit.
+        """
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', errors='replace', newline='')
+        # Sniff the delimiter on the first lines, then read on without rewinding
+        head = text.read(4096) + text.readline()
+        try:
+            dialect = csv.Sniffer().sniff(head, delimiters=',;\t|')
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.DictReader(itertools.chain(io.StringIO(head), text), dialect=dialect)
+        kolom = RekonsiliasiService._kolom(reader.fieldnames)
+
+        hasil = {'baris': 0, 'baru': 0, 'duplikat': 0, 'dilewati': 0}
+        seen = Counter()
+        batch = []
+        for row in reader:
+            hasil['baris'] += 1
+            tanggal = parse_tanggal(row.get(kolom['tanggal']))
+            if 'jumlah' in kolom:
+                jumlah = parse_jumlah(row.get(kolom['jumlah']))
+                if jumlah and 'tipe' in kolom and (row.get(kolom['tipe']) or '').strip().upper().startswith('D'):
+                    jumlah = -abs(jumlah)
+            else:
+                kredit = parse_jumlah(row.get(kolom.get('kredit'))) if 'kredit' in kolom else None
+                debet = parse_jumlah(row.get(kolom.get('debet'))) if 'debet' in kolom else None
+                jumlah = kredit if kredit else (-abs(debet) if debet else None)
+            if tanggal is None or not jumlah:
+                hasil['dilewati'] += 1
+                continue
+
+            keterangan = ' '.join((row.get(kolom.get('keterangan')) or '').split())[:255]
+            kunci = f'{tanggal.isoformat()}|{jumlah}|{keterangan.lower()}'
+            seen[kunci] += 1
+            batch.append({
+                'sidik': hashlib.sha256(f'{kunci}|{seen[kunci]}'.encode('utf-8')).hexdigest(),
+                'tanggal': tanggal,
+                'jenis': 'masuk' if jumlah > 0 else 'keluar',
+                'jumlah': abs(jumlah),
+                'keterangan': keterangan or None,
+                'status': 'belum',
+            })
+            if len(batch) >= BATCH_SIZE:
+                hasil['baru'] += RekonsiliasiService._insert(batch)
+                batch = []
+        if batch:
+            hasil['baru'] += RekonsiliasiService._insert(batch)
+        hasil['duplikat'] = hasil['baris'] - hasil['dilewati'] - hasil['baru']
+        return hasil
+
+    @staticmethod
+    def _insert(rows):
+        table = MutasiBank.__table__
+        insert = upsert_insert()
+        if insert is not None:
+            return db.session.execute(insert(table).values(rows).on_conflict_do_nothing()).rowcount
+        existing = {s for (s,) in db.session.query(MutasiBank.sidik)
+                    .filter(MutasiBank.sidik.in_([r['sidik'] for r in rows]))}
+        rows = [r for r in rows if r['sidik'] not in existing]
+        if rows:
+            db.session.execute(table.insert(), rows)
+        return len(rows)
+
+    # --- Matching ---
+
+    @staticmethod
+    def _kandidat(start_date, end_date):
+        """
+        Unmatched ledger rows that can appear on the bank statement, as
+        (key, jenis, tanggal, jumlah, tokens) tuples. key is ('transaksi'|'keuangan', id).
+        """
+        matched_tx = db.select(MutasiBank.transaksi_id).where(MutasiBank.transaksi_id.isnot(None))
+        matched_spp = db.select(MutasiBank.keuangan_id).where(MutasiBank.keuangan_id.isnot(None))
+
+        transaksi = db.session.query(
+            TransaksiKeuangan.id, TransaksiKeuangan.jenis, TransaksiKeuangan.tanggal, TransaksiKeuangan.jumlah,
+            TransaksiKeuangan.keterangan, Santri.nama, Santri.nis
+        ).outerjoin(Santri, TransaksiKeuangan.santri_id == Santri.id).filter(
+            TransaksiKeuangan.metode_pembayaran == 'Transfer',
+            TransaksiKeuangan.tanggal >= start_date, TransaksiKeuangan.tanggal <= end_date,
+            TransaksiKeuangan.id.notin_(matched_tx)
+        )
+        for id_, jenis, tanggal, jumlah, keterangan, nama, nis in transaksi:
+            yield (('transaksi', id_), jenis, tanggal, Decimal(jumlah).quantize(NOL),
+                   token(keterangan) | token(nama) | token(nis))
+
+        spp = db.session.query(
+            Keuangan.id, Keuangan.tanggal_bayar, Keuangan.jumlah, Keuangan.bulan, Santri.nama, Santri.nis
+        ).join(Santri, Keuangan.santri_id == Santri.id).filter(
+            Keuangan.status == 'Lunas',
+            Keuangan.tanggal_bayar >= start_date, Keuangan.tanggal_bayar <= end_date,
+            Keuangan.id.notin_(matched_spp)
+        )
+        for id_, tanggal, jumlah, bulan, nama, nis in spp:
+            if jumlah is None:
+                continue
+            yield (('keuangan', id_), 'masuk', tanggal, Decimal(jumlah).quantize(NOL),
+                   token(bulan) | token(nama) | token(nis))
+
+    @staticmethod
+    def cocokkan(start_date, end_date, toleransi_hari=TOLERANSI_HARI):
+        """
+        Reconcile the open ('belum'/'tinjau') statement lines dated in the period.
+        Returns {'cocok', 'tinjau', 'belum'} counts. Does not commit.
+        """
+        mutasi = db.session.query(
+            MutasiBank.id, MutasiBank.jenis, MutasiBank.tanggal, MutasiBank.jumlah, MutasiBank.keterangan
+        ).filter(
+            MutasiBank.status.in_(('belum', 'tinjau')),
+            MutasiBank.tanggal >= start_date, MutasiBank.tanggal <= end_date
+        ).all()
+        if not mutasi:
+            return {'cocok': 0, 'tinjau': 0, 'belum': 0}
+
+        # Hash indexes over the candidates (the date window is widened by the tolerance)
+        toleransi = timedelta(days=toleransi_hari)
+        by_tanggal_jumlah = defaultdict(list)
+        tokens_of = {}
+        for key, jenis, tanggal, jumlah, tokens in RekonsiliasiService._kandidat(
+                start_date - toleransi, end_date + toleransi):
+            by_tanggal_jumlah[(jenis, tanggal, jumlah)].append(key)
+            tokens_of[key] = tokens
+        by_token = defaultdict(set)
+        for key, tokens in tokens_of.items():
+            for t in tokens:
+                by_token[t].add(key)
+
+        # Score every statement line against the candidates found through the indexes
+        scored = {}
+        for id_, jenis, tanggal, jumlah, keterangan in mutasi:
+            jumlah = Decimal(jumlah).quantize(NOL)
+            words = token(keterangan)
+            shared = Counter(key for t in words for key in by_token.get(t, ()))
+            candidates = []
+            for offset in range(-toleransi_hari, toleransi_hari + 1):
+                for key in by_tanggal_jumlah.get((jenis, tanggal + timedelta(days=offset), jumlah), ()):
+                    skor = SKOR_DASAR - SKOR_PER_HARI * abs(offset) \
+                        + min(SKOR_PER_TOKEN * shared[key], SKOR_TOKEN_MAKS)
+                    candidates.append((skor, key))
+            candidates.sort(key=lambda c: (-c[0], c[1]))
+            scored[id_] = candidates
+
+        # Clear winners first, best score first, each ledger row used once
+        taken = set()
+        keputusan = {}
+        jelas = sorted(
+            ((c[0][0], id_) for id_, c in scored.items()
+             if c and (len(c) == 1 or c[0][0] - c[1][0] >= SELISIH_MINIMUM)),
+            reverse=True
+        )
+        for _, id_ in jelas:
+            key = scored[id_][0][1]
+            if key not in taken:
+                taken.add(key)
+                keputusan[id_] = ('cocok', key, None)
+
+        for id_, candidates in scored.items():
+            if id_ in keputusan:
+                continue
+            open_candidates = [(s, k) for s, k in candidates if k not in taken]
+            if open_candidates:
+                keputusan[id_] = ('tinjau', None, [
+                    {'jenis': k[0], 'id': k[1], 'skor': s} for s, k in open_candidates[:5]
+                ])
+            else:
+                keputusan[id_] = ('belum', None, None)
+
+        rows = [{
+            'b_id': id_,
+            'b_status': status,
+            'b_transaksi_id': key[1] if key and key[0] == 'transaksi' else None,
+            'b_keuangan_id': key[1] if key and key[0] == 'keuangan' else None,
+            'b_kandidat': json.dumps(kandidat) if kandidat else None,
+            'b_otomatis': status == 'cocok',
+        } for id_, (status, key, kandidat) in keputusan.items()]
+        table = MutasiBank.__table__
+        db.session.execute(
+            table.update().where(table.c.id == bindparam('b_id')).values(
+                status=bindparam('b_status'),
+                transaksi_id=bindparam('b_transaksi_id'),
+                keuangan_id=bindparam('b_keuangan_id'),
+                kandidat=bindparam('b_kandidat'),
+                otomatis=bindparam('b_otomatis'),
+            ),
+            rows
+        )
+
+        counts = Counter(status for status, _, _ in keputusan.values())
+        return {'cocok': counts['cocok'], 'tinjau': counts['tinjau'], 'belum': counts['belum']}
+
+    # --- Review queue ---
+
+    @staticmethod
+    def tetapkan(mutasi, jenis, target_id):
+        """
+        Match a statement line to a ledger row chosen by a reviewer. The line must
+        still be open and the row must exist, go the same direction (an SPP bill only
+        matches money in, once Lunas) and have the same amount. Does not commit.
+        """
+        model, column = {'transaksi': (TransaksiKeuangan, 'transaksi_id'),
+                         'keuangan': (Keuangan, 'keuangan_id')}.get(jenis, (None, None))
+        if model is None:
+            raise ValueError(f'Jenis tidak dikenal: {jenis}')
+        if mutasi.status not in ('belum', 'tinjau'):
+            raise ValueError('Mutasi ini sudah diproses; buka kembali sebelum menetapkan pasangannya.')
+        target = db.session.get(model, target_id)
+        if target is None:
+            raise ValueError('Transaksi yang dipilih tidak ditemukan.')
+        if jenis == 'transaksi':
+            sesuai = target.jenis == mutasi.jenis
+        else:
+            sesuai = mutasi.jenis == 'masuk' and target.status == 'Lunas'
+        if not sesuai:
+            raise ValueError('Jenis transaksi tidak sesuai dengan arah mutasi.')
+        if target.jumlah is None or Decimal(target.jumlah).quantize(NOL) != Decimal(mutasi.jumlah).quantize(NOL):
+            raise ValueError('Jumlah transaksi tidak sama dengan jumlah mutasi.')
+        if MutasiBank.query.filter(getattr(MutasiBank, column) == target_id, MutasiBank.id != mutasi.id).first():
+            raise ValueError('Transaksi tersebut sudah dicocokkan dengan mutasi lain.')
+        mutasi.transaksi_id = target_id if jenis == 'transaksi' else None
+        mutasi.keuangan_id = target_id if jenis == 'keuangan' else None
+        mutasi.status = 'cocok'
+        mutasi.kandidat = None
+        mutasi.otomatis = False
+
+    @staticmethod
+    def abaikan(mutasi):
+        mutasi.status = 'abaikan'
+        mutasi.transaksi_id = mutasi.keuangan_id = None
+        mutasi.kandidat = None
+
+    @staticmethod
+    def lepaskan(mutasi_id=None, transaksi_id=None, keuangan_id=None):
+        """
+        Put a statement line, or the lines matched to a ledger row that is being
+        deleted, back in the open state. Does not commit.
+        """
+        query = MutasiBank.query
+        if mutasi_id is not None:
+            query = query.filter(MutasiBank.id == mutasi_id)
+        elif transaksi_id is not None:
+            query = query.filter(MutasiBank.transaksi_id == transaksi_id)
+        elif keuangan_id is not None:
+            query = query.filter(MutasiBank.keuangan_id == keuangan_id)
+        else:
+            return 0
+        return query.update({'status': 'belum', 'transaksi_id': None, 'keuangan_id': None,
+                             'kandidat': None, 'otomatis': False}, synchronize_session=False)
+
+    @staticmethod
+    def label_kandidat(kandidat):
+        """
+        Describe the candidates of a page of review items with two queries:
+        {('transaksi'|'keuangan', id): 'text'}.
+        """
+        ids = defaultdict(set)
+        for item in kandidat:
+            ids[item['jenis']].add(item['id'])
+        labels = {}
+        if ids['transaksi']:
+            for tx in TransaksiKeuangan.query.options(db.joinedload(TransaksiKeuangan.pos),
+                                                      db.joinedload(TransaksiKeuangan.santri))\
+                    .filter(TransaksiKeuangan.id.in_(ids['transaksi'])):
+                labels[('transaksi', tx.id)] = ' - '.join(filter(None, [
+                    tx.tanggal.strftime('%d/%m/%Y'), tx.pos.nama if tx.pos else None,
+                    tx.santri.nama if tx.santri else None, tx.keterangan
+                ]))
+        if ids['keuangan']:
+            for spp in Keuangan.query.options(db.joinedload(Keuangan.santri))\
+                    .filter(Keuangan.id.in_(ids['keuangan'])):
+                labels[('keuangan', spp.id)] = ' - '.join(filter(None, [
+                    spp.tanggal_bayar.strftime('%d/%m/%Y') if spp.tanggal_bayar else None,
+                    f'SPP {spp.bulan} {spp.tahun}', spp.santri.nama if spp.santri else None
+                ]))
+        return labels
@@ -0,0 +1,190 @@
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+from sqlalchemy import event, func, extract, inspect
+from app import db
+from app.models.keuangan import TransaksiKeuangan, SaldoHarian
+from app.services.bulk import upsert_insert
+
+NOL = Decimal('0.00')
+
+# TransaksiKeuangan.jenis -> column of SaldoHarian
+JENIS_COLUMNS = {
+    'masuk': 'masuk',
+    'keluar': 'keluar',
+}
+
+
+def _bulan_sebelumnya(tahun, bulan):
+    return (tahun - 1, 12) if bulan == 1 else (tahun, bulan - 1)
+
+
+class SaldoHarianService:
+    """
+    Keeps `saldo_harian` (daily masuk/keluar totals per pos) in step with `transaksi_keuangan`.
+
+    Every flushed insert, update or delete of a TransaksiKeuangan is applied as a
+    signed delta in the same transaction (see the session hook below), so balances
+    as of any date cost one row per day and pos instead of a full history scan.
+    """
+
+    @staticmethod
+    def apply(changes, connection=None):
+        """
+        Apply transaction changes. `changes` is an iterable of (pos_id, tanggal, jenis, jumlah),
+        with a negative jumlah for a removed transaction. Does not commit.
+        """
+        deltas = defaultdict(lambda: dict.fromkeys(JENIS_COLUMNS.values(), NOL))
+        for pos_id, tanggal, jenis, jumlah in changes:
+            column = JENIS_COLUMNS.get(jenis)
+            if column is None or pos_id is None or tanggal is None or jumlah is None:
+                continue
+            if isinstance(tanggal, datetime):
+                tanggal = tanggal.date()
+            deltas[(pos_id, tanggal)][column] += Decimal(jumlah)
+
+        rows = [
+            dict(pos_id=pos_id, tanggal=tanggal, **amounts)
+            for (pos_id, tanggal), amounts in deltas.items()
+            if any(amounts.values())
+        ]
+        if rows:
+            SaldoHarianService._increment(rows, connection or db.session.connection())
+        return len(rows)
+
+    @staticmethod
+    def _increment(rows, connection):
+        table = SaldoHarian.__table__
+        columns = list(JENIS_COLUMNS.values())
+        insert = upsert_insert(connection)
+        if insert is not None:
+            stmt = insert(table).values(rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['pos_id', 'tanggal'],
+                set_={col: table.c[col] + stmt.excluded[col] for col in columns}
+            )
+            connection.execute(stmt)
+            return
+
+        # Other databases: UPDATE first, INSERT the days that did not exist yet
+        for row in rows:
+            updated = connection.execute(
+                table.update()
+                .where(table.c.pos_id == row['pos_id'], table.c.tanggal == row['tanggal'])
+                .values({col: table.c[col] + row[col] for col in columns})
+            ).rowcount
+            if not updated:
+                connection.execute(table.insert().values(row))
+
+    @staticmethod
+    def rebuild(pos_ids=None):
+        """
+        Recompute the daily totals from `transaksi_keuangan` (backfill / repair).
+        Limited to `pos_ids` when given. Does not commit.
+        """
+        delete = SaldoHarian.query
+        if pos_ids is not None:
+            delete = delete.filter(SaldoHarian.pos_id.in_(pos_ids))
+        delete.delete(synchronize_session=False)
+
+        amounts = [
+            func.coalesce(func.sum(db.case((TransaksiKeuangan.jenis == jenis, TransaksiKeuangan.jumlah), else_=0)), 0)
+            for jenis in JENIS_COLUMNS
+        ]
+        select = db.select(TransaksiKeuangan.pos_id, TransaksiKeuangan.tanggal, *amounts)\
+            .where(TransaksiKeuangan.tanggal.isnot(None))\
+            .group_by(TransaksiKeuangan.pos_id, TransaksiKeuangan.tanggal)
+        if pos_ids is not None:
+            select = select.where(TransaksiKeuangan.pos_id.in_(pos_ids))
+
+        result = db.session.execute(
+            SaldoHarian.__table__.insert().from_select(
+                ['pos_id', 'tanggal'] + list(JENIS_COLUMNS.values()), select
+            )
+        )
+        return result.rowcount
+
+    @staticmethod
+    def saldo_sebelum(tanggal):
+        """
+        Balance (all masuk minus all keluar) of every transaction dated before `tanggal`.
+        """
+        saldo = db.session.query(func.sum(SaldoHarian.masuk - SaldoHarian.keluar))\
+            .filter(SaldoHarian.tanggal < tanggal).scalar()
+        return Decimal(saldo or 0).quantize(NOL)
+
+    @staticmethod
+    def bulanan(start_date, end_date):
+        """
+        Month-by-month totals between `start_date` and `end_date` (inclusive), each with
+        the change of its net amount against the month before:
+        [{'tahun', 'bulan', 'masuk', 'keluar', 'bersih', 'selisih'}, ...].
+        """
+        # Start from the month before, so the first month has something to compare with
+        tahun, bulan = _bulan_sebelumnya(start_date.year, start_date.month)
+        awal = date(tahun, bulan, 1)
+        th = extract('year', SaldoHarian.tanggal)
+        bl = extract('month', SaldoHarian.tanggal)
+        rows = db.session.query(th, bl, func.sum(SaldoHarian.masuk), func.sum(SaldoHarian.keluar))\
+            .filter(SaldoHarian.tanggal >= awal, SaldoHarian.tanggal <= end_date)\
+            .group_by(th, bl).all()
+        totals = {(int(t), int(b)): (Decimal(m or 0).quantize(NOL), Decimal(k or 0).quantize(NOL))
+                  for t, b, m, k in rows}
+
+        result = []
+        sebelumnya = totals.get((tahun, bulan), (NOL, NOL))
+        tahun, bulan = start_date.year, start_date.month
+        while (tahun, bulan) <= (end_date.year, end_date.month):
+            masuk, keluar = totals.get((tahun, bulan), (NOL, NOL))
+            bersih = masuk - keluar
+            result.append({
+                'tahun': tahun, 'bulan': bulan,
+                'masuk': masuk, 'keluar': keluar, 'bersih': bersih,
+                'selisih': bersih - (sebelumnya[0] - sebelumnya[1]),
+            })
+            sebelumnya = (masuk, keluar)
+            tahun, bulan = (tahun + 1, 1) if bulan == 12 else (tahun, bulan + 1)
+        return result
+
+
+_TRACKED = ('pos_id', 'tanggal', 'jenis', 'jumlah')
+
+
+def _keep_old_value(target, value, oldvalue, initiator):
+    pass
+
+
+# active_history loads the previous value before an expired attribute is overwritten
+# (e.g. edited after a commit), so the old day/pos can be decremented.
+for _attr in _TRACKED:
+    event.listen(getattr(TransaksiKeuangan, _attr), 'set', _keep_old_value, active_history=True)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _apply_transaksi_changes(session, flush_context):
+    changes = []
+    for obj in session.new:
+        if isinstance(obj, TransaksiKeuangan):
+            changes.append((obj.pos_id, obj.tanggal, obj.jenis, obj.jumlah))
+    for obj in session.deleted:
+        if isinstance(obj, TransaksiKeuangan):
+            old = {attr: _old_value(obj, attr) for attr in _TRACKED}
+            changes.append((old['pos_id'], old['tanggal'], old['jenis'], -Decimal(old['jumlah'] or 0)))
+    for obj in session.dirty:
+        if isinstance(obj, TransaksiKeuangan) and session.is_modified(obj):
+            old = {attr: _old_value(obj, attr) for attr in _TRACKED}
+            if old['jumlah'] is not None:
+                changes.append((old['pos_id'], old['tanggal'], old['jenis'], -Decimal(old['jumlah'])))
+            changes.append((obj.pos_id, obj.tanggal, obj.jenis, obj.jumlah))
+    if changes:
+        SaldoHarianService.apply(changes, session.connection())
+
+
+def _old_value(obj, attr):
+    """Value of `attr` before this flush (the current value if it was not changed)."""
+    history = inspect(obj).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return getattr(obj, attr)
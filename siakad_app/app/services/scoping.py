@@ -0,0 +1,29 @@
+from flask import g
+from flask_login import current_user
+from app import db
+from app.models.akademik import Santri
+
+
+def wali_santri_ids():
+    """
+    SELECT of the ids of the current user's children (santri.wali_user_id, indexed).
+    Built once per request and embedded in the caller's query as a subquery,
+    so scoping never costs a separate round trip.
+    """
+    if 'wali_santri_ids' not in g:
+        g.wali_santri_ids = db.select(Santri.id).where(Santri.wali_user_id == current_user.id)
+    return g.wali_santri_ids
+
+
+def scope_santri(query, santri_id_column=None):
+    """
+    Restrict `query` to the santri a wali_santri user may see; other roles are unrestricted.
+
+    `santri_id_column` is the column holding the santri id (e.g. Nilai.santri_id).
+    Leave it out when `query` selects Santri itself.
+    """
+    if current_user.role != 'wali_santri':
+        return query
+    if santri_id_column is None:
+        return query.filter(Santri.wali_user_id == current_user.id)
+    return query.filter(santri_id_column.in_(wali_santri_ids()))
@@ -0,0 +1,132 @@
+import numpy as np
+from sqlalchemy import func
+from app import db
+from app.models.akademik import Nilai, Santri, MataPelajaran
+
+KOMPONEN = ('nilai_harian', 'nilai_uts', 'nilai_uas', 'nilai_praktik')
+
+
+class StatistikKelasService:
+    """
+    Class ranking and per-mapel grade statistics for one kelas and semester.
+
+    All Nilai rows of the class are read in one query and loaded into a
+    santri x mapel x komponen array; scores, ranks and statistics are then
+    computed with array operations.
+
+    `untuk_santri` is the cheaper variant for a single raport: the database
+    returns one average per santri and one per mapel instead of every grade.
+    """
+
+    @staticmethod
+    def hitung(kelas_id, semester):
+        rows = db.session.query(
+            Nilai.santri_id, Santri.nama, Nilai.mapel_id, MataPelajaran.nama_mapel, MataPelajaran.kkm,
+            *[getattr(Nilai, k) for k in KOMPONEN]
+        ).join(Santri, Nilai.santri_id == Santri.id)\
+            .join(MataPelajaran, Nilai.mapel_id == MataPelajaran.id)\
+            .filter(Santri.kelas_id == kelas_id, Santri.status == 'aktif', Nilai.semester == semester)\
+            .all()
+        if not rows:
+            return {'santri': [], 'mapel': [], 'peringkat': {}, 'rata_mapel': {}, 'jumlah_santri': 0}
+
+        santri_ids = np.array([r[0] for r in rows])
+        mapel_ids = np.array([r[2] for r in rows])
+        santri_index, s_pos = np.unique(santri_ids, return_inverse=True)
+        mapel_index, m_pos = np.unique(mapel_ids, return_inverse=True)
+        nama_santri = {r[0]: r[1] for r in rows}
+        mapel_info = {r[2]: (r[3], r[4]) for r in rows}
+
+        # Missing components count as 0, like RaportService; missing (santri, mapel) cells stay NaN
+        komponen = np.array([r[5:] for r in rows], dtype=float)
+        komponen = np.nan_to_num(komponen, nan=0.0)
+        nilai = np.full((len(santri_index), len(mapel_index), len(KOMPONEN)), np.nan)
+        nilai[s_pos, m_pos] = komponen
+
+        akhir = nilai.mean(axis=2)  # santri x mapel, NaN where no grade
+        kkm = np.array([mapel_info[m][1] if mapel_info[m][1] is not None else 0 for m in mapel_index], dtype=float)
+        ada = ~np.isnan(akhir)
+
+        # Per santri
+        # Over every mapel graded in the class, a missing grade counting as 0, so one good
+        # grade cannot outrank a full report. Rounded before ranking so equal averages tie
+        # regardless of float noise
+        rata_santri = np.round(np.nansum(akhir, axis=1) / len(mapel_index), 2)
+        jumlah_santri = np.nansum(akhir, axis=1)
+        # Standard competition ranking (1, 2, 2, 4): 1 + number of strictly higher averages
+        urut = np.sort(rata_santri)
+        peringkat = len(urut) - np.searchsorted(urut, rata_santri, side='right') + 1
+        bawah_kkm_santri = np.sum(ada & (akhir < kkm[None, :]), axis=1)
+
+        # Per mapel
+        jumlah_nilai = ada.sum(axis=0)
+        bawah_kkm_mapel = np.sum(ada & (akhir < kkm[None, :]), axis=0)
+        rata_mapel = np.nanmean(akhir, axis=0)
+        median_mapel = np.nanmedian(akhir, axis=0)
+        std_mapel = np.nanstd(akhir, axis=0)
+        min_mapel = np.nanmin(akhir, axis=0)
+        max_mapel = np.nanmax(akhir, axis=0)
+
+        santri = sorted([
+            {
+                'santri_id': int(sid),
+                'nama': nama_santri[sid],
+                'rata_rata': round(float(rata_santri[i]), 2),
+                'jumlah': round(float(jumlah_santri[i]), 2),
+                'peringkat': int(peringkat[i]),
+                'bawah_kkm': int(bawah_kkm_santri[i]),
+            }
+            for i, sid in enumerate(santri_index)
+        ], key=lambda s: (s['peringkat'], s['nama']))
+
+        mapel = [
+            {
+                'mapel_id': int(mid),
+                'nama_mapel': mapel_info[mid][0],
+                'kkm': float(kkm[j]),
+                'jumlah_nilai': int(jumlah_nilai[j]),
+                'rata_rata': round(float(rata_mapel[j]), 2),
+                'median': round(float(median_mapel[j]), 2),
+                'std': round(float(std_mapel[j]), 2),
+                'min': round(float(min_mapel[j]), 2),
+                'max': round(float(max_mapel[j]), 2),
+                'bawah_kkm': int(bawah_kkm_mapel[j]),
+            }
+            for j, mid in enumerate(mapel_index)
+        ]
+
+        return {
+            'santri': santri,
+            'mapel': mapel,
+            'peringkat': {s['santri_id']: s['peringkat'] for s in santri},
+            'rata_mapel': {m['mapel_id']: m['rata_rata'] for m in mapel},
+            'jumlah_santri': len(santri),
+        }
+
+    @staticmethod
+    def untuk_santri(kelas_id, semester, santri_id):
+        """
+        The part of `hitung` a single raport needs, in the same shape:
+        {'peringkat': {santri_id: rank}, 'rata_mapel', 'jumlah_santri'}.
+        """
+        # Missing components count as 0, like RaportService
+        akhir = sum(func.coalesce(getattr(Nilai, k), 0) for k in KOMPONEN) / float(len(KOMPONEN))
+        filters = (Santri.kelas_id == kelas_id, Santri.status == 'aktif', Nilai.semester == semester)
+
+        jumlah_santri = db.session.query(Nilai.santri_id, func.sum(akhir))\
+            .join(Santri, Nilai.santri_id == Santri.id)\
+            .filter(*filters).group_by(Nilai.santri_id).all()
+        rata_mapel = db.session.query(Nilai.mapel_id, func.avg(akhir))\
+            .join(Santri, Nilai.santri_id == Santri.id)\
+            .filter(*filters).group_by(Nilai.mapel_id).all()
+
+        # Same averaging over every mapel of the class, rounding and competition ranking as `hitung`
+        rata = {sid: round(float(jumlah) / len(rata_mapel), 2) for sid, jumlah in jumlah_santri}
+        peringkat = {}
+        if santri_id in rata:
+            peringkat[santri_id] = 1 + sum(1 for nilai in rata.values() if nilai > rata[santri_id])
+        return {
+            'peringkat': peringkat,
+            'rata_mapel': {mid: round(float(nilai), 2) for mid, nilai in rata_mapel},
+            'jumlah_santri': len(rata),
+        }
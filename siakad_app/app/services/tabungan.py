@@ -0,0 +1,186 @@
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import func
+from app import db
+from app.models.akademik import Santri
+from app.models.keuangan import TabunganSantri, SaldoTabungan
+from app.services.bulk import upsert_insert
+
+JENIS_TABUNGAN = ('setor', 'tarik')
+
+
+class SaldoTidakCukup(Exception):
+    """Raised when a withdrawal would take a santri's balance below zero."""
+    def __init__(self, santri_id, saldo):
+        super().__init__(f'Saldo tidak mencukupi (saldo saat ini: {saldo:,.0f})')
+        self.santri_id = santri_id
+        self.saldo = saldo
+
+
+class TabunganService:
+    """
+    Posts savings deposits/withdrawals against the per-santri `saldo_tabungan` row.
+
+    The balance is changed with a single conditional UPDATE (saldo + delta >= 0),
+    which takes the row lock for the rest of the transaction, so two tellers
+    posting for the same santri are serialised by the database instead of both
+    reading the same balance. The ledger row is inserted in the same transaction
+    with the balance the UPDATE returned. Amounts are Decimal throughout.
+    """
+
+    @staticmethod
+    def _ensure_rows(santri_ids):
+        rows = [{'santri_id': sid, 'saldo': Decimal('0.00')} for sid in set(santri_ids)]
+        if not rows:
+            return
+        insert = upsert_insert()
+        if insert is not None:
+            db.session.execute(insert(SaldoTabungan.__table__).values(rows).on_conflict_do_nothing())
+            return
+        existing = {sid for (sid,) in db.session.query(SaldoTabungan.santri_id)
+                    .filter(SaldoTabungan.santri_id.in_([r['santri_id'] for r in rows]))}
+        missing = [r for r in rows if r['santri_id'] not in existing]
+        if missing:
+            db.session.execute(SaldoTabungan.__table__.insert(), missing)
+
+    @staticmethod
+    def _update_saldo(santri_id, delta):
+        """
+        Add `delta` to the balance unless it would go negative. Returns the new
+        balance, or None when the balance was insufficient (nothing changed).
+        """
+        table = SaldoTabungan.__table__
+        stmt = table.update()\
+            .where(table.c.santri_id == santri_id, table.c.saldo + delta >= 0)\
+            .values(saldo=table.c.saldo + delta, updated_at=datetime.utcnow())
+        if db.session.get_bind().dialect.update_returning:
+            return db.session.execute(stmt.returning(table.c.saldo)).scalar()
+        if not db.session.execute(stmt).rowcount:
+            return None
+        return db.session.execute(db.select(table.c.saldo).where(table.c.santri_id == santri_id)).scalar()
+
+    @staticmethod
+    def saldo(santri_id):
+        value = db.session.query(SaldoTabungan.saldo).filter(SaldoTabungan.santri_id == santri_id).scalar()
+        return Decimal(value or 0).quantize(Decimal('0.01'))
+
+    @staticmethod
+    def posting(santri_id, jenis, jumlah, tanggal=None, keterangan=None, user_id=None):
+        """
+        Post one deposit ('setor') or withdrawal ('tarik'). Raises SaldoTidakCukup
+        for an overdraft. Does not commit; the caller owns the transaction.
+        """
+        TabunganService._ensure_rows([santri_id])
+        return TabunganService._posting(santri_id, jenis, jumlah, tanggal, keterangan, user_id)
+
+    @staticmethod
+    def _posting(santri_id, jenis, jumlah, tanggal, keterangan, user_id):
+        if jenis not in JENIS_TABUNGAN:
+            raise ValueError(f'Jenis tabungan tidak dikenal: {jenis}')
+        try:
+            jumlah = Decimal(jumlah)
+            # NaN/Infinity parse, but cannot be compared or quantized
+            if not jumlah.is_finite():
+                raise InvalidOperation
+            jumlah = jumlah.quantize(Decimal('0.01'))
+        except (InvalidOperation, TypeError, ValueError):
+            raise ValueError('Jumlah tidak valid.')
+        if jumlah <= 0:
+            raise ValueError('Jumlah harus lebih dari 0.')
+
+        saldo = TabunganService._update_saldo(santri_id, jumlah if jenis == 'setor' else -jumlah)
+        if saldo is None:
+            raise SaldoTidakCukup(santri_id, TabunganService.saldo(santri_id))
+
+        tabungan = TabunganSantri(
+            santri_id=santri_id,
+            jenis=jenis,
+            jumlah=jumlah,
+            tanggal=tanggal or datetime.utcnow(),
+            keterangan=keterangan,
+            user_id=user_id,
+            saldo_akhir=saldo
+        )
+        db.session.add(tabungan)
+        return tabungan
+
+    @staticmethod
+    def posting_batch(items, tanggal=None, user_id=None):
+        """
+        Post many entries in one transaction. `items` are dicts with santri_id (or nis),
+        jenis, jumlah and optionally keterangan.
+
+        Entries are applied per santri in their original order; santri are taken in id
+        order so concurrent batches lock rows in the same order and cannot deadlock.
+        An entry that fails (unknown santri, bad amount, overdraft) is reported and
+        skipped; the others are still posted. Does not commit.
+
+        Returns a list of (index, TabunganSantri or None, error message or None) in input order.
+        """
+        nis_list = {str(item['nis']).strip() for item in items if not item.get('santri_id') and item.get('nis')}
+        by_nis = dict(db.session.query(Santri.nis, Santri.id).filter(Santri.nis.in_(nis_list))) if nis_list else {}
+
+        resolved = []
+        results = {}
+        for index, item in enumerate(items):
+            santri_id = item.get('santri_id') or by_nis.get(str(item.get('nis') or '').strip())
+            try:
+                santri_id = int(santri_id) if santri_id else None
+            except (TypeError, ValueError):
+                santri_id = None
+            if santri_id is None:
+                results[index] = (index, None, 'Santri tidak ditemukan.')
+            else:
+                resolved.append((santri_id, index, item))
+
+        known = {sid for (sid,) in db.session.query(Santri.id).filter(Santri.id.in_({r[0] for r in resolved}))} \
+            if resolved else set()
+        TabunganService._ensure_rows(known)
+
+        for santri_id, index, item in sorted(resolved, key=lambda r: (r[0], r[1])):
+            if santri_id not in known:
+                results[index] = (index, None, 'Santri tidak ditemukan.')
+                continue
+            try:
+                jumlah = Decimal(str(item.get('jumlah')).replace(',', '').strip())
+            except (InvalidOperation, TypeError):
+                jumlah = None
+            if jumlah is None or not jumlah.is_finite():
+                results[index] = (index, None, 'Jumlah tidak valid.')
+                continue
+            try:
+                tabungan = TabunganService._posting(
+                    santri_id, str(item.get('jenis', '')).strip().lower(), jumlah,
+                    item.get('tanggal') or tanggal, item.get('keterangan'), user_id
+                )
+            except (SaldoTidakCukup, ValueError) as e:
+                results[index] = (index, None, str(e))
+            else:
+                results[index] = (index, tabungan, None)
+
+        db.session.flush()
+        return [results[i] for i in range(len(items))]
+
+    @staticmethod
+    def rebuild(santri_ids=None):
+        """
+        Recompute balances from the `tabungan_santri` ledger (backfill / repair).
+        Limited to `santri_ids` when given. Does not commit.
+        """
+        delete = SaldoTabungan.query
+        if santri_ids is not None:
+            delete = delete.filter(SaldoTabungan.santri_id.in_(santri_ids))
+        delete.delete(synchronize_session=False)
+
+        saldo = func.sum(db.case((TabunganSantri.jenis == 'setor', TabunganSantri.jumlah),
+                                 else_=-TabunganSantri.jumlah))
+        select = db.select(TabunganSantri.santri_id, saldo, func.now())\
+            .where(TabunganSantri.santri_id.isnot(None))\
+            .group_by(TabunganSantri.santri_id)
+        if santri_ids is not None:
+            select = select.where(TabunganSantri.santri_id.in_(santri_ids))
+
+        result = db.session.execute(
+            SaldoTabungan.__table__.insert().from_select(['santri_id', 'saldo', 'updated_at'], select)
+        )
+        return result.rowcount
@@ -0,0 +1,58 @@
+from decimal import Decimal
+from sqlalchemy import literal, func
+from app import db
+from app.models.akademik import Santri
+from app.models.keuangan import Keuangan
+from app.services.bulk import upsert_insert
+
+STATUS_BELUM_LUNAS = 'Belum Lunas'
+
+
+class TagihanSppService:
+    """
+    Monthly SPP billing run: one 'Belum Lunas' Keuangan row per active santri.
+
+    The bills are written with a single INSERT ... SELECT over santri; santri that
+    already have a row for that month are skipped (NOT EXISTS, backed by the unique
+    (santri_id, tahun, bulan) key, which also absorbs a concurrent run).
+    """
+
+    @staticmethod
+    def _santri_filter(jenjang=None, kelas_id=None):
+        filters = [Santri.status == 'aktif']
+        if jenjang:
+            filters.append(Santri.jenjang == jenjang)
+        if kelas_id:
+            filters.append(Santri.kelas_id == kelas_id)
+        return filters
+
+    @staticmethod
+    def generate(tahun, bulan, jumlah, jenjang=None, kelas_id=None):
+        """
+        Bill every matching active santri for `bulan` (month name) / `tahun`.
+        Returns {'sasaran', 'dibuat', 'dilewati'}. Does not commit.
+        """
+        filters = TagihanSppService._santri_filter(jenjang, kelas_id)
+        sudah_ada = db.select(Keuangan.id).where(
+            Keuangan.santri_id == Santri.id, Keuangan.tahun == tahun, Keuangan.bulan == bulan
+        ).exists()
+        select = db.select(
+            Santri.id,
+            literal(bulan, db.String),
+            literal(tahun, db.Integer),
+            literal(Decimal(jumlah), db.Numeric(10, 2)),
+            literal(STATUS_BELUM_LUNAS, db.String),
+            # Set by Keuangan's validator for ORM inserts; this Core insert bypasses it
+            literal(Keuangan.hitung_periode(tahun, bulan), db.Integer),
+        ).where(*filters, ~sudah_ada)
+
+        columns = ['santri_id', 'bulan', 'tahun', 'jumlah', 'status', 'periode']
+        insert = upsert_insert()
+        if insert is not None:
+            stmt = insert(Keuangan.__table__).from_select(columns, select).on_conflict_do_nothing()
+        else:
+            stmt = Keuangan.__table__.insert().from_select(columns, select)
+
+        sasaran = db.session.query(func.count(Santri.id)).filter(*filters).scalar()
+        dibuat = db.session.execute(stmt).rowcount
+        return {'sasaran': sasaran, 'dibuat': dibuat, 'dilewati': sasaran - dibuat}
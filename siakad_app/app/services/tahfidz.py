@@ -0,0 +1,123 @@
+from flask import has_app_context
+from sqlalchemy import event
+from app import db, cache
+from app.models.akademik import Tahfidz
+from app.services.quran import SURAH, TOTAL_AYAT, JUZ_BOUNDS, posisi
+
+CACHE_KEY = 'tahfidz_progress:{}'
+
+
+def merge_intervals(intervals):
+    """
+    Merge overlapping or adjacent [start, end] intervals (inclusive).
+    Returns the merged list sorted by start.
+    """
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+
+class TahfidzProgressService:
+    """
+    Memorisation progress per santri: distinct ayat covered by all deposits, per juz and per surah.
+
+    Deposits are mapped to mushaf positions and interval-merged, so repeated or
+    overlapping deposits are only counted once. Deposits marked 'Ulang' (to be repeated)
+    are not counted. Results are cached per santri and dropped after a commit that
+    touched that santri's Tahfidz rows (see the session hooks below).
+    """
+    EXCLUDED_KELANCARAN = ('Ulang',)
+
+    @staticmethod
+    def get_progress(santri_id):
+        return TahfidzProgressService.get_progress_many([santri_id])[santri_id]
+
+    @staticmethod
+    def get_progress_many(santri_ids):
+        """
+        {santri_id: progress} for several santri. Only santri missing from the cache
+        are recomputed, with one query for all of them.
+        """
+        santri_ids = list(dict.fromkeys(santri_ids))
+        cached = cache.get_many(*[CACHE_KEY.format(sid) for sid in santri_ids]) if santri_ids else []
+        result = {sid: value for sid, value in zip(santri_ids, cached) if value is not None}
+
+        missing = [sid for sid in santri_ids if sid not in result]
+        if missing:
+            intervals = {sid: [] for sid in missing}
+            for santri_id, surah, mulai, selesai in db.session.query(
+                    Tahfidz.santri_id, Tahfidz.surah_nomor, Tahfidz.ayat_mulai, Tahfidz.ayat_selesai
+            ).filter(
+                Tahfidz.santri_id.in_(missing),
+                Tahfidz.surah_nomor.isnot(None),
+                Tahfidz.ayat_mulai.isnot(None),
+                Tahfidz.ayat_selesai.isnot(None),
+                db.or_(Tahfidz.kelancaran.is_(None), Tahfidz.kelancaran.notin_(TahfidzProgressService.EXCLUDED_KELANCARAN))
+            ).all():
+                intervals[santri_id].append((posisi(surah, mulai), posisi(surah, selesai)))
+
+            computed = {sid: TahfidzProgressService.compute(intervals[sid]) for sid in missing}
+            cache.set_many({CACHE_KEY.format(sid): value for sid, value in computed.items()}, timeout=0)
+            result.update(computed)
+        return result
+
+    @staticmethod
+    def compute(intervals):
+        """
+        Progress from (start, end) mushaf positions.
+        """
+        merged = merge_intervals(intervals)
+        total = sum(end - start + 1 for start, end in merged)
+
+        juz = []
+        for nomor in range(1, 31):
+            lo, hi = JUZ_BOUNDS[nomor - 1], JUZ_BOUNDS[nomor] - 1
+            covered = sum(max(0, min(end, hi) - max(start, lo) + 1) for start, end in merged)
+            if covered:
+                juz.append({'juz': nomor, 'ayat': covered, 'total': hi - lo + 1})
+
+        surah_selesai = 0
+        for nomor, _, jumlah in SURAH:
+            lo, hi = posisi(nomor, 1), posisi(nomor, jumlah)
+            if any(start <= lo and end >= hi for start, end in merged):
+                surah_selesai += 1
+
+        return {
+            'ayat': total,
+            'persen': round(total * 100 / TOTAL_AYAT, 2),
+            'juz_selesai': sum(1 for j in juz if j['ayat'] == j['total']),
+            'juz': juz,
+            'surah_selesai': surah_selesai,
+        }
+
+    @staticmethod
+    def invalidate(santri_ids):
+        cache.delete_many(*[CACHE_KEY.format(sid) for sid in santri_ids])
+
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_tahfidz_santri(session, flush_context):
+    dirty = session.info.setdefault('tahfidz_dirty', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Tahfidz):
+            if obj.santri_id is not None:
+                dirty.add(obj.santri_id)
+            # A deposit moved to another santri changes the previous owner's progress too
+            dirty.update(v for v in db.inspect(obj).attrs.santri_id.history.deleted if v is not None)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_tahfidz_progress(session):
+    dirty = session.info.pop('tahfidz_dirty', None)
+    if dirty and has_app_context():
+        TahfidzProgressService.invalidate(dirty)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_tahfidz_santri(session):
+    session.info.pop('tahfidz_dirty', None)
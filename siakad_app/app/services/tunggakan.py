@@ -0,0 +1,120 @@
+from decimal import Decimal
+from sqlalchemy import literal, func, true, and_, or_
+from app import db
+from app.models.akademik import Santri, Kelas
+from app.models.keuangan import Keuangan
+from app.services.pagination import keyset_paginate
+from app.services.referensi import ReferensiCache
+
+NOL = Decimal('0.00')
+
+# Longest range one report may cover, in months
+MAKS_BULAN = 36
+
+# Status of a month for which no Keuangan row exists
+BELUM_DITAGIH = 'Belum Ditagih'
+
+
+def daftar_periode(dari, sampai):
+    """
+    Periods from `dari` to `sampai` inclusive (202411, 202412, 202501, ...), at most MAKS_BULAN.
+    """
+    result = []
+    periode = dari
+    while periode <= sampai and len(result) < MAKS_BULAN:
+        result.append(periode)
+        periode = periode + 89 if periode % 100 == 12 else periode + 1
+    return result
+
+
+class TunggakanService:
+    """
+    Arrears report: the months of a range that each active santri has not paid.
+
+    Every (santri, periode) pair of the range is left-joined to keuangan on the
+    (santri_id, periode, status) index and kept when there is no row or the row
+    is not 'Lunas' - one anti-join statement instead of loading all payments.
+    Totals per kelas are grouped by the database; the per-santri list is keyset
+    paginated and the detail rows can be streamed for export.
+
+    A month without any bill is valued at `tarif` (0 when not given); a billed
+    month at the amount of its bill.
+    """
+
+    @staticmethod
+    def _tunggakan(dari, sampai, tarif=NOL, kelas_id=None):
+        periode = db.union_all(*[
+            db.select(literal(p, db.Integer).label('periode')) for p in daftar_periode(dari, sampai)
+        ]).subquery('periode_tagihan')
+
+        filters = [Santri.status == 'aktif',
+                   or_(Keuangan.id.is_(None), Keuangan.status.is_distinct_from('Lunas'))]
+        if kelas_id:
+            filters.append(Santri.kelas_id == kelas_id)
+
+        return db.select(
+            Santri.id.label('santri_id'),
+            Santri.kelas_id.label('kelas_id'),
+            periode.c.periode,
+            func.coalesce(Keuangan.status, BELUM_DITAGIH).label('status'),
+            func.coalesce(Keuangan.jumlah, literal(Decimal(tarif), db.Numeric(10, 2))).label('nominal'),
+        ).select_from(Santri).join(periode, true())\
+            .outerjoin(Keuangan, and_(Keuangan.santri_id == Santri.id, Keuangan.periode == periode.c.periode))\
+            .where(*filters)\
+            .subquery('tunggakan')
+
+    @staticmethod
+    def per_kelas(dari, sampai, tarif=NOL, kelas_id=None):
+        """
+        [{'kelas_id', 'nama_kelas', 'santri', 'bulan', 'total'}, ...] ordered by kelas name,
+        plus the grand total as {'santri', 'bulan', 'total'}.
+        """
+        t = TunggakanService._tunggakan(dari, sampai, tarif, kelas_id)
+        rows = db.session.query(
+            t.c.kelas_id, func.count(func.distinct(t.c.santri_id)), func.count(), func.sum(t.c.nominal)
+        ).group_by(t.c.kelas_id).all()
+
+        kelas = {k['id']: k['nama_kelas'] for k in ReferensiCache.rows(Kelas)}
+        summary = []
+        total = {'santri': 0, 'bulan': 0, 'total': NOL}
+        for k_id, santri, bulan, nominal in rows:
+            nominal = Decimal(nominal or 0).quantize(NOL)
+            summary.append({'kelas_id': k_id, 'nama_kelas': kelas.get(k_id, '-'),
+                            'santri': santri, 'bulan': bulan, 'total': nominal})
+            total['santri'] += santri
+            total['bulan'] += bulan
+            total['total'] += nominal
+        summary.sort(key=lambda s: (s['kelas_id'] is None, s['nama_kelas']))
+        return summary, total
+
+    @staticmethod
+    def santri_page(dari, sampai, tarif=NOL, kelas_id=None, after=None, before=None, per_page=50):
+        """
+        One page of santri in arrears (by name): id, nis, nama, kelas_id,
+        jumlah_bulan, periode_awal, periode_akhir and total.
+        """
+        t = TunggakanService._tunggakan(dari, sampai, tarif, kelas_id)
+        query = db.session.query(
+            Santri.id, Santri.nis, Santri.nama, Santri.kelas_id,
+            func.count().label('jumlah_bulan'),
+            func.min(t.c.periode).label('periode_awal'),
+            func.max(t.c.periode).label('periode_akhir'),
+            func.sum(t.c.nominal).label('total'),
+        ).join(t, t.c.santri_id == Santri.id)\
+            .group_by(Santri.id, Santri.nis, Santri.nama, Santri.kelas_id)
+        return keyset_paginate(query, [Santri.nama, Santri.id], after=after, before=before, per_page=per_page)
+
+    @staticmethod
+    def iter_rincian(dari, sampai, tarif=NOL, kelas_id=None, batch_size=500):
+        """
+        Every unpaid month as (nama_kelas, nis, nama, periode, status, nominal), ordered by
+        kelas, santri and periode, fetched in batches for export.
+        """
+        t = TunggakanService._tunggakan(dari, sampai, tarif, kelas_id)
+        return db.session.query(
+            Kelas.nama_kelas, Santri.nis, Santri.nama, t.c.periode, t.c.status, t.c.nominal
+        ).select_from(t)\
+            .join(Santri, Santri.id == t.c.santri_id)\
+            .outerjoin(Kelas, Kelas.id == t.c.kelas_id)\
+            .order_by(Kelas.nama_kelas, Santri.nama, Santri.id, t.c.periode)\
+            .yield_per(batch_size)
@@ -0,0 +1,45 @@
+// Santri picker: searches master.santri_search while typing and stores the chosen id
+// in the hidden input named by data-target. Markup comes from SantriAutocompleteWidget.
+(function () {
+  function debounce(fn, wait) {
+    var timer;
+    return function () {
+      var args = arguments, self = this;
+      clearTimeout(timer);
+      timer = setTimeout(function () { fn.apply(self, args); }, wait);
+    };
+  }
+
+  function bind(input) {
+    var hidden = document.getElementById(input.dataset.target);
+    var list = document.getElementById(input.getAttribute('list'));
+    var byLabel = {};
+
+    var search = debounce(function () {
+      var q = input.value.trim();
+      if (q.length < 2) return;
+      fetch(input.dataset.url + '?q=' + encodeURIComponent(q), { credentials: 'same-origin' })
+        .then(function (r) { return r.ok ? r.json() : []; })
+        .then(function (items) {
+          byLabel = {};
+          list.innerHTML = '';
+          items.forEach(function (item) {
+            var label = item.label + ' - ' + item.nis;
+            byLabel[label] = item.id;
+            var option = document.createElement('option');
+            option.value = label;
+            list.appendChild(option);
+          });
+        });
+    }, 250);
+
+    input.addEventListener('input', function () {
+      // A picked suggestion sets the id; free text clears it so a stale id is never submitted
+      hidden.value = byLabel.hasOwnProperty(input.value) ? byLabel[input.value] : '';
+      input.setCustomValidity(hidden.value || !input.required ? '' : 'Pilih santri dari daftar.');
+      if (!hidden.value) search();
+    });
+  }
+
+  document.querySelectorAll('input.santri-autocomplete').forEach(bind);
+})();
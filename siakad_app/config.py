@@ -33,6 +33,34 @@ class Config:
     # Compression Configuration
     COMPRESS_ALGORITHM = 'gzip'
 
+    # PDF Rendering Queue (processed by `flask pdf-worker`)
+    PDF_QUEUE_MAX = int(os.environ.get('PDF_QUEUE_MAX') or 20) # Unfinished jobs before requests are refused
+    PDF_OUTPUT_DIR = os.path.join(basedir, 'generated_pdf')
+    PDF_JOB_TIMEOUT = 300 # Seconds without a heartbeat before a 'running' job is considered dead and requeued
+    PDF_JOB_HEARTBEAT = 30 # Seconds between heartbeats of a worker while it renders
+    PDF_JOB_MAX_ATTEMPTS = 3 # Renders started before a job that keeps killing its worker is marked failed
+    PDF_JOB_RETENTION = 24 * 3600 # Seconds to keep finished PDFs on disk
+
+    # Rendered raport HTML/PDF, content-addressed per santri
+    RAPORT_CACHE_DIR = os.path.join(basedir, 'raport_cache')
+
+    # Uploaded files (bukti pembayaran), content-addressed by SHA-256 (see BerkasService)
+    BERKAS_DIR = os.path.join(basedir, 'uploads', 'berkas')
+    THUMBNAIL_SIZE = 320 # Longest side in pixels of the generated previews
+    THUMBNAIL_TIMEOUT = 120 # Seconds before a 'running' thumbnail is considered dead and requeued
+    THUMBNAIL_MAX_ATTEMPTS = 3 # Renders started before an image that keeps killing its worker is marked failed
+
+    # Error reports of the bulk santri import (see ImporSantriService)
+    IMPOR_DIR = os.path.join(basedir, 'uploads', 'impor')
+    IMPOR_RETENTION = 24 * 3600 # Seconds to keep a report on disk
+
+    # Audit log writer (see AuditWriter): events are queued and inserted in batches
+    AUDIT_ASYNC = True
+    AUDIT_BATCH_SIZE = 100 # Events per INSERT
+    AUDIT_FLUSH_INTERVAL_MS = 200 # Longest wait for a batch to fill
+    AUDIT_QUEUE_MAX = 10000 # Queued events before new ones go straight to the spool file
+    AUDIT_SPOOL_PATH = os.path.join(basedir, 'logs', 'audit_spool.jsonl') # Events the database did not take
+
 class DevelopmentConfig(Config):
     DEBUG = True
     SESSION_COOKIE_SECURE = False # Localhost biasanya HTTP
@@ -56,5 +84,7 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'  # Use in-memory DB for tests
     WTF_CSRF_ENABLED = False  # Disable CSRF for easier testing
+    CACHE_TYPE = 'SimpleCache'  # Per-app in-memory cache, nothing shared between tests
+    AUDIT_ASYNC = False  # Audit rows are visible as soon as the request returns
     SESSION_COOKIE_SECURE = False
     DEBUG = False
@@ -0,0 +1,127 @@
+"""Structured tahfidz ayat and surah reference
+
+Revision ID: 0b6e3d9f4a25
+Revises: f2a8c5d1e964
+Create Date: 2026-10-18 15:47:21.604318
+
+"""
+import re
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b6e3d9f4a25'
+down_revision = 'f2a8c5d1e964'
+branch_labels = None
+depends_on = None
+
+# Surah reference as of this revision (nomor, nama, jumlah_ayat); kept literal so the
+# migration does not depend on the application code
+SURAH = [
+    (1, 'Al-Fatihah', 7), (2, 'Al-Baqarah', 286), (3, "Ali 'Imran", 200), (4, "An-Nisa'", 176),
+    (5, "Al-Ma'idah", 120), (6, "Al-An'am", 165), (7, "Al-A'raf", 206), (8, 'Al-Anfal', 75),
+    (9, 'At-Taubah', 129), (10, 'Yunus', 109), (11, 'Hud', 123), (12, 'Yusuf', 111),
+    (13, "Ar-Ra'd", 43), (14, 'Ibrahim', 52), (15, 'Al-Hijr', 99), (16, 'An-Nahl', 128),
+    (17, "Al-Isra'", 111), (18, 'Al-Kahf', 110), (19, 'Maryam', 98), (20, 'Taha', 135),
+    (21, "Al-Anbiya'", 112), (22, 'Al-Hajj', 78), (23, "Al-Mu'minun", 118), (24, 'An-Nur', 64),
+    (25, 'Al-Furqan', 77), (26, "Asy-Syu'ara'", 227), (27, 'An-Naml', 93), (28, 'Al-Qasas', 88),
+    (29, "Al-'Ankabut", 69), (30, 'Ar-Rum', 60), (31, 'Luqman', 34), (32, 'As-Sajdah', 30),
+    (33, 'Al-Ahzab', 73), (34, "Saba'", 54), (35, 'Fatir', 45), (36, 'Yasin', 83),
+    (37, 'As-Saffat', 182), (38, 'Sad', 88), (39, 'Az-Zumar', 75), (40, 'Gafir', 85),
+    (41, 'Fussilat', 54), (42, 'Asy-Syura', 53), (43, 'Az-Zukhruf', 89), (44, 'Ad-Dukhan', 59),
+    (45, 'Al-Jasiyah', 37), (46, 'Al-Ahqaf', 35), (47, 'Muhammad', 38), (48, 'Al-Fath', 29),
+    (49, 'Al-Hujurat', 18), (50, 'Qaf', 45), (51, 'Az-Zariyat', 60), (52, 'At-Tur', 49),
+    (53, 'An-Najm', 62), (54, 'Al-Qamar', 55), (55, 'Ar-Rahman', 78), (56, "Al-Waqi'ah", 96),
+    (57, 'Al-Hadid', 29), (58, 'Al-Mujadilah', 22), (59, 'Al-Hasyr', 24), (60, 'Al-Mumtahanah', 13),
+    (61, 'As-Saff', 14), (62, "Al-Jumu'ah", 11), (63, 'Al-Munafiqun', 11), (64, 'At-Tagabun', 18),
+    (65, 'At-Talaq', 12), (66, 'At-Tahrim', 12), (67, 'Al-Mulk', 30), (68, 'Al-Qalam', 52),
+    (69, 'Al-Haqqah', 52), (70, "Al-Ma'arij", 44), (71, 'Nuh', 28), (72, 'Al-Jinn', 28),
+    (73, 'Al-Muzzammil', 20), (74, 'Al-Muddassir', 56), (75, 'Al-Qiyamah', 40), (76, 'Al-Insan', 31),
+    (77, 'Al-Mursalat', 50), (78, "An-Naba'", 40), (79, "An-Nazi'at", 46), (80, "'Abasa", 42),
+    (81, 'At-Takwir', 29), (82, 'Al-Infitar', 19), (83, 'Al-Mutaffifin', 36), (84, 'Al-Insyiqaq', 25),
+    (85, 'Al-Buruj', 22), (86, 'At-Tariq', 17), (87, "Al-A'la", 19), (88, 'Al-Gasyiyah', 26),
+    (89, 'Al-Fajr', 30), (90, 'Al-Balad', 20), (91, 'Asy-Syams', 15), (92, 'Al-Lail', 21),
+    (93, 'Ad-Duha', 11), (94, 'Asy-Syarh', 8), (95, 'At-Tin', 8), (96, "Al-'Alaq", 19),
+    (97, 'Al-Qadr', 5), (98, 'Al-Bayyinah', 8), (99, 'Az-Zalzalah', 8), (100, "Al-'Adiyat", 11),
+    (101, "Al-Qari'ah", 11), (102, 'At-Takasur', 8), (103, "Al-'Asr", 3), (104, 'Al-Humazah', 9),
+    (105, 'Al-Fil', 5), (106, 'Quraisy', 4), (107, "Al-Ma'un", 7), (108, 'Al-Kausar', 3),
+    (109, 'Al-Kafirun', 6), (110, 'An-Nasr', 3), (111, 'Al-Lahab', 5), (112, 'Al-Ikhlas', 4),
+    (113, 'Al-Falaq', 5), (114, 'An-Nas', 6),
+]
+
+
+def _normalize(nama):
+    return re.sub(r'[^a-z]', '', (nama or '').lower())
+
+
+def _parse_legacy(nama_surat, ayat):
+    """Best-effort (surah, mulai, selesai) from the old free-text columns, or None."""
+    nama_surat = (nama_surat or '').strip()
+    if nama_surat.isdigit():
+        nomor = int(nama_surat)
+    else:
+        by_name = {_normalize(nama): nomor for nomor, nama, _ in SURAH}
+        nomor = by_name.get(_normalize(nama_surat))
+    if not nomor or not 1 <= nomor <= len(SURAH):
+        return None
+
+    numbers = [int(n) for n in re.findall(r'\d+', ayat or '')]
+    if not numbers:
+        return None
+    mulai, selesai = numbers[0], numbers[-1] if len(numbers) > 1 else numbers[0]
+    jumlah = SURAH[nomor - 1][2]
+    if not 1 <= mulai <= selesai <= jumlah:
+        return None
+    return nomor, mulai, selesai
+
+
+def upgrade():
+    # ### commands auto generated by Alembic - please adjust! ###
+    surah = op.create_table('surah',
+    sa.Column('nomor', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('nama', sa.String(length=50), nullable=False),
+    sa.Column('jumlah_ayat', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('nomor')
+    )
+    with op.batch_alter_table('tahfidz', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('surah_nomor', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('ayat_mulai', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('ayat_selesai', sa.Integer(), nullable=True))
+        batch_op.create_index('ix_tahfidz_santri_id_tanggal_setor', ['santri_id', 'tanggal_setor'], unique=False)
+        batch_op.create_foreign_key('fk_tahfidz_surah_nomor_surah', 'surah', ['surah_nomor'], ['nomor'])
+
+    # ### end Alembic commands ###
+
+    op.bulk_insert(surah, [
+        {'nomor': nomor, 'nama': nama, 'jumlah_ayat': jumlah} for nomor, nama, jumlah in SURAH
+    ])
+
+    # Backfill the structured range from the free-text columns where it can be parsed;
+    # rows that cannot be parsed keep their text and are left out of progress until edited.
+    conn = op.get_bind()
+    tahfidz = sa.table('tahfidz',
+        sa.column('id', sa.Integer),
+        sa.column('nama_surat', sa.String),
+        sa.column('ayat', sa.String),
+        sa.column('surah_nomor', sa.Integer),
+        sa.column('ayat_mulai', sa.Integer),
+        sa.column('ayat_selesai', sa.Integer))
+    for row in conn.execute(sa.select(tahfidz.c.id, tahfidz.c.nama_surat, tahfidz.c.ayat)).all():
+        parsed = _parse_legacy(row.nama_surat, row.ayat)
+        if parsed:
+            conn.execute(tahfidz.update().where(tahfidz.c.id == row.id).values(
+                surah_nomor=parsed[0], ayat_mulai=parsed[1], ayat_selesai=parsed[2]))
+
+
+def downgrade():
+    # ### commands auto generated by Alembic - please adjust! ###
+    with op.batch_alter_table('tahfidz', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_tahfidz_surah_nomor_surah', type_='foreignkey')
+        batch_op.drop_index('ix_tahfidz_santri_id_tanggal_setor')
+        batch_op.drop_column('ayat_selesai')
+        batch_op.drop_column('ayat_mulai')
+        batch_op.drop_column('surah_nomor')
+
+    op.drop_table('surah')
+    # ### end Alembic commands ###
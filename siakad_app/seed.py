@@ -1,6 +1,7 @@
 from app import create_app, db
 from app.models.user import User
-from app.models.akademik import Santri, Pengajar, Kelas, MataPelajaran, Nilai
+from app.models.akademik import Santri, Pengajar, Kelas, MataPelajaran, Nilai, Semester, Surah
+from app.services.quran import SURAH
 from datetime import date
 
 app = create_app()
@@ -63,6 +64,21 @@ def seed_data():
             db.session.add(mapel)
             print("Mapel Bahasa Arab dibuat.")
 
+        # 6. Buat Semester
+        for nama, mulai, selesai in [
+            ('Ganjil 2024/2025', date(2024, 7, 1), date(2024, 12, 31)),
+            ('Genap 2024/2025', date(2025, 1, 1), date(2025, 6, 30)),
+            ('Ganjil 2025/2026', date(2025, 7, 1), date(2025, 12, 31)),
+        ]:
+            if not Semester.query.filter_by(nama=nama).first():
+                db.session.add(Semester(nama=nama, tanggal_mulai=mulai, tanggal_selesai=selesai))
+                print(f"Semester {nama} dibuat.")
+
+        # 7. Referensi Surat Al-Qur'an
+        if not Surah.query.first():
+            db.session.add_all([Surah(nomor=nomor, nama=nama, jumlah_ayat=jumlah) for nomor, nama, jumlah in SURAH])
+            print("Referensi 114 surat dibuat.")
+
         db.session.commit()
         print("Seeding selesai!")
 
@@ -4,8 +4,14 @@ from app.models.user import User
 from config import TestingConfig
 
 @pytest.fixture
-def app():
+def app(tmp_path):
     app = create_app(TestingConfig)
+    # Keep generated files out of the source tree
+    app.config['PDF_OUTPUT_DIR'] = str(tmp_path / 'generated_pdf')
+    app.config['RAPORT_CACHE_DIR'] = str(tmp_path / 'raport_cache')
+    app.config['BERKAS_DIR'] = str(tmp_path / 'berkas')
+    app.config['IMPOR_DIR'] = str(tmp_path / 'impor')
+    app.config['AUDIT_SPOOL_PATH'] = str(tmp_path / 'audit_spool.jsonl')
     
     with app.app_context():
         db.create_all()
@@ -0,0 +1,288 @@
+from datetime import date
+from app import db
+from app.models.akademik import Santri, Kelas, MataPelajaran, Nilai, Semester
+
+
+def _seed_kelas(nama_kelas, jumlah_santri, nis_prefix):
+    if not Semester.query.filter_by(nama='Ganjil 2024/2025').first():
+        db.session.add(Semester(nama='Ganjil 2024/2025', tanggal_mulai=date(2024, 7, 1), tanggal_selesai=date(2024, 12, 31)))
+    kelas = Kelas(nama_kelas=nama_kelas, jenjang='SMP')
+    db.session.add(kelas)
+    db.session.flush()
+    santris = []
+    for i in range(jumlah_santri):
+        santri = Santri(
+            nis=f'{nis_prefix}{i:03d}',
+            nama=f'Santri {nama_kelas} {i}',
+            jenis_kelamin='L',
+            tanggal_lahir=date(2010, 1, 1),
+            jenjang='SMP',
+            kelas_id=kelas.id
+        )
+        db.session.add(santri)
+        santris.append(santri)
+    db.session.flush()
+    return kelas, santris
+
+
+def test_nilai_list_keyset_pagination(auth_client, monkeypatch):
+    from app.routes import akademik
+    monkeypatch.setattr(akademik, 'NILAI_PER_PAGE', 5)
+
+    mapel = MataPelajaran(nama_mapel='Fiqih', jenjang='SMP')
+    db.session.add(mapel)
+    kelas_a, santri_a = _seed_kelas('7A', 8, 'A')
+    kelas_b, santri_b = _seed_kelas('7B', 3, 'B')
+    for santri in santri_a + santri_b:
+        db.session.add(Nilai(santri_id=santri.id, mapel_id=mapel.id, semester='Ganjil 2024/2025',
+                             nilai_harian=80, nilai_uts=80, nilai_uas=80, nilai_praktik=80))
+    db.session.commit()
+
+    # Walk every page of kelas 7A and make sure no row is skipped or repeated
+    seen = []
+    response = auth_client.get(f'/akademik/nilai?kelas_id={kelas_a.id}')
+    pages = 0
+    while True:
+        assert response.status_code == 200
+        pages += 1
+        html = response.get_data(as_text=True)
+        seen += [s.nama for s in santri_a if f'>{s.nama}<' in html]
+        assert 'Santri 7B' not in html
+        if 'after=' not in html:
+            break
+        cursor = html.split('after=')[1].split('"')[0].split('&')[0]
+        response = auth_client.get(f'/akademik/nilai?kelas_id={kelas_a.id}&after={cursor}')
+
+    assert pages == 2
+    assert sorted(seen) == sorted(s.nama for s in santri_a)
+
+
+def test_nilai_list_ignores_bad_cursor(auth_client):
+    response = auth_client.get('/akademik/nilai?after=not-a-cursor')
+    assert response.status_code == 200
+    assert b'Belum ada data nilai' in response.data
+
+
+def test_absensi_kelas_bulk_roll_call(auth_client):
+    from app.models.akademik import Absensi
+    from app.models.audit import AuditLog
+
+    kelas, santris = _seed_kelas('8A', 4, 'C')
+    db.session.commit()
+    audit_before = AuditLog.query.count()
+
+    data = {'kelas_id': kelas.id, 'tanggal': '2025-01-06', 'versi': '',
+            f'status_{santris[0].id}': 'Sakit'}
+    response = auth_client.post('/akademik/absensi/kelas', data=data, follow_redirects=True)
+    assert response.status_code == 200
+
+    rows = {a.santri_id: a.status for a in Absensi.query.all()}
+    assert len(rows) == 4
+    assert rows[santris[0].id] == 'Sakit'
+    assert all(rows[s.id] == 'Hadir' for s in santris[1:])
+    assert AuditLog.query.count() == audit_before + 1
+
+    # A second "new" submission for the same kelas and day is rejected
+    data[f'status_{santris[1].id}'] = 'Alpha'
+    response = auth_client.post('/akademik/absensi/kelas', data=data, follow_redirects=True)
+    assert b'sudah tersimpan' in response.data
+    assert Absensi.query.filter_by(santri_id=santris[1].id).one().status == 'Hadir'
+
+    # A correction made from the page showing the saved rows overwrites via the upsert key
+    html = auth_client.get(f'/akademik/absensi/kelas?kelas_id={kelas.id}&tanggal=2025-01-06').get_data(as_text=True)
+    data['versi'] = html.split('name="versi" value="')[1].split('"')[0]
+    assert data['versi']
+    auth_client.post('/akademik/absensi/kelas', data=data, follow_redirects=True)
+    db.session.expire_all()
+    assert Absensi.query.count() == 4
+    assert Absensi.query.filter_by(santri_id=santris[1].id).one().status == 'Alpha'
+
+    # The monthly rollup followed both writes
+    from app.models.akademik import AbsensiRekap
+    rekap = {r.santri_id: (r.hadir, r.sakit, r.alpha) for r in AbsensiRekap.query.filter_by(tahun=2025, bulan=1)}
+    assert rekap[santris[0].id] == (0, 1, 0)
+    assert rekap[santris[1].id] == (0, 0, 1)
+    assert rekap[santris[2].id] == (1, 0, 0)
+
+
+def test_nilai_kelas_grid_upserts_changed_cells(auth_client):
+    mapel = MataPelajaran(nama_mapel='Nahwu', jenjang='SMP')
+    db.session.add(mapel)
+    kelas, santris = _seed_kelas('9A', 3, 'D')
+    db.session.add(Nilai(santri_id=santris[0].id, mapel_id=mapel.id, semester='Ganjil 2024/2025',
+                         nilai_harian=70, nilai_uts=71, nilai_uas=72, nilai_praktik=73))
+    db.session.commit()
+
+    response = auth_client.get(f'/akademik/nilai/kelas?kelas_id={kelas.id}&mapel_id={mapel.id}&semester=Ganjil 2024/2025')
+    assert response.status_code == 200
+    assert f'name="nilai-{santris[0].id}-nilai_praktik"'.encode() in response.data
+    assert b'value="73.0"' in response.data
+
+    response = auth_client.post('/akademik/nilai/kelas', data={
+        'kelas_id': kelas.id, 'mapel_id': mapel.id, 'semester': 'Ganjil 2024/2025',
+        f'nilai-{santris[0].id}-nilai_uas': '90',
+        f'nilai-{santris[2].id}-nilai_harian': '85',
+    }, follow_redirects=True)
+    assert response.status_code == 200
+
+    db.session.expire_all()
+    rows = {n.santri_id: n for n in Nilai.query.filter_by(mapel_id=mapel.id).all()}
+    assert len(rows) == 2
+    # Untouched cells of an existing row are preserved
+    assert (rows[santris[0].id].nilai_harian, rows[santris[0].id].nilai_uas) == (70, 90)
+    assert (rows[santris[2].id].nilai_harian, rows[santris[2].id].nilai_uts) == (85, 0)
+
+
+def test_nilai_kelas_grid_rejects_out_of_range(auth_client):
+    mapel = MataPelajaran(nama_mapel='Sharaf', jenjang='SMP')
+    db.session.add(mapel)
+    kelas, santris = _seed_kelas('9B', 1, 'E')
+    db.session.commit()
+
+    response = auth_client.post('/akademik/nilai/kelas', data={
+        'kelas_id': kelas.id, 'mapel_id': mapel.id, 'semester': 'Ganjil 2024/2025',
+        f'nilai-{santris[0].id}-nilai_uas': '120',
+    })
+    assert b'tidak valid' in response.data
+    assert Nilai.query.count() == 0
+
+
+def test_raport_kelas_prints_every_santri(auth_client):
+    kelas, santris = _seed_kelas('10B', 3, 'F')
+    db.session.commit()
+
+    response = auth_client.get(f'/akademik/raport/kelas?kelas_id={kelas.id}&semester=Ganjil 2024/2025')
+    assert response.status_code == 200
+    html = response.get_data(as_text=True)
+    assert html.count('class="raport-sheet"') == 3
+    assert all(s.nama in html for s in santris)
+
+
+def test_statistik_kelas_page_and_raport_rank(auth_client):
+    mapel = MataPelajaran(nama_mapel='Fiqih', jenjang='SMP')
+    db.session.add(mapel)
+    kelas, santris = _seed_kelas('10C', 2, 'H')
+    for santri, value in zip(santris, (88, 64)):
+        db.session.add(Nilai(santri_id=santri.id, mapel_id=mapel.id, semester='Ganjil 2024/2025',
+                             nilai_harian=value, nilai_uts=value, nilai_uas=value, nilai_praktik=value))
+    db.session.commit()
+
+    response = auth_client.get(f'/akademik/statistik?kelas_id={kelas.id}&semester=Ganjil 2024/2025')
+    assert response.status_code == 200
+    assert b'Fiqih' in response.data
+    assert b'76.0' in response.data  # class mean
+
+    response = auth_client.get(f'/akademik/raport/generate?santri_id={santris[1].id}&semester=Ganjil 2024/2025')
+    assert b'2 dari 2' in response.data
+
+
+def test_raport_pdf_is_queued_and_polled(auth_client, app, tmp_path, monkeypatch):
+    import os
+    from app.models.job import PdfJob
+    from app.services import pdf_service
+    from app.services.pdf_service import PdfService
+
+    class FakeHTML:
+        def __init__(self, string):
+            pass
+
+        def write_pdf(self, target):
+            with open(target, 'wb') as f:
+                f.write(b'%PDF-fake')
+
+    monkeypatch.setattr(pdf_service, 'HTML', FakeHTML)
+    app.config['PDF_OUTPUT_DIR'] = str(tmp_path)
+    kelas, santris = _seed_kelas('11A', 1, 'G')
+    db.session.commit()
+
+    response = auth_client.get(f'/akademik/raport/generate?santri_id={santris[0].id}&semester=Ganjil 2024/2025&format=pdf')
+    assert response.status_code == 302
+    job_url = response.headers['Location']
+    assert auth_client.get(job_url + '/status').get_json()['status'] == 'queued'
+
+    PdfService.process_next_job()
+    status = auth_client.get(job_url + '/status').get_json()
+    assert status['status'] == 'done'
+    assert auth_client.get(status['download_url']).data == b'%PDF-fake'
+
+    # Removed by RaportCache when the raport data changed
+    os.remove(PdfJob.query.one().output_path)
+    response = auth_client.get(status['download_url'], follow_redirects=True)
+    assert b'sudah tidak tersedia' in response.data
+    assert PdfJob.query.one().status == 'failed'
+
+
+def test_tahfidz_add_stores_structured_range(auth_client):
+    from app.models.akademik import Tahfidz
+
+    kelas, santris = _seed_kelas('7A', 1, 'G')
+    db.session.commit()
+
+    response = auth_client.post('/akademik/tahfidz/add', data={
+        'santri_id': santris[0].id, 'surah_nomor': 78, 'ayat_mulai': 1, 'ayat_selesai': 41,
+        'kelancaran': 'Lancar', 'tajwid': 'Bagus', 'tanggal_setor': '2024-08-01'
+    })
+    assert b'hanya memiliki 40 ayat' in response.data
+
+    auth_client.post('/akademik/tahfidz/add', data={
+        'santri_id': santris[0].id, 'surah_nomor': 78, 'ayat_mulai': 1, 'ayat_selesai': 40,
+        'kelancaran': 'Lancar', 'tajwid': 'Bagus', 'tanggal_setor': '2024-08-01'
+    }, follow_redirects=True)
+    hafalan = Tahfidz.query.one()
+    assert (hafalan.nama_surat, hafalan.ayat) == ("An-Naba'", '1-40')
+
+    response = auth_client.get(f'/akademik/tahfidz/progress?kelas_id={kelas.id}')
+    assert response.status_code == 200
+    assert b'40 (0.64%)' in response.data
+
+
+def test_wali_santri_lists_are_scoped_in_one_query(client):
+    from sqlalchemy import event
+    from app.models.user import User
+    from app.models.akademik import Absensi
+
+    wali = User(username='wali_scope', role='wali_santri')
+    wali.set_password('password123')
+    db.session.add(wali)
+    db.session.flush()
+    kelas, santris = _seed_kelas('8C', 2, 'W')
+    santris[0].wali_user_id = wali.id
+    for santri in santris:
+        db.session.add(Absensi(santri_id=santri.id, tanggal=date(2024, 8, 1), status='Hadir'))
+    db.session.commit()
+
+    statements = []
+    def count(conn, cursor, statement, *args):
+        if 'FROM absensi' in statement:
+            statements.append(statement)
+
+    with client:
+        client.post('/auth/login', data={'username': 'wali_scope', 'password': 'password123'})
+        event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            html = client.get('/akademik/absensi').get_data(as_text=True)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count)
+
+    assert santris[0].nama in html
+    assert santris[1].nama not in html
+    # The santri filter is a subquery of the list query itself
+    assert len(statements) == 1
+    assert 'wali_user_id' in statements[0]
+
+
+def test_absensi_edit_rejects_existing_day(auth_client):
+    from app.models.akademik import Absensi
+    kelas, santris = _seed_kelas('8B', 1, 'E')
+    db.session.add_all([Absensi(santri_id=santris[0].id, tanggal=date(2025, 1, 6), status='Hadir'),
+                        Absensi(santri_id=santris[0].id, tanggal=date(2025, 1, 7), status='Sakit')])
+    db.session.commit()
+    absen = Absensi.query.filter_by(tanggal=date(2025, 1, 7)).one()
+
+    response = auth_client.post(f'/akademik/absensi/edit/{absen.id}', data={
+        'santri_id': santris[0].id, 'tanggal': '2025-01-06', 'status': 'Sakit'
+    })
+    assert response.status_code == 200
+    assert b'sudah ada' in response.data
+    db.session.expire_all()
+    assert db.session.get(Absensi, absen.id).tanggal == date(2025, 1, 7)
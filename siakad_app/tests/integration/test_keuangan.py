@@ -0,0 +1,265 @@
+from datetime import date, datetime
+from decimal import Decimal
+from app import db
+from app.models.keuangan import PosKeuangan, TransaksiKeuangan
+from app.services.laporan_keuangan import LaporanKeuanganService
+
+
+def _seed_transaksi():
+    spp = PosKeuangan(nama='SPP', tipe='pemasukan')
+    listrik = PosKeuangan(nama='Listrik', tipe='pengeluaran')
+    db.session.add_all([spp, listrik])
+    db.session.flush()
+    for i in range(12):
+        db.session.add(TransaksiKeuangan(pos_id=spp.id, jumlah=Decimal('100000.10'), jenis='masuk',
+                                         tanggal=date(2024, 8, 1 + i), keterangan=f'SPP {i}'))
+    db.session.add(TransaksiKeuangan(pos_id=listrik.id, jumlah=Decimal('250000.05'), jenis='keluar',
+                                     tanggal=date(2024, 8, 20), keterangan='Tagihan listrik'))
+    # Outside the period
+    db.session.add(TransaksiKeuangan(pos_id=spp.id, jumlah=Decimal('999'), jenis='masuk', tanggal=date(2024, 9, 1)))
+    db.session.commit()
+
+
+def test_ringkasan_is_grouped_in_decimal(app):
+    _seed_transaksi()
+    data = LaporanKeuanganService.ringkasan(date(2024, 8, 1), date(2024, 8, 31))
+    assert data['total_masuk'] == Decimal('1200001.20')
+    assert data['total_keluar'] == Decimal('250000.05')
+    assert data['saldo'] == Decimal('950001.15')
+    assert [(s['nama'], s['jumlah_transaksi']) for s in data['summary']] == [('SPP', 12), ('Listrik', 1)]
+
+
+def test_laporan_pages_items_but_totals_whole_period(auth_client, monkeypatch):
+    from app.routes import keuangan
+    monkeypatch.setattr(keuangan, 'LAPORAN_PER_PAGE', 5)
+    _seed_transaksi()
+
+    html = auth_client.get('/keuangan/laporan?start_date=2024-08-01&end_date=2024-08-31').get_data(as_text=True)
+    assert 'SPP 4' in html and 'SPP 5' not in html
+    assert '1,200,001' in html
+    assert 'after=' in html
+
+    cursor = html.split('after=')[1].split('"')[0].split('&')[0]
+    html = auth_client.get(f'/keuangan/laporan?start_date=2024-08-01&end_date=2024-08-31&after={cursor}').get_data(as_text=True)
+    assert 'SPP 5' in html and 'SPP 4' not in html
+
+
+def test_laporan_print_streams_every_item(auth_client):
+    _seed_transaksi()
+    response = auth_client.post('/keuangan/laporan', data={
+        'start_date': '2024-08-01', 'end_date': '2024-08-31', 'cetak_pdf': 'Cetak PDF'
+    })
+    assert response.is_streamed
+    html = response.get_data(as_text=True)
+    assert all(f'SPP {i}<' in html for i in range(12))
+    assert 'Tagihan listrik' in html
+
+
+def test_ringkasan_has_opening_and_closing_balance(app):
+    _seed_transaksi()
+    data = LaporanKeuanganService.ringkasan(date(2024, 9, 1), date(2024, 9, 30))
+    assert data['saldo_awal'] == Decimal('950001.15')
+    assert data['saldo_akhir'] == Decimal('951000.15')
+    assert [b['bulan'] for b in data['bulanan']] == [9]
+
+
+def test_tabungan_batch_json(auth_client):
+    from app.models.akademik import Santri
+    santri = Santri(nis='BT01', nama='Santri Kantin', jenis_kelamin='P', tanggal_lahir=date(2010, 1, 1), jenjang='SMP')
+    db.session.add(santri)
+    db.session.commit()
+
+    response = auth_client.post('/keuangan/tabungan/batch', json={'tanggal': '2024-08-01', 'items': [
+        {'nis': 'BT01', 'jenis': 'setor', 'jumlah': 20000},
+        {'nis': 'BT01', 'jenis': 'tarik', 'jumlah': 25000},
+        {'nis': 'BT01', 'jenis': 'tarik', 'jumlah': 7500},
+    ]})
+    data = response.get_json()
+    assert data['berhasil'] == 2 and data['gagal'] == 1
+    assert data['hasil'][2]['saldo_akhir'] == '12500.00'
+
+    # Non-finite amounts are per-item errors, the rest of the batch is still posted
+    response = auth_client.post('/keuangan/tabungan/batch', json={'items': [
+        {'nis': 'BT01', 'jenis': 'setor', 'jumlah': 'NaN'},
+        {'nis': 'BT01', 'jenis': 'setor', 'jumlah': 'Infinity'},
+        {'nis': 'BT01', 'jenis': 'setor', 'jumlah': 1000},
+    ]})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['berhasil'] == 1 and data['gagal'] == 2
+    assert data['hasil'][0]['error'] == 'Jumlah tidak valid.'
+
+
+def test_tabungan_add_refuses_overdraft(auth_client):
+    from app.models.akademik import Santri
+    santri = Santri(nis='BT02', nama='Santri Tarik', jenis_kelamin='L', tanggal_lahir=date(2010, 1, 1), jenjang='SMP')
+    db.session.add(santri)
+    db.session.commit()
+
+    response = auth_client.post('/keuangan/tabungan/add', data={
+        'santri_id': santri.id, 'jenis': 'tarik', 'jumlah': '1000', 'tanggal': '2024-08-01'
+    })
+    assert 'Saldo tidak mencukupi' in response.get_data(as_text=True)
+
+    response = auth_client.post('/keuangan/tabungan/add', data={
+        'santri_id': santri.id, 'jenis': 'setor', 'jumlah': 'Infinity', 'tanggal': '2024-08-01'
+    })
+    assert response.status_code == 200 and 'Jumlah tidak valid' in response.get_data(as_text=True)
+
+
+def test_tabungan_batch_form(auth_client):
+    from app.models.akademik import Santri
+    db.session.add(Santri(nis='BT03', nama='Santri Form', jenis_kelamin='L', tanggal_lahir=date(2010, 1, 1), jenjang='SMP'))
+    db.session.commit()
+
+    html = auth_client.post('/keuangan/tabungan/batch', data={
+        'tanggal': '2024-08-01', 'entri': 'BT03;setor;15000;Uang saku\nBT03;tarik;20000;Kantin'
+    }).get_data(as_text=True)
+    assert '1 transaksi tabungan diposting, 1 gagal.' in html
+    assert 'Saldo Rp 15,000' in html
+
+
+def test_tagihan_spp_route(auth_client):
+    from app.models.akademik import Santri
+    from app.models.keuangan import Keuangan
+    db.session.add(Santri(nis='TS01', nama='Santri SPP', jenis_kelamin='L', tanggal_lahir=date(2010, 1, 1), jenjang='SMA'))
+    db.session.commit()
+    tahun = datetime.now().year
+
+    html = auth_client.post('/keuangan/tagihan', data={
+        'bulan': 'Maret', 'tahun': tahun, 'jumlah': '200000', 'jenjang': '', 'kelas_id': 0
+    }, follow_redirects=True).get_data(as_text=True)
+    assert f'Tagihan SPP Maret {tahun}: 1 dibuat, 0 dilewati' in html
+    assert Keuangan.query.filter_by(bulan='Maret', tahun=tahun, status='Belum Lunas').count() == 1
+
+
+def test_tunggakan_report_and_csv(auth_client):
+    from app.models.akademik import Santri
+    from app.models.keuangan import Keuangan
+    santri = Santri(nis='TK01', nama='Santri Tunggak', jenis_kelamin='L', tanggal_lahir=date(2010, 1, 1), jenjang='SMP')
+    db.session.add(santri)
+    db.session.flush()
+    db.session.add(Keuangan(santri_id=santri.id, bulan='Mei', tahun=2024, jumlah=150000, status='Belum Lunas'))
+    db.session.commit()
+
+    html = auth_client.get('/keuangan/tunggakan?dari=2024-05&sampai=2024-06').get_data(as_text=True)
+    assert 'Santri Tunggak' in html
+    assert 'Mei 2024 - Juni 2024' in html
+
+    response = auth_client.get('/keuangan/tunggakan?dari=2024-05&sampai=2024-06&tarif=150000&format=csv')
+    assert response.mimetype == 'text/csv'
+    lines = response.get_data(as_text=True).splitlines()
+    assert lines[0] == 'Kelas,NIS,Nama,Periode,Status,Nominal'
+    assert lines[1:] == ['-,TK01,Santri Tunggak,Mei 2024,Belum Lunas,150000.00',
+                         '-,TK01,Santri Tunggak,Juni 2024,Belum Ditagih,150000.00']
+
+    for tarif in ('NaN', 'Infinity', '-5000', 'abc'):
+        response = auth_client.get(f'/keuangan/tunggakan?dari=2024-05&sampai=2024-06&tarif={tarif}')
+        assert response.status_code == 200
+        assert 'Tarif harus berupa angka tidak negatif' in response.get_data(as_text=True)
+
+
+def test_pembayaran_list_filters_by_periode(auth_client):
+    from app.models.akademik import Santri
+    from app.models.keuangan import Keuangan
+    santri = Santri(nis='TK02', nama='Santri Periode', jenis_kelamin='P', tanggal_lahir=date(2010, 1, 1), jenjang='SMP')
+    db.session.add(santri)
+    db.session.flush()
+    db.session.add(Keuangan(santri_id=santri.id, bulan='Mei', tahun=2024, jumlah=150000, status='Lunas'))
+    db.session.commit()
+
+    assert 'Santri Periode' in auth_client.get('/keuangan/?periode=2024-05').get_data(as_text=True)
+    assert 'Santri Periode' not in auth_client.get('/keuangan/?periode=2024-06').get_data(as_text=True)
+
+
+def test_ekspor_pembayaran_csv(auth_client):
+    from app.models.akademik import Santri
+    from app.models.keuangan import Keuangan
+    santri = Santri(nis='EX01', nama='Santri Ekspor', jenis_kelamin='L', tanggal_lahir=date(2010, 1, 1), jenjang='SMP')
+    db.session.add(santri)
+    db.session.flush()
+    db.session.add_all([
+        Keuangan(santri_id=santri.id, bulan='April', tahun=2024, jumlah=150000, status='Lunas',
+                 tanggal_bayar=date(2024, 4, 3)),
+        Keuangan(santri_id=santri.id, bulan='Mei', tahun=2024, jumlah=150000, status='Belum Lunas'),
+    ])
+    db.session.commit()
+
+    response = auth_client.get('/keuangan/ekspor/pembayaran?format=csv&dari=2024-04&sampai=2024-04')
+    assert response.headers['Content-Disposition'] == 'attachment; filename=pembayaran_2024-04_2024-04.csv'
+    assert response.get_data(as_text=True).splitlines() == [
+        'Tahun,Bulan,NIS,Nama,Jumlah,Status,Tanggal Bayar',
+        '2024,April,EX01,Santri Ekspor,150000.00,Lunas,2024-04-03',
+    ]
+    assert auth_client.get('/keuangan/ekspor/santri?format=csv').status_code == 404
+
+
+def test_transaksi_upload_is_content_addressed(auth_client):
+    import io
+    from app.models.keuangan import TransaksiKeuangan
+    from app.services.berkas import BerkasService
+    pos = PosKeuangan(nama='SPP', tipe='pemasukan')
+    db.session.add(pos)
+    db.session.commit()
+
+    for _ in range(2):
+        auth_client.post('/keuangan/transaksi/add', data={
+            'pos_id': pos.id, 'jumlah': '50000', 'jenis': 'masuk', 'tanggal': '2024-05-01',
+            'metode_pembayaran': 'Transfer',
+            'bukti_pembayaran': (io.BytesIO(b'%PDF-1.4 kwitansi'), 'IMG_0001.pdf'),
+        }, content_type='multipart/form-data')
+
+    bukti = {tx.bukti_pembayaran for tx in TransaksiKeuangan.query}
+    assert len(bukti) == 1
+    sha256 = bukti.pop()
+    response = auth_client.get(f'/keuangan/bukti/{sha256}')
+    assert response.data == b'%PDF-1.4 kwitansi'
+    assert 'immutable' in response.headers['Cache-Control']
+    assert auth_client.get(f'/keuangan/bukti/{sha256}/thumbnail').status_code == 404
+    assert f'/keuangan/bukti/{sha256}' in auth_client.get('/keuangan/transaksi').get_data(as_text=True)
+
+
+def test_rekonsiliasi_import_and_review(auth_client):
+    import io
+    from app.models.keuangan import TransaksiKeuangan, MutasiBank
+    pos = PosKeuangan(nama='Infaq', tipe='pemasukan')
+    db.session.add(pos)
+    db.session.flush()
+    tx = TransaksiKeuangan(pos_id=pos.id, jumlah=250000, jenis='masuk', tanggal=date(2024, 6, 3),
+                           metode_pembayaran='Transfer', keterangan='Infaq Hamba Allah')
+    db.session.add(tx)
+    db.session.commit()
+
+    html = auth_client.post('/keuangan/rekonsiliasi/impor', data={
+        'berkas': (io.BytesIO(b'Tanggal,Keterangan,Jumlah\n04/06/2024,TRF HAMBA ALLAH,250.000\n'), 'mutasi.csv'),
+    }, content_type='multipart/form-data', follow_redirects=True).get_data(as_text=True)
+    assert '1 mutasi diimpor' in html
+    assert 'TRF HAMBA ALLAH' in html
+
+    auth_client.post('/keuangan/rekonsiliasi/cocokkan', data={
+        'start_date': '2024-06-01', 'end_date': '2024-06-30', 'toleransi': 3
+    })
+    mutasi = MutasiBank.query.one()
+    assert mutasi.status == 'cocok' and mutasi.transaksi_id == tx.id
+    assert 'Infaq Hamba Allah' in auth_client.get('/keuangan/rekonsiliasi?status=cocok').get_data(as_text=True)
+
+    auth_client.post(f'/keuangan/rekonsiliasi/{mutasi.id}/buka')
+    db.session.refresh(mutasi)
+    assert mutasi.status == 'belum' and mutasi.transaksi_id is None
+
+    # Manual pick: the target must be given, exist, go the same way and have the same amount
+    url = f'/keuangan/rekonsiliasi/{mutasi.id}/tetapkan'
+    assert auth_client.post(url, data={'jenis': 'transaksi'}).status_code == 400
+    keluar = TransaksiKeuangan(pos_id=pos.id, jumlah=250000, jenis='keluar', tanggal=date(2024, 6, 4),
+                               metode_pembayaran='Transfer')
+    lain = TransaksiKeuangan(pos_id=pos.id, jumlah=100000, jenis='masuk', tanggal=date(2024, 6, 4),
+                             metode_pembayaran='Transfer')
+    db.session.add_all([keluar, lain])
+    db.session.commit()
+    for target_id, pesan in ((999999, 'tidak ditemukan'), (keluar.id, 'tidak sesuai'), (lain.id, 'tidak sama')):
+        html = auth_client.post(url, data={'jenis': 'transaksi', 'target_id': target_id},
+                                follow_redirects=True).get_data(as_text=True)
+        assert pesan in html
+    auth_client.post(url, data={'jenis': 'transaksi', 'target_id': tx.id})
+    db.session.refresh(mutasi)
+    assert mutasi.status == 'cocok' and mutasi.transaksi_id == tx.id
@@ -0,0 +1,121 @@
+from datetime import date
+from app import db
+from app.models.akademik import Santri, Kelas
+
+
+def _santri(nis, nama, kelas=None):
+    santri = Santri(nis=nis, nama=nama, jenis_kelamin='L', tanggal_lahir=date(2010, 1, 1),
+                    jenjang='SMP', kelas_id=kelas.id if kelas else None)
+    db.session.add(santri)
+    return santri
+
+
+def test_santri_search_matches_name_and_nis_prefix(auth_client):
+    kelas = Kelas(nama_kelas='7B', jenjang='SMP')
+    db.session.add(kelas)
+    db.session.flush()
+    _santri('2024001', 'Ahmad  Fauzi', kelas)
+    _santri('2024002', 'Ahmad Zaki')
+    _santri('2023100', 'Budi Santoso')
+    _santri('X%1', 'Cahya')
+    db.session.commit()
+
+    results = auth_client.get('/master/santri/search?q=ahmad f').get_json()
+    assert [r['nama'] for r in results] == ['Ahmad  Fauzi']
+    assert results[0]['label'] == 'Ahmad  Fauzi (7B)'
+
+    results = auth_client.get('/master/santri/search?q=2024').get_json()
+    assert {r['nis'] for r in results} == {'2024001', '2024002'}
+
+    # LIKE wildcards are matched literally, and very short queries return nothing
+    assert auth_client.get('/master/santri/search?q=%25%25').get_json() == []
+    assert auth_client.get('/master/santri/search?q=a').get_json() == []
+
+
+def test_santri_field_validates_by_primary_key(auth_client):
+    santri = _santri('2024010', 'Dimas')
+    db.session.commit()
+
+    data = {'santri_id': 99999, 'tanggal': '2025-01-06', 'status': 'Hadir'}
+    response = auth_client.post('/akademik/absensi/add', data=data)
+    assert b'Santri tidak ditemukan' in response.data
+
+    data['santri_id'] = santri.id
+    response = auth_client.post('/akademik/absensi/add', data=data, follow_redirects=True)
+    assert b'Absensi berhasil disimpan' in response.data
+
+
+def test_santri_impor_route_and_error_report(auth_client):
+    import io
+    response = auth_client.post('/master/santri/impor', data={
+        'berkas': (io.BytesIO(b'NIS,Nama,Jenis Kelamin,Tanggal Lahir,Jenjang\n'
+                              b'IM01,Santri Baru,L,2012-01-01,SMP\n'
+                              b'IM02,Tanpa Tanggal,L,,SMP\n'), 'ppdb.csv'),
+    }, content_type='multipart/form-data')
+    html = response.get_data(as_text=True)
+    assert '1 santri berhasil diimpor, 1 baris ditolak.' in html
+    assert Santri.query.filter_by(nis='IM01').count() == 1
+
+    link = html.split('/master/santri/impor/laporan/')[1].split('"')[0]
+    laporan = auth_client.get(f'/master/santri/impor/laporan/{link}')
+    assert laporan.mimetype == 'text/csv'
+    assert 'IM02' in laporan.get_data(as_text=True)
+    assert auth_client.get('/master/santri/impor/laporan/bukan-token').status_code == 404
+
+
+def test_kenaikan_preview_then_apply(auth_client):
+    from app.models.akademik import Raport, Semester
+    from app.models.audit import AuditLog
+    db.session.add(Semester(nama='Genap 2023/2024', tanggal_mulai=date(2024, 1, 1), tanggal_selesai=date(2024, 6, 30)))
+    tujuh, delapan = Kelas(nama_kelas='7A', jenjang='SMP'), Kelas(nama_kelas='8A', jenjang='SMP')
+    db.session.add_all([tujuh, delapan])
+    db.session.flush()
+    santri = _santri('KN01', 'Santri Naik', tujuh)
+    db.session.flush()
+    db.session.add(Raport(santri_id=santri.id, semester='Genap 2023/2024', catatan_wali_kelas='-',
+                          status_kenaikan='Naik Kelas'))
+    db.session.commit()
+    assert 'Kenaikan Kelas' in auth_client.get('/master/kenaikan').get_data(as_text=True)
+    data = {'semester': 'Genap 2023/2024', f'tujuan-{tujuh.id}': str(delapan.id)}
+
+    html = auth_client.post('/master/kenaikan', data={**data, 'pratinjau': 'Pratinjau'}).get_data(as_text=True)
+    assert 'Perubahan (1 santri)' in html and 'Santri Naik' in html
+    assert db.session.get(Santri, santri.id).kelas_id == tujuh.id
+
+    html = auth_client.post('/master/kenaikan', data={**data, 'terapkan': 'Terapkan Kenaikan'},
+                            follow_redirects=True).get_data(as_text=True)
+    assert '1 santri naik kelas, 0 santri lulus' in html
+    db.session.expire_all()
+    assert db.session.get(Santri, santri.id).kelas_id == delapan.id
+    assert AuditLog.query.filter_by(model_name='Santri', action='UPDATE').count() == 1
+
+
+def test_semester_add_and_edit_are_audited(auth_client):
+    from app.models.akademik import Semester
+    from app.models.audit import AuditLog
+    data = {'nama': 'Ganjil 2025/2026', 'tanggal_mulai': '2025-07-01', 'tanggal_selesai': '2025-12-31'}
+    auth_client.post('/master/semester/add', data=data, follow_redirects=True)
+    semester = Semester.query.filter_by(nama='Ganjil 2025/2026').one()
+
+    auth_client.post(f'/master/semester/edit/{semester.id}', data={**data, 'tanggal_selesai': '2025-12-20'},
+                     follow_redirects=True)
+    assert AuditLog.query.filter_by(model_name='Semester', action='CREATE').count() == 1
+    assert AuditLog.query.filter_by(model_name='Semester', action='UPDATE').count() == 1
+
+
+def test_backup_restore_drops_caches(auth_client, app, monkeypatch):
+    import io
+    import os
+    from app import cache
+    from app.services.backup_service import BackupService
+    from app.services.dashboard import GENERATION_KEY
+    monkeypatch.setattr(BackupService, 'restore_system_snapshot', lambda path: True)
+    cache.set(GENERATION_KEY, 1, timeout=0)
+    santri_dir = os.path.join(app.config['RAPORT_CACHE_DIR'], '1')
+    os.makedirs(santri_dir)
+
+    response = auth_client.post('/master/backup/restore', data={'file': (io.BytesIO(b'PK'), 'backup.zip')},
+                                follow_redirects=True)
+    assert 'berhasil direstore' in response.get_data(as_text=True)
+    assert cache.get(GENERATION_KEY) != 1
+    assert not os.path.exists(santri_dir)
@@ -0,0 +1,74 @@
+from datetime import date
+from app import db
+from app.models.akademik import Santri, Absensi, AbsensiRekap
+from app.services.absensi_rekap import AbsensiRekapService
+
+
+def _santri(nis):
+    santri = Santri(nis=nis, nama=f'Santri {nis}', jenis_kelamin='L',
+                    tanggal_lahir=date(2010, 1, 1), jenjang='SMP')
+    db.session.add(santri)
+    db.session.flush()
+    return santri
+
+
+def _rekap():
+    return {
+        (r.santri_id, r.tahun, r.bulan): (r.hadir, r.sakit, r.izin, r.alpha)
+        for r in AbsensiRekap.query.all()
+    }
+
+
+def test_incremental_updates_match_rebuild(app):
+    santri = _santri('K001')
+    rows = [
+        (date(2024, 8, 1), 'Hadir'),
+        (date(2024, 8, 2), 'Sakit'),
+        (date(2024, 9, 2), 'Izin'),
+    ]
+    for tanggal, status in rows:
+        db.session.add(Absensi(santri_id=santri.id, tanggal=tanggal, status=status))
+        AbsensiRekapService.record(new=(santri.id, tanggal, status))
+    db.session.commit()
+
+    # Edit (Sakit -> Alpha, moved to another month) and delete
+    absen = Absensi.query.filter_by(tanggal=date(2024, 8, 2)).one()
+    old = (absen.santri_id, absen.tanggal, absen.status)
+    absen.status, absen.tanggal = 'Alpha', date(2024, 10, 1)
+    AbsensiRekapService.record(old=old, new=(absen.santri_id, absen.tanggal, absen.status))
+    gone = Absensi.query.filter_by(tanggal=date(2024, 9, 2)).one()
+    AbsensiRekapService.record(old=(gone.santri_id, gone.tanggal, gone.status))
+    db.session.delete(gone)
+    db.session.commit()
+
+    incremental = {k: v for k, v in _rekap().items() if any(v)}
+    assert incremental == {
+        (santri.id, 2024, 8): (1, 0, 0, 0),
+        (santri.id, 2024, 10): (0, 0, 0, 1),
+    }
+
+    AbsensiRekapService.rebuild()
+    db.session.commit()
+    assert _rekap() == incremental
+
+
+def test_summary_combines_rollup_and_partial_months(app):
+    santri = _santri('K002')
+    for tanggal, status in [
+        (date(2024, 7, 10), 'Hadir'),   # before the range
+        (date(2024, 7, 20), 'Sakit'),   # partial first month
+        (date(2024, 8, 5), 'Hadir'),    # whole month
+        (date(2024, 9, 30), 'Izin'),    # whole month
+        (date(2024, 10, 3), 'Alpha'),   # partial last month
+        (date(2024, 10, 20), 'Hadir'),  # after the range
+    ]:
+        db.session.add(Absensi(santri_id=santri.id, tanggal=tanggal, status=status))
+    AbsensiRekapService.rebuild()
+    db.session.commit()
+
+    summary = AbsensiRekapService.summary([santri.id], date(2024, 7, 15), date(2024, 10, 10))
+    assert summary[santri.id] == {'Hadir': 1, 'Sakit': 1, 'Izin': 1, 'Alpha': 1}
+
+    # Inside a single month only raw rows are used
+    summary = AbsensiRekapService.summary([santri.id], date(2024, 7, 1), date(2024, 7, 15))
+    assert summary[santri.id] == {'Hadir': 1, 'Sakit': 0, 'Izin': 0, 'Alpha': 0}
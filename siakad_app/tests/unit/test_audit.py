@@ -57,3 +57,86 @@ def test_audit_log_decorator(client, app):
                     found = True
                     break
         assert found
+
+def test_record_audit_leaves_request_session_alone(app):
+    from datetime import date
+    from app.models.akademik import Santri
+    from app.services.audit_service import record_audit
+    with app.test_request_context('/'):
+        db.session.add(Santri(nis='AU01', nama='Belum Disimpan', jenis_kelamin='L',
+                              tanggal_lahir=date(2010, 1, 1)))
+        record_audit('UPDATE', 'Santri', {'foo': 'bar'}, user_id=1)
+        db.session.rollback()
+
+    assert AuditLog.query.filter_by(model_name='Santri').count() == 1
+    assert Santri.query.filter_by(nis='AU01').count() == 0
+
+def test_audit_writer_batches_in_background(app):
+    from app.services.audit_writer import AuditWriter
+    app.config.update(AUDIT_ASYNC=True, AUDIT_BATCH_SIZE=2)
+    writer = AuditWriter(app)
+    for i in range(5):
+        writer.submit({'action': 'TEST', 'model_name': f'Batch{i}'})
+    writer.flush()
+
+    assert AuditLog.query.filter_by(action='TEST').count() == 5
+    # Flushing does not stop the writer; closing writes what is still queued
+    thread = writer._thread
+    assert thread.is_alive()
+    writer.submit({'action': 'TEST', 'model_name': 'Terakhir'})
+    writer.close()
+    assert not thread.is_alive()
+    assert AuditLog.query.filter_by(action='TEST').count() == 6
+
+    # A submit after close starts a new writer
+    writer.submit({'action': 'TEST', 'model_name': 'Sesudah'})
+    writer.flush()
+    assert AuditLog.query.filter_by(action='TEST').count() == 7
+    writer.close()
+
+def test_audit_writer_spools_when_database_fails(app, monkeypatch):
+    import os
+    from app.services.audit_writer import AuditWriter
+    writer = AuditWriter(app)
+    insert = writer._insert
+
+    def unavailable(events):
+        raise RuntimeError('database down')
+    monkeypatch.setattr(writer, '_insert', unavailable)
+    writer.submit({'action': 'TEST', 'model_name': 'Spool'})
+    assert os.path.exists(writer.spool_path)
+    assert AuditLog.query.count() == 0
+
+    # The next successful write replays the spool
+    monkeypatch.setattr(writer, '_insert', insert)
+    writer.submit({'action': 'TEST', 'model_name': 'Berikutnya'})
+    assert {log.model_name for log in AuditLog.query} == {'Spool', 'Berikutnya'}
+    assert not os.path.exists(writer.spool_path)
+
+def test_replay_spool_skips_bad_lines_and_keeps_unwritten_events(app, monkeypatch):
+    import glob
+    import os
+    from app.services.audit_writer import AuditWriter
+    writer = AuditWriter(app)
+    os.makedirs(os.path.dirname(writer.spool_path), exist_ok=True)
+    with open(writer.spool_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'action': 'TEST', 'model_name': 'Baik', 'timestamp': '2026-01-05T08:00:00'}) + '\n')
+        f.write(json.dumps({'action': 'TEST', 'model_name': 'Jam', 'timestamp': 'kemarin'}) + '\n')
+        f.write('{"action": "TEST", "model_na')
+
+    # A failed insert puts the readable event back, with the partial line not glued to it
+    def unavailable(events):
+        raise RuntimeError('database down')
+    monkeypatch.setattr(writer, '_insert', unavailable)
+    assert writer.replay_spool() == 0
+    with open(writer.spool_path, encoding='utf-8') as f:
+        assert [json.loads(line)['model_name'] for line in f] == ['Baik']
+    assert glob.glob(f'{writer.spool_path}.*') == []
+
+    monkeypatch.undo()
+    with open(writer.spool_path, 'a', encoding='utf-8') as f:
+        f.write('{"action": "TEST", "model_na')
+    assert writer.replay_spool() == 1
+    assert [log.model_name for log in AuditLog.query] == ['Baik']
+    assert not os.path.exists(writer.spool_path)
+    assert glob.glob(f'{writer.spool_path}.*') == []
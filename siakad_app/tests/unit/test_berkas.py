@@ -0,0 +1,80 @@
+import io
+import os
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+from app import db
+from app.models.berkas import Berkas
+from app.services.berkas import BerkasService
+
+
+def _gambar(color='red', size=(800, 600)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+def _upload(content, filename):
+    return FileStorage(stream=io.BytesIO(content), filename=filename)
+
+
+def test_same_content_is_stored_once(app):
+    content = _gambar()
+    first = BerkasService.simpan(_upload(content, 'IMG_0001.jpg'))
+    db.session.commit()
+    second = BerkasService.simpan(_upload(content, 'kwitansi.jpeg'))
+    db.session.commit()
+
+    assert first.sha256 == second.sha256
+    assert Berkas.query.count() == 1
+    path = BerkasService.path(first)
+    assert path.endswith(os.path.join(first.sha256[:2], first.sha256[2:4], f'{first.sha256}.jpg'))
+    with open(path, 'rb') as f:
+        assert f.read() == content
+    # No temporary files left behind
+    assert not [n for n in os.listdir(app.config['BERKAS_DIR']) if n.endswith('.tmp')]
+
+
+def test_different_files_with_same_name_are_both_kept(app):
+    a = BerkasService.simpan(_upload(_gambar('red'), 'IMG_0001.jpg'))
+    b = BerkasService.simpan(_upload(_gambar('blue'), 'IMG_0001.jpg'))
+    db.session.commit()
+    assert a.sha256 != b.sha256
+    assert os.path.exists(BerkasService.path(a)) and os.path.exists(BerkasService.path(b))
+
+
+def test_thumbnails_are_rendered_by_the_queue(app):
+    gambar = BerkasService.simpan(_upload(_gambar(size=(1600, 1200)), 'foto.jpg'))
+    pdf = BerkasService.simpan(_upload(b'%PDF-1.4 bukti', 'bukti.pdf'))
+    rusak = BerkasService.simpan(_upload(b'bukan gambar', 'rusak.png'))
+    db.session.commit()
+    assert (gambar.thumbnail, pdf.thumbnail, rusak.thumbnail) == ('pending', 'none', 'pending')
+
+    assert BerkasService.proses_thumbnail() == 2
+    assert db.session.get(Berkas, gambar.sha256).thumbnail == 'done'
+    assert db.session.get(Berkas, rusak.sha256).thumbnail == 'failed'
+    with Image.open(BerkasService.thumbnail_path(gambar)) as thumb:
+        assert max(thumb.size) == app.config['THUMBNAIL_SIZE']
+    assert BerkasService.proses_thumbnail() == 0
+
+
+def test_stale_thumbnail_claim_is_requeued_then_failed(app):
+    from datetime import datetime, timedelta
+    app.config['THUMBNAIL_MAX_ATTEMPTS'] = 2
+    gambar = BerkasService.simpan(_upload(_gambar(), 'foto.jpg'))
+    db.session.commit()
+    long_ago = datetime.utcnow() - timedelta(hours=1)
+
+    # The worker died right after claiming: the first time it goes back to pending
+    Berkas.query.filter_by(sha256=gambar.sha256).update({'thumbnail': 'running', 'claimed_at': long_ago, 'attempts': 1})
+    assert BerkasService.requeue_stale_thumbnails() == 1
+    assert db.session.get(Berkas, gambar.sha256).thumbnail == 'pending'
+
+    # ... and once the attempts are used up it is given up on
+    Berkas.query.filter_by(sha256=gambar.sha256).update({'thumbnail': 'running', 'claimed_at': long_ago, 'attempts': 2})
+    assert BerkasService.requeue_stale_thumbnails() == 0
+    db.session.expire_all()
+    assert db.session.get(Berkas, gambar.sha256).thumbnail == 'failed'
+
+    # A fresh claim is left alone
+    Berkas.query.filter_by(sha256=gambar.sha256).update({'thumbnail': 'running', 'claimed_at': datetime.utcnow()})
+    assert BerkasService.requeue_stale_thumbnails() == 0
@@ -0,0 +1,85 @@
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+from sqlalchemy import event
+from app import db
+from app.models.akademik import Santri, Kelas, Absensi
+from app.models.keuangan import PosKeuangan, TransaksiKeuangan
+from app.services.dashboard import DashboardService
+
+TODAY = date(2024, 8, 15)
+ADMIN = SimpleNamespace(id=1, role='admin')
+
+
+def _santri(nis, jenjang, status='aktif', wali_user_id=None):
+    santri = Santri(nis=nis, nama=f'Santri {nis}', jenis_kelamin='L', tanggal_lahir=date(2010, 1, 1),
+                    jenjang=jenjang, status=status, wali_user_id=wali_user_id)
+    db.session.add(santri)
+    return santri
+
+
+def _count_queries(fn):
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        result = fn()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    return result, len(statements)
+
+
+def _seed():
+    db.session.add(Kelas(nama_kelas='7A', jenjang='SMP'))
+    a, b = _santri('D1', 'SMP', wali_user_id=99), _santri('D2', 'SMA')
+    _santri('D3', 'SMA', status='lulus')
+    pos = PosKeuangan(nama='Donasi', tipe='pemasukan')
+    db.session.add(pos)
+    db.session.flush()
+    db.session.add_all([
+        Absensi(santri_id=a.id, tanggal=TODAY, status='Hadir'),
+        Absensi(santri_id=b.id, tanggal=TODAY, status='Sakit'),
+        TransaksiKeuangan(pos_id=pos.id, jumlah=Decimal('150000'), jenis='masuk', tanggal=TODAY),
+        TransaksiKeuangan(pos_id=pos.id, jumlah=Decimal('50000'), jenis='masuk', tanggal=date(2024, 7, 31)),
+    ])
+    db.session.commit()
+
+
+def test_stats_come_from_one_statement(app):
+    _seed()
+    stats, queries = _count_queries(lambda: DashboardService.compute(TODAY))
+    assert queries == 1
+    assert stats['total_santri'] == 3
+    assert stats['total_kelas'] == 1
+    assert stats['santri_aktif'] == {'SMA': 1, 'SMP': 1}
+    assert stats['absensi'] == {'Hadir': 1, 'Sakit': 1}
+    assert stats['kehadiran_persen'] == 50.0
+    assert stats['pemasukan_bulan_ini'] == Decimal('150000')
+
+
+def test_wali_santri_only_sees_own_children_and_no_finance(app):
+    _seed()
+    stats = DashboardService.get_stats(SimpleNamespace(id=99, role='wali_santri'), today=TODAY)
+    assert stats['total_santri'] == 1
+    assert stats['absensi'] == {'Hadir': 1}
+    assert stats['pemasukan_bulan_ini'] is None
+
+
+def test_stats_are_cached_until_a_source_table_changes(app):
+    _seed()
+    DashboardService.get_stats(ADMIN, today=TODAY)
+    stats, queries = _count_queries(lambda: DashboardService.get_stats(ADMIN, today=TODAY))
+    assert queries == 0
+
+    _santri('D4', 'SMP')
+    db.session.commit()
+    stats = DashboardService.get_stats(ADMIN, today=TODAY)
+    assert stats['total_santri'] == 4
+    assert stats['santri_aktif']['SMP'] == 2
+
+
+def test_dashboard_page_renders_finance_for_admin(auth_client):
+    _seed()
+    html = auth_client.get('/dashboard').get_data(as_text=True)
+    assert 'Kehadiran Hari Ini' in html
+    assert 'Pemasukan Bulan Ini' in html
@@ -0,0 +1,60 @@
+import io
+from datetime import date, datetime
+from decimal import Decimal
+from openpyxl import load_workbook
+from app import db
+from app.models.akademik import Santri
+from app.models.keuangan import PosKeuangan, TransaksiKeuangan, TabunganSantri
+from app.services import ekspor
+from app.services.ekspor import EksporService
+
+
+def _transaksi():
+    pos = PosKeuangan(nama='Infaq', tipe='pemasukan')
+    db.session.add(pos)
+    db.session.flush()
+    db.session.add_all([
+        TransaksiKeuangan(pos_id=pos.id, jenis='masuk', jumlah=Decimal('1000.50'), tanggal=date(2024, 5, d),
+                          keterangan=f'Infaq {d}')
+        for d in range(1, 6)
+    ])
+    db.session.commit()
+
+
+def test_csv_is_sent_in_chunks(app, monkeypatch):
+    _transaksi()
+    monkeypatch.setattr(ekspor, 'CSV_ROWS_PER_CHUNK', 2)
+    header, rows = EksporService.transaksi(date(2024, 5, 2), date(2024, 5, 5))
+    chunks = list(EksporService.iter_csv(header, rows))
+
+    assert len(chunks) == 3
+    lines = b''.join(chunks).decode('utf-8').splitlines()
+    assert lines[0] == 'Tanggal,Kategori,Jenis,Keterangan,Metode,Jumlah'
+    assert lines[1] == '2024-05-02,Infaq,masuk,Infaq 2,,1000.50'
+    assert len(lines) == 5
+
+
+def test_xlsx_write_only(app):
+    _transaksi()
+    header, rows = EksporService.transaksi()
+    content = b''.join(EksporService.iter_xlsx(header, rows, title='Transaksi'))
+
+    sheet = load_workbook(io.BytesIO(content), read_only=True)['Transaksi']
+    values = list(sheet.iter_rows(values_only=True))
+    assert values[0] == tuple(header)
+    assert len(values) == 6
+    assert values[1][5] == 1000.5
+
+
+def test_tabungan_includes_whole_end_day(app):
+    santri = Santri(nis='EK1', nama='Santri Ekspor', jenis_kelamin='L', tanggal_lahir=date(2010, 1, 1))
+    db.session.add(santri)
+    db.session.flush()
+    db.session.add_all([
+        TabunganSantri(santri_id=santri.id, jenis='setor', jumlah=5000, tanggal=datetime(2024, 5, 31, 16, 30)),
+        TabunganSantri(santri_id=santri.id, jenis='setor', jumlah=5000, tanggal=datetime(2024, 6, 1, 7, 0)),
+    ])
+    db.session.commit()
+
+    header, rows = EksporService.tabungan(date(2024, 5, 1), date(2024, 5, 31))
+    assert [row[0] for row in rows] == [datetime(2024, 5, 31, 16, 30)]
@@ -0,0 +1,66 @@
+import io
+import csv
+from datetime import date
+import pytest
+from app import db
+from app.models.akademik import Santri, Kelas
+from app.services.impor_santri import ImporSantriService, FormatImporTidakDikenal
+
+
+def _csv(text):
+    return io.BytesIO(text.encode('utf-8'))
+
+
+def test_impor_csv_inserts_valid_rows_and_reports_rejected(app):
+    kelas = Kelas(nama_kelas='7A', jenjang='SMP')
+    db.session.add_all([kelas, Santri(nis='P001', nama='Lama', jenis_kelamin='L',
+                                      tanggal_lahir=date(2010, 1, 1), jenjang='SMP')])
+    db.session.commit()
+
+    hasil = ImporSantriService.impor(_csv(
+        'NIS;Nama;Jenis Kelamin;Tanggal Lahir;Kelas;Jenjang\n'
+        'P002;Ahmad  Fauzi;L;05/03/2012;7a;\n'
+        'P001;Sudah Ada;L;05/03/2012;;SMP\n'
+        'P002;Ganda di File;P;05/03/2012;;SMP\n'
+        'P003;Siti;X;05/03/2012;;SMP\n'
+        'P004;Aisyah;Perempuan;2012-04-01;9Z;\n'
+        ';;;;;\n'
+        'P005;Zaki;l;1/2/2013;;SD\n'
+    ), 'csv')
+    db.session.commit()
+
+    assert (hasil['baris'], hasil['dibuat'], hasil['ditolak']) == (6, 2, 4)
+    assert [c[0] for c in hasil['contoh']] == [3, 4, 5, 6]
+    ahmad = Santri.query.filter_by(nis='P002').one()
+    assert (ahmad.kelas_id, ahmad.jenjang, ahmad.status) == (kelas.id, 'SMP', 'aktif')
+    assert ahmad.nama_cari == 'ahmad fauzi' # bulk inserts bypass the validator
+    assert Santri.query.filter_by(nis='P005').one().tanggal_lahir == date(2013, 2, 1)
+
+    with open(ImporSantriService.laporan_path(hasil['laporan']), encoding='utf-8') as f:
+        laporan = list(csv.reader(f))
+    assert laporan[0][:3] == ['Baris', 'Alasan', 'nis']
+    assert [(r[0], r[1]) for r in laporan[1:]] == [
+        ('3', 'NIS sudah terdaftar'), ('4', 'NIS sudah terdaftar'),
+        ('5', 'Jenis kelamin harus L atau P'), ('6', 'Kelas "9Z" tidak ditemukan'),
+    ]
+
+
+def test_impor_xlsx(app):
+    openpyxl = pytest.importorskip('openpyxl')
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(['NIS', 'Nama', 'JK', 'Tanggal Lahir', 'Jenjang'])
+    sheet.append([2024001, 'Budi', 'L', date(2011, 7, 1), 'SMA'])
+    stream = io.BytesIO()
+    workbook.save(stream)
+    stream.seek(0)
+
+    hasil = ImporSantriService.impor(stream, 'xlsx')
+    db.session.commit()
+    assert hasil['dibuat'] == 1 and hasil['laporan'] is None
+    assert Santri.query.filter_by(nis='2024001').one().tanggal_lahir == date(2011, 7, 1)
+
+
+def test_impor_requires_columns(app):
+    with pytest.raises(FormatImporTidakDikenal):
+        ImporSantriService.impor(_csv('NIS,Nama\nP1,Ahmad\n'), 'csv')
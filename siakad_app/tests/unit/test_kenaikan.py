@@ -0,0 +1,54 @@
+from datetime import date
+from app import db
+from app.models.akademik import Santri, Kelas, Raport, Semester
+from app.services.kenaikan import KenaikanKelasService, LULUS
+
+SEMESTER = 'Genap 2023/2024'
+
+
+def _santri(nis, kelas, status_kenaikan=None):
+    santri = Santri(nis=nis, nama=f'Santri {nis}', jenis_kelamin='L', tanggal_lahir=date(2010, 1, 1),
+                    jenjang='SMP', kelas_id=kelas.id)
+    db.session.add(santri)
+    db.session.flush()
+    if status_kenaikan:
+        db.session.add(Raport(santri_id=santri.id, semester=SEMESTER, catatan_wali_kelas='-',
+                              status_kenaikan=status_kenaikan))
+    return santri
+
+
+def _setup():
+    db.session.add(Semester(nama=SEMESTER, tanggal_mulai=date(2024, 1, 1), tanggal_selesai=date(2024, 6, 30)))
+    kelas = {nama: Kelas(nama_kelas=nama, jenjang='SMP') for nama in ('7', '8', '9')}
+    db.session.add_all(kelas.values())
+    db.session.flush()
+    return kelas
+
+
+def test_pratinjau_and_terapkan_chained_moves(app):
+    kelas = _setup()
+    naik7 = _santri('K71', kelas['7'], 'Naik Kelas')
+    tinggal7 = _santri('K72', kelas['7'], 'Tinggal Kelas')
+    tanpa7 = _santri('K73', kelas['7'])
+    naik8 = _santri('K81', kelas['8'], 'Naik Kelas')
+    lulus9 = _santri('K91', kelas['9'], 'Naik Kelas')
+    keluar9 = _santri('K92', kelas['9'], 'Lulus')
+    keluar9.status = 'keluar'
+    db.session.commit()
+    mapping = {kelas['7'].id: kelas['8'].id, kelas['8'].id: kelas['9'].id, kelas['9'].id: LULUS}
+
+    pratinjau = KenaikanKelasService.pratinjau(SEMESTER, mapping)
+    assert pratinjau[kelas['7'].id] == {'naik': 1, 'lulus': 0, 'tinggal': 1, 'tanpa_raport': 1}
+    assert pratinjau[kelas['9'].id]['lulus'] == 1
+    assert [r.nis for r in KenaikanKelasService.rincian(SEMESTER, mapping)] == ['K71', 'K81', 'K91']
+
+    assert KenaikanKelasService.terapkan(SEMESTER, mapping) == {'naik': 2, 'lulus': 1}
+    db.session.commit()
+    db.session.expire_all()
+
+    # 7 -> 8 and 8 -> 9 in the same run: nobody moves twice
+    assert naik7.kelas_id == kelas['8'].id
+    assert naik8.kelas_id == kelas['9'].id
+    assert (tinggal7.kelas_id, tanpa7.kelas_id) == (kelas['7'].id, kelas['7'].id)
+    assert (lulus9.status, lulus9.kelas_id) == ('lulus', kelas['9'].id)
+    assert keluar9.status == 'keluar'
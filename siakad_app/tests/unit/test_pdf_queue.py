@@ -0,0 +1,106 @@
+import pytest
+from app.models.job import PdfJob
+from app.services import pdf_service
+from app.services.pdf_service import PdfService, PdfQueueFull
+
+
+class FakeHTML:
+    def __init__(self, string):
+        self.string = string
+
+    def write_pdf(self, target):
+        with open(target, 'wb') as f:
+            f.write(b'%PDF-fake ' + self.string.encode())
+
+
+def _enqueue(n=1):
+    return [PdfService.enqueue('akademik/raport_pdf.html', f'raport_{i}.pdf', raports=[]) for i in range(n)]
+
+
+def test_queue_applies_backpressure(app):
+    app.config['PDF_QUEUE_MAX'] = 2
+    _enqueue(2)
+    with pytest.raises(PdfQueueFull):
+        _enqueue(1)
+
+    # Finished jobs no longer count against the limit
+    PdfJob.query.filter_by(filename='raport_0.pdf').update({'status': 'done'})
+    _enqueue(1)
+
+
+def test_worker_renders_jobs_in_order(app, tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_service, 'HTML', FakeHTML)
+    app.config['PDF_OUTPUT_DIR'] = str(tmp_path)
+    first, second = _enqueue(2)
+
+    assert PdfService.process_next_job()
+    assert PdfService.process_next_job()
+    assert not PdfService.process_next_job()
+
+    for job in (first, second):
+        assert job.status == 'done'
+        assert job.html == ''
+        with open(job.output_path, 'rb') as f:
+            assert f.read().startswith(b'%PDF-fake')
+    assert first.finished_at <= second.started_at
+
+
+def test_worker_marks_failed_without_weasyprint(app, monkeypatch):
+    monkeypatch.setattr(pdf_service, 'HTML', None)
+    job, = _enqueue(1)
+    PdfService.process_next_job()
+    assert job.status == 'failed'
+    assert 'WeasyPrint' in job.error
+
+
+def test_job_can_only_be_claimed_once(app):
+    job, = _enqueue(1)
+    assert PdfService.claim_next_job().id == job.id
+    assert PdfService.claim_next_job() is None
+
+
+def test_stale_job_fails_after_max_attempts(app):
+    from datetime import datetime, timedelta
+    from app import db
+    app.config['PDF_JOB_MAX_ATTEMPTS'] = 2
+    job, = _enqueue(1)
+    long_ago = datetime.utcnow() - timedelta(hours=1)
+
+    # The worker dies mid-render: the first time the job goes back in the queue
+    PdfService.claim_next_job()
+    PdfJob.query.filter_by(id=job.id).update({'started_at': long_ago, 'heartbeat_at': long_ago})
+    assert PdfService.requeue_stale_jobs() == 1
+    db.session.refresh(job)
+    assert job.status == 'queued'
+
+    # ... and once the attempts are used up it is given up on
+    PdfService.claim_next_job()
+    PdfJob.query.filter_by(id=job.id).update({'started_at': long_ago, 'heartbeat_at': long_ago})
+    assert PdfService.requeue_stale_jobs() == 0
+    db.session.refresh(job)
+    assert job.status == 'failed' and job.attempts == 2
+
+
+def test_slow_render_keeps_its_heartbeat(app, tmp_path, monkeypatch):
+    import time
+    from datetime import datetime, timedelta
+    from app import db
+    heartbeats = []
+
+    class SlowHTML(FakeHTML):
+        def write_pdf(self, target):
+            # A render taking longer than the timeout must not be taken from its worker
+            long_ago = datetime.utcnow() - timedelta(hours=1)
+            db.session.execute(PdfJob.__table__.update().values(started_at=long_ago, heartbeat_at=long_ago))
+            db.session.commit()
+            time.sleep(0.3)
+            heartbeats.append(db.session.query(PdfJob.heartbeat_at).scalar())
+            assert PdfService.requeue_stale_jobs() == 0
+            super().write_pdf(target)
+
+    monkeypatch.setattr(pdf_service, 'HTML', SlowHTML)
+    app.config.update(PDF_OUTPUT_DIR=str(tmp_path), PDF_JOB_HEARTBEAT=0.05)
+    job, = _enqueue(1)
+    assert PdfService.process_next_job()
+    assert heartbeats[0] > datetime.utcnow() - timedelta(minutes=1)
+    assert job.status == 'done' and job.attempts == 1
@@ -0,0 +1,81 @@
+from datetime import date
+from sqlalchemy import event
+from app import db
+from app.models.akademik import Santri, Kelas, MataPelajaran, Nilai, Absensi, Tahfidz, Raport, Semester
+from app.services.raport import RaportService
+from app.services.absensi_rekap import AbsensiRekapService
+
+SEMESTER = 'Ganjil 2024/2025'
+
+
+def _seed_class(jumlah_santri):
+    db.session.add(Semester(nama=SEMESTER, tanggal_mulai=date(2024, 7, 1), tanggal_selesai=date(2024, 12, 31)))
+    kelas = Kelas(nama_kelas='10A', jenjang='SMA')
+    mapels = [MataPelajaran(nama_mapel=f'Mapel {i}', jenjang='SMA') for i in range(3)]
+    db.session.add_all([kelas] + mapels)
+    db.session.flush()
+    for i in range(jumlah_santri):
+        santri = Santri(nis=f'R{i:03d}', nama=f'Santri {i:03d}', jenis_kelamin='P',
+                        tanggal_lahir=date(2008, 5, 1), jenjang='SMA', kelas_id=kelas.id)
+        db.session.add(santri)
+        db.session.flush()
+        for mapel in mapels:
+            db.session.add(Nilai(santri_id=santri.id, mapel_id=mapel.id, semester=SEMESTER,
+                                 nilai_harian=60 + i, nilai_uts=70, nilai_uas=80, nilai_praktik=90))
+        db.session.add(Absensi(santri_id=santri.id, tanggal=date(2024, 8, 1), status='Hadir'))
+        db.session.add(Absensi(santri_id=santri.id, tanggal=date(2024, 8, 2), status='Sakit'))
+        # Outside the semester's date range
+        db.session.add(Absensi(santri_id=santri.id, tanggal=date(2025, 2, 3), status='Alpha'))
+        db.session.add(Tahfidz(santri_id=santri.id, nama_surat='An-Naba', ayat='1-10',
+                               kelancaran='Lancar', tajwid='Bagus', tanggal_setor=date(2024, 8, 3)))
+        if i % 2 == 0:
+            db.session.add(Raport(santri_id=santri.id, semester=SEMESTER, catatan_wali_kelas='Baik',
+                                  status_kenaikan='Naik Kelas', tanggal_bagi=date(2024, 12, 20)))
+    AbsensiRekapService.rebuild()
+    db.session.commit()
+    return kelas
+
+
+def _count_queries(fn):
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        result = fn()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    return result, len(statements)
+
+
+def test_bulk_raport_matches_per_santri(app):
+    kelas = _seed_class(4)
+    service = RaportService()
+
+    bulk = service.get_raport_data_bulk(kelas.id, SEMESTER)
+    assert [d['santri'].nis for d in bulk] == ['R000', 'R001', 'R002', 'R003']
+
+    for data in bulk:
+        single = service.get_raport_data(data['santri'].id, SEMESTER)
+        for key in ('nilai', 'absensi', 'catatan', 'status_kenaikan', 'tanggal_cetak', 'raport_exists'):
+            assert data[key] == single[key]
+        assert [t.id for t in data['tahfidz']] == [t.id for t in single['tahfidz']]
+
+
+def test_bulk_raport_query_count_is_constant(app):
+    kelas_id = _seed_class(12).id
+    db.session.expire_all()
+
+    raports, queries = _count_queries(lambda: RaportService().get_raport_data_bulk(kelas_id, SEMESTER))
+    assert len(raports) == 12
+    assert queries == 7
+
+
+def test_raport_absensi_is_bounded_by_semester(app):
+    kelas = _seed_class(2)
+    service = RaportService()
+
+    for data in [service.get_raport_data(kelas.santri_list[0].id, SEMESTER)] + service.get_raport_data_bulk(kelas.id, SEMESTER):
+        assert data['absensi'] == {'Hadir': 1, 'Sakit': 1, 'Izin': 0, 'Alpha': 0}
+
+    # Unknown semester: no date range, so no attendance is counted
+    assert sum(service.get_raport_data(kelas.santri_list[0].id, 'Genap 2030/2031')['absensi'].values()) == 0
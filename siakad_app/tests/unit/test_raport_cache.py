@@ -0,0 +1,60 @@
+import os
+from datetime import date
+from app import db
+from app.models.akademik import Santri, MataPelajaran, Nilai
+from app.services.raport import RaportService
+from app.services.raport_cache import RaportCache
+
+SEMESTER = 'Ganjil 2024/2025'
+TEMPLATE = 'akademik/_raport_detail_body.html'
+
+
+def _seed():
+    mapel = MataPelajaran(nama_mapel='Aqidah', jenjang='SD')
+    santri = Santri(nis='C001', nama='Santri Cache', jenis_kelamin='L', tanggal_lahir=date(2014, 2, 2), jenjang='SD')
+    db.session.add_all([mapel, santri])
+    db.session.flush()
+    nilai = Nilai(santri_id=santri.id, mapel_id=mapel.id, semester=SEMESTER,
+                  nilai_harian=80, nilai_uts=80, nilai_uas=80, nilai_praktik=80)
+    db.session.add(nilai)
+    db.session.commit()
+    return santri, nilai
+
+
+def test_render_is_cached_by_content(app):
+    santri, nilai = _seed()
+    with app.test_request_context():
+        data = RaportService().get_raport_data(santri.id, SEMESTER)
+        first = RaportCache.render(TEMPLATE, data)
+        path = RaportCache.path(data, TEMPLATE, 'html')
+        assert os.path.exists(path)
+        assert RaportCache.render(TEMPLATE, data) == first
+
+        # Different inputs address a different file
+        data['nilai'][0]['nilai_akhir'] = 99
+        assert RaportCache.path(data, TEMPLATE, 'html') != path
+
+
+def test_commit_on_source_rows_invalidates_santri(app):
+    santri, nilai = _seed()
+    with app.test_request_context():
+        RaportCache.render(TEMPLATE, RaportService().get_raport_data(santri.id, SEMESTER))
+        santri_dir = os.path.join(app.config['RAPORT_CACHE_DIR'], str(santri.id))
+        assert os.listdir(santri_dir)
+
+        nilai.nilai_uas = 95
+        db.session.commit()
+        assert not os.path.exists(santri_dir)
+
+
+def test_rollback_keeps_cache(app):
+    santri, nilai = _seed()
+    with app.test_request_context():
+        RaportCache.render(TEMPLATE, RaportService().get_raport_data(santri.id, SEMESTER))
+        santri_dir = os.path.join(app.config['RAPORT_CACHE_DIR'], str(santri.id))
+
+        nilai.nilai_uas = 10
+        db.session.flush()
+        db.session.rollback()
+        db.session.commit()
+        assert os.listdir(santri_dir)
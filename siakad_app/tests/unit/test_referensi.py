@@ -0,0 +1,69 @@
+from datetime import date
+from sqlalchemy import event
+from app import db
+from app.models.akademik import Kelas, Semester
+from app.services.referensi import ReferensiCache
+
+
+def _count_selects(fn):
+    statements = []
+
+    def before(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before)
+    try:
+        result = fn()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before)
+    return result, len(statements)
+
+
+def test_rows_are_served_from_memory_until_table_changes(app):
+    db.session.add_all([Kelas(nama_kelas='8A', jenjang='SMP'), Kelas(nama_kelas='7A', jenjang='SMP')])
+    db.session.commit()
+
+    rows, queries = _count_selects(lambda: ReferensiCache.rows(Kelas))
+    assert [r['nama_kelas'] for r in rows] == ['7A', '8A']
+    assert queries == 1
+
+    _, queries = _count_selects(lambda: ReferensiCache.rows(Kelas))
+    assert queries == 0
+
+    # A commit touching the table bumps the shared version, so the next read reloads
+    db.session.add(Kelas(nama_kelas='9A', jenjang='SMP'))
+    db.session.commit()
+    rows, queries = _count_selects(lambda: ReferensiCache.rows(Kelas))
+    assert [r['nama_kelas'] for r in rows] == ['7A', '8A', '9A']
+    assert queries == 1
+
+
+def test_all_returns_session_instances_without_query(app):
+    kelas = Kelas(nama_kelas='7B', jenjang='SMP')
+    db.session.add(kelas)
+    db.session.commit()
+    ReferensiCache.rows(Kelas)
+    db.session.expunge_all()
+
+    result, queries = _count_selects(lambda: ReferensiCache.all(Kelas))
+    assert queries == 0
+    assert result[0] in db.session
+    assert result[0].nama_kelas == '7B'
+
+    # Attached instances behave like loaded rows: edits are flushed and bump the version
+    result[0].nama_kelas = '7C'
+    db.session.commit()
+    assert [r['nama_kelas'] for r in ReferensiCache.rows(Kelas)] == ['7C']
+
+
+def test_semester_current_uses_cached_rows(app):
+    db.session.add_all([
+        Semester(nama='Ganjil 2020/2021', tanggal_mulai=date(2020, 7, 1), tanggal_selesai=date(2020, 12, 31)),
+        Semester(nama='Genap 2020/2021', tanggal_mulai=date(2021, 1, 1), tanggal_selesai=date(2021, 6, 30)),
+    ])
+    db.session.commit()
+
+    assert Semester.choices() == [('Ganjil 2020/2021', 'Ganjil 2020/2021'), ('Genap 2020/2021', 'Genap 2020/2021')]
+    # No semester contains today, so the latest one is used
+    assert Semester.current().nama == 'Genap 2020/2021'
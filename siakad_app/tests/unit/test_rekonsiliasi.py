@@ -0,0 +1,88 @@
+import io
+import json
+from datetime import date
+from decimal import Decimal
+import pytest
+from app import db
+from app.models.akademik import Santri
+from app.models.keuangan import Keuangan, PosKeuangan, TransaksiKeuangan, MutasiBank
+from app.services.rekonsiliasi import RekonsiliasiService, FormatMutasiTidakDikenal, parse_jumlah, parse_tanggal
+
+
+def _csv(text):
+    return io.BytesIO(text.encode('utf-8'))
+
+
+def test_parse_jumlah_formats():
+    assert parse_jumlah('1.500.000,00') == Decimal('1500000.00')
+    assert parse_jumlah('1,500,000.00') == Decimal('1500000.00')
+    assert parse_jumlah('Rp 150000') == Decimal('150000.00')
+    assert parse_jumlah('-25.000') == Decimal('-25000.00')
+    assert parse_jumlah('75,000.00 DB') == Decimal('-75000.00')
+    assert parse_jumlah('75,000.00 CR') == Decimal('75000.00')
+    assert parse_jumlah('') is None
+    assert parse_tanggal('05/03/2024') == date(2024, 3, 5)
+    assert parse_tanggal('2024-03-05 10:11') == date(2024, 3, 5)
+
+
+def test_impor_is_idempotent(app):
+    statement = ('Tanggal;Keterangan;Debet;Kredit\n'
+                 '01/03/2024;TRF DARI AHMAD FAUZI;;150.000,00\n'
+                 '01/03/2024;TRF DARI AHMAD FAUZI;;150.000,00\n'
+                 '02/03/2024;BIAYA ADMIN;6.500,00;\n'
+                 'SALDO AWAL;;;\n')
+    hasil = RekonsiliasiService.impor(_csv(statement))
+    db.session.commit()
+    assert hasil == {'baris': 4, 'baru': 3, 'duplikat': 0, 'dilewati': 1}
+    assert MutasiBank.query.filter_by(jenis='keluar').one().jumlah == Decimal('6500.00')
+
+    # The same file again, and one with an extra line: only the new line is added
+    assert RekonsiliasiService.impor(_csv(statement))['baru'] == 0
+    hasil = RekonsiliasiService.impor(_csv(statement + '03/03/2024;TRF DARI AHMAD FAUZI;;150.000,00\n'))
+    db.session.commit()
+    assert (hasil['baru'], hasil['duplikat']) == (1, 3)
+    assert MutasiBank.query.count() == 4
+
+
+def test_impor_rejects_unknown_header(app):
+    with pytest.raises(FormatMutasiTidakDikenal):
+        RekonsiliasiService.impor(_csv('a,b,c\n1,2,3\n'))
+
+
+def test_cocokkan_matches_clear_winner_and_queues_ambiguous(app):
+    pos = PosKeuangan(nama='Infaq', tipe='pemasukan')
+    santri = Santri(nis='RK01', nama='Ahmad Fauzi', jenis_kelamin='L', tanggal_lahir=date(2010, 1, 1), jenjang='SMP')
+    db.session.add_all([pos, santri])
+    db.session.flush()
+    spp = Keuangan(santri_id=santri.id, bulan='Maret', tahun=2024, jumlah=150000, status='Lunas',
+                   tanggal_bayar=date(2024, 3, 2))
+    # Two identical transfers without anything that tells them apart
+    kembar = [TransaksiKeuangan(pos_id=pos.id, jumlah=200000, jenis='masuk', tanggal=date(2024, 3, 5),
+                                metode_pembayaran='Transfer', keterangan='Infaq') for _ in range(2)]
+    tunai = TransaksiKeuangan(pos_id=pos.id, jumlah=80000, jenis='masuk', tanggal=date(2024, 3, 6),
+                              metode_pembayaran='Tunai')
+    db.session.add_all([spp, tunai] + kembar)
+    db.session.commit()
+
+    RekonsiliasiService.impor(_csv('Tanggal,Keterangan,Jumlah\n'
+                                   '2024-03-01,TRF AHMAD FAUZI,150000\n'
+                                   '2024-03-05,SETORAN,200000\n'
+                                   '2024-03-06,SETORAN TUNAI,80000\n'))
+    hasil = RekonsiliasiService.cocokkan(date(2024, 3, 1), date(2024, 3, 31))
+    db.session.commit()
+    assert hasil == {'cocok': 1, 'tinjau': 1, 'belum': 1}
+
+    cocok = MutasiBank.query.filter_by(status='cocok').one()
+    assert cocok.keuangan_id == spp.id and cocok.otomatis
+    tinjau = MutasiBank.query.filter_by(status='tinjau').one()
+    assert {k['id'] for k in json.loads(tinjau.kandidat)} == {tx.id for tx in kembar}
+    # Cash transactions never appear on the statement
+    assert MutasiBank.query.filter_by(status='belum').one().jumlah == Decimal('80000.00')
+
+    RekonsiliasiService.tetapkan(tinjau, 'transaksi', kembar[1].id)
+    db.session.commit()
+    with pytest.raises(ValueError):
+        RekonsiliasiService.tetapkan(MutasiBank.query.filter_by(status='belum').one(), 'transaksi', kembar[1].id)
+
+    # A later run leaves settled lines alone
+    assert RekonsiliasiService.cocokkan(date(2024, 3, 1), date(2024, 3, 31)) == {'cocok': 0, 'tinjau': 0, 'belum': 1}
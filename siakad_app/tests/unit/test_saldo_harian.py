@@ -0,0 +1,76 @@
+from datetime import date
+from decimal import Decimal
+from app import db
+from app.models.keuangan import PosKeuangan, TransaksiKeuangan, SaldoHarian
+from app.services.saldo_harian import SaldoHarianService
+
+
+def _pos():
+    pos = PosKeuangan(nama='Donasi', tipe='pemasukan')
+    db.session.add(pos)
+    db.session.flush()
+    return pos
+
+
+def _snapshot():
+    return {(s.pos_id, s.tanggal): (Decimal(s.masuk), Decimal(s.keluar))
+            for s in SaldoHarian.query.order_by(SaldoHarian.tanggal).all()}
+
+
+def test_daily_totals_follow_every_transaction_write(app):
+    pos = _pos()
+    tx = TransaksiKeuangan(pos_id=pos.id, jumlah=Decimal('100.00'), jenis='masuk', tanggal=date(2024, 8, 1))
+    db.session.add_all([
+        tx,
+        TransaksiKeuangan(pos_id=pos.id, jumlah=Decimal('40.00'), jenis='keluar', tanggal=date(2024, 8, 1)),
+    ])
+    db.session.commit()
+    assert _snapshot() == {(pos.id, date(2024, 8, 1)): (Decimal('100.00'), Decimal('40.00'))}
+
+    # Moving a transaction to another day takes it off the old day
+    tx.tanggal = date(2024, 8, 2)
+    tx.jumlah = Decimal('120.00')
+    db.session.commit()
+    assert _snapshot() == {
+        (pos.id, date(2024, 8, 1)): (Decimal('0.00'), Decimal('40.00')),
+        (pos.id, date(2024, 8, 2)): (Decimal('120.00'), Decimal('0.00')),
+    }
+
+    db.session.delete(tx)
+    db.session.commit()
+    assert _snapshot()[(pos.id, date(2024, 8, 2))] == (Decimal('0.00'), Decimal('0.00'))
+
+    # Rebuilding from the transactions gives the same balances
+    SaldoHarianService.rebuild()
+    db.session.commit()
+    assert _snapshot() == {(pos.id, date(2024, 8, 1)): (Decimal('0.00'), Decimal('40.00'))}
+
+
+def test_rolled_back_transaction_leaves_no_total(app):
+    pos = _pos()
+    db.session.commit()
+    db.session.add(TransaksiKeuangan(pos_id=pos.id, jumlah=Decimal('10'), jenis='masuk', tanggal=date(2024, 8, 1)))
+    db.session.flush()
+    db.session.rollback()
+    assert SaldoHarian.query.count() == 0
+
+
+def test_opening_balance_and_month_over_month(app):
+    pos = _pos()
+    for tanggal, jumlah, jenis in [
+        (date(2024, 6, 10), '500', 'masuk'),
+        (date(2024, 7, 5), '300', 'masuk'),
+        (date(2024, 7, 20), '100', 'keluar'),
+        (date(2024, 8, 3), '50', 'masuk'),
+    ]:
+        db.session.add(TransaksiKeuangan(pos_id=pos.id, jumlah=Decimal(jumlah), jenis=jenis, tanggal=tanggal))
+    db.session.commit()
+
+    assert SaldoHarianService.saldo_sebelum(date(2024, 7, 1)) == Decimal('500.00')
+    assert SaldoHarianService.saldo_sebelum(date(2024, 8, 1)) == Decimal('700.00')
+
+    bulanan = SaldoHarianService.bulanan(date(2024, 7, 1), date(2024, 8, 31))
+    assert [(b['bulan'], b['bersih'], b['selisih']) for b in bulanan] == [
+        (7, Decimal('200.00'), Decimal('-300.00')),
+        (8, Decimal('50.00'), Decimal('-150.00')),
+    ]
@@ -0,0 +1,72 @@
+import statistics
+from datetime import date
+from app import db
+from app.models.akademik import Santri, Kelas, MataPelajaran, Nilai
+from app.services.statistik import StatistikKelasService
+
+SEMESTER = 'Ganjil 2024/2025'
+
+
+def _seed(scores):
+    """`scores` is {nama: [final score per mapel or None]}; every component gets the same value."""
+    kelas = Kelas(nama_kelas='11A', jenjang='SMA')
+    mapels = [MataPelajaran(nama_mapel=f'Mapel {i}', jenjang='SMA', kkm=70) for i in range(2)]
+    db.session.add_all([kelas] + mapels)
+    db.session.flush()
+    for i, (nama, values) in enumerate(scores.items()):
+        santri = Santri(nis=f'S{i:03d}', nama=nama, jenis_kelamin='L',
+                        tanggal_lahir=date(2008, 1, 1), jenjang='SMA', kelas_id=kelas.id)
+        db.session.add(santri)
+        db.session.flush()
+        for mapel, value in zip(mapels, values):
+            if value is not None:
+                db.session.add(Nilai(santri_id=santri.id, mapel_id=mapel.id, semester=SEMESTER,
+                                     nilai_harian=value, nilai_uts=value, nilai_uas=value, nilai_praktik=value))
+    db.session.commit()
+    return kelas, mapels
+
+
+def test_ranking_and_mapel_statistics(app):
+    kelas, mapels = _seed({
+        'Ahmad': [90, 80],   # 85
+        'Budi': [60, 70],    # 65
+        'Citra': [80, 90],   # 85, ties with Ahmad
+        'Dewi': [100, None], # one mapel only: the missing one counts as 0, so 50
+    })
+
+    result = StatistikKelasService.hitung(kelas.id, SEMESTER)
+
+    assert [(s['nama'], s['peringkat']) for s in result['santri']] == [
+        ('Ahmad', 1), ('Citra', 1), ('Budi', 3), ('Dewi', 4)
+    ]
+    assert next(s for s in result['santri'] if s['nama'] == 'Dewi')['rata_rata'] == 50
+    assert result['jumlah_santri'] == 4
+    budi = next(s for s in result['santri'] if s['nama'] == 'Budi')
+    assert budi['bawah_kkm'] == 1
+
+    mapel_0 = next(m for m in result['mapel'] if m['mapel_id'] == mapels[0].id)
+    values = [90, 60, 80, 100]
+    assert mapel_0['jumlah_nilai'] == 4
+    assert mapel_0['rata_rata'] == round(statistics.mean(values), 2)
+    assert mapel_0['median'] == statistics.median(values)
+    assert mapel_0['std'] == round(statistics.pstdev(values), 2)
+    assert mapel_0['bawah_kkm'] == 1
+    assert result['rata_mapel'][mapels[1].id] == 80
+
+
+def test_empty_class(app):
+    kelas = Kelas(nama_kelas='11B', jenjang='SMA')
+    db.session.add(kelas)
+    db.session.commit()
+    assert StatistikKelasService.hitung(kelas.id, SEMESTER)['santri'] == []
+
+
+def test_untuk_santri_matches_class_statistics(app):
+    kelas, mapels = _seed({'Ahmad': [90, 80], 'Budi': [60, 70], 'Citra': [80, 90], 'Dewi': [100, None]})
+    kelas_wide = StatistikKelasService.hitung(kelas.id, SEMESTER)
+
+    for santri in Santri.query.all():
+        result = StatistikKelasService.untuk_santri(kelas.id, SEMESTER, santri.id)
+        assert result['peringkat'] == {santri.id: kelas_wide['peringkat'][santri.id]}
+        assert result['rata_mapel'] == kelas_wide['rata_mapel']
+        assert result['jumlah_santri'] == 4
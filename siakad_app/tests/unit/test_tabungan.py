@@ -0,0 +1,68 @@
+from datetime import date
+from decimal import Decimal
+import pytest
+from app import db
+from app.models.akademik import Santri
+from app.models.keuangan import TabunganSantri, SaldoTabungan
+from app.services.tabungan import TabunganService, SaldoTidakCukup
+
+
+def _santri(nis):
+    santri = Santri(nis=nis, nama=f'Santri {nis}', jenis_kelamin='L', tanggal_lahir=date(2010, 1, 1), jenjang='SMP')
+    db.session.add(santri)
+    db.session.flush()
+    return santri
+
+
+def test_posting_updates_balance_in_decimal(app):
+    santri = _santri('TB1')
+    TabunganService.posting(santri.id, 'setor', Decimal('10000.10'), keterangan='Uang saku')
+    tx = TabunganService.posting(santri.id, 'tarik', '2500.05')
+    db.session.commit()
+
+    assert tx.saldo_akhir == Decimal('7500.05')
+    assert TabunganService.saldo(santri.id) == Decimal('7500.05')
+
+
+def test_overdraft_is_refused_without_changes(app):
+    santri = _santri('TB2')
+    TabunganService.posting(santri.id, 'setor', 1000)
+    db.session.commit()
+
+    with pytest.raises(SaldoTidakCukup) as exc:
+        TabunganService.posting(santri.id, 'tarik', 1500)
+    assert exc.value.saldo == Decimal('1000.00')
+    db.session.rollback()
+    assert TabunganService.saldo(santri.id) == Decimal('1000.00')
+    assert TabunganSantri.query.count() == 1
+
+
+def test_batch_posts_in_order_and_reports_failures(app):
+    a, b = _santri('TB3'), _santri('TB4')
+    db.session.commit()
+    results = TabunganService.posting_batch([
+        {'nis': 'TB3', 'jenis': 'setor', 'jumlah': '5000'},
+        {'nis': 'TB4', 'jenis': 'tarik', 'jumlah': '100'},     # no balance yet
+        {'nis': 'TB3', 'jenis': 'tarik', 'jumlah': '2,000'},
+        {'nis': 'XXX', 'jenis': 'setor', 'jumlah': '100'},
+        {'santri_id': b.id, 'jenis': 'setor', 'jumlah': 'abc'},
+    ], tanggal=date(2024, 8, 1))
+    db.session.commit()
+
+    assert [error is None for _, _, error in results] == [True, False, True, False, False]
+    assert results[2][1].saldo_akhir == Decimal('3000.00')
+    assert TabunganService.saldo(a.id) == Decimal('3000.00')
+    assert TabunganService.saldo(b.id) == Decimal('0.00')
+
+
+def test_rebuild_matches_ledger(app):
+    santri = _santri('TB5')
+    TabunganService.posting(santri.id, 'setor', 700)
+    TabunganService.posting(santri.id, 'tarik', 200)
+    db.session.commit()
+    SaldoTabungan.query.delete()
+    db.session.commit()
+
+    TabunganService.rebuild()
+    db.session.commit()
+    assert TabunganService.saldo(santri.id) == Decimal('500.00')
@@ -0,0 +1,45 @@
+from datetime import date
+from decimal import Decimal
+from app import db
+from app.models.akademik import Santri
+from app.models.keuangan import Keuangan
+from app.services.tagihan import TagihanSppService
+
+
+def _santri(nis, jenjang='SMP', status='aktif'):
+    santri = Santri(nis=nis, nama=f'Santri {nis}', jenis_kelamin='L', tanggal_lahir=date(2010, 1, 1),
+                    jenjang=jenjang, status=status)
+    db.session.add(santri)
+    db.session.flush()
+    return santri
+
+
+def test_generate_bills_active_santri_once(app):
+    a, b = _santri('TG1'), _santri('TG2')
+    _santri('TG3', status='lulus')
+    db.session.add(Keuangan(santri_id=a.id, bulan='Juli', tahun=2024, jumlah=150000, status='Lunas'))
+    db.session.commit()
+
+    hasil = TagihanSppService.generate(2024, 'Juli', Decimal('150000'))
+    db.session.commit()
+
+    assert hasil == {'sasaran': 2, 'dibuat': 1, 'dilewati': 1}
+    tagihan = Keuangan.query.filter_by(santri_id=b.id, tahun=2024, bulan='Juli').one()
+    assert tagihan.status == 'Belum Lunas' and tagihan.jumlah == Decimal('150000.00')
+    # The paid row is untouched
+    assert Keuangan.query.filter_by(santri_id=a.id).one().status == 'Lunas'
+
+    # Running the same month again creates nothing
+    assert TagihanSppService.generate(2024, 'Juli', 150000)['dibuat'] == 0
+
+
+def test_generate_filters_by_jenjang(app):
+    _santri('TG4', jenjang='SD')
+    smp = _santri('TG5', jenjang='SMP')
+    db.session.commit()
+
+    hasil = TagihanSppService.generate(2024, 'Agustus', 100000, jenjang='SMP')
+    db.session.commit()
+
+    assert hasil['dibuat'] == 1
+    assert [k.santri_id for k in Keuangan.query.filter_by(bulan='Agustus')] == [smp.id]
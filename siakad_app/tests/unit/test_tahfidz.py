@@ -0,0 +1,52 @@
+from datetime import date
+from app import db
+from app.models.akademik import Santri, Tahfidz
+from app.services.quran import SURAH, posisi, TOTAL_AYAT
+from app.services.tahfidz import TahfidzProgressService, merge_intervals
+
+
+def _setor(santri_id, surah, mulai, selesai, kelancaran='Lancar'):
+    db.session.add(Tahfidz(santri_id=santri_id, surah_nomor=surah, ayat_mulai=mulai, ayat_selesai=selesai,
+                           kelancaran=kelancaran, tajwid='Bagus', tanggal_setor=date(2024, 8, 1)))
+
+
+def test_merge_intervals_joins_overlapping_and_adjacent():
+    assert merge_intervals([(5, 10), (1, 3), (4, 4), (8, 12), (20, 25)]) == [[1, 12], [20, 25]]
+
+
+def test_progress_counts_distinct_ayat_and_juz(app):
+    santri = Santri(nis='T001', nama='Santri Tahfidz', jenis_kelamin='L', tanggal_lahir=date(2010, 1, 1), jenjang='SMP')
+    db.session.add(santri)
+    db.session.flush()
+    # All of juz 30 (An-Naba' .. An-Nas), plus a repeated and an 'Ulang' deposit
+    for nomor, _, jumlah in SURAH[77:]:
+        _setor(santri.id, nomor, 1, jumlah)
+    _setor(santri.id, 78, 1, 20)                      # repeated, counted once
+    _setor(santri.id, 67, 1, 10, kelancaran='Ulang')  # not counted
+    _setor(santri.id, 2, 1, 5)                        # part of juz 1
+    db.session.commit()
+
+    progress = TahfidzProgressService.get_progress(santri.id)
+    assert progress['ayat'] == TOTAL_AYAT - posisi(78, 1) + 1 + 5
+    assert progress['juz_selesai'] == 1
+    assert progress['surah_selesai'] == 37
+    assert [(j['juz'], j['ayat']) for j in progress['juz']] == [(1, 5), (30, progress['ayat'] - 5)]
+
+
+def test_progress_is_cached_until_santri_deposits(app):
+    santri = Santri(nis='T002', nama='Santri Cache', jenis_kelamin='P', tanggal_lahir=date(2010, 1, 1), jenjang='SMP')
+    db.session.add(santri)
+    db.session.flush()
+    _setor(santri.id, 1, 1, 7)
+    db.session.commit()
+    assert TahfidzProgressService.get_progress(santri.id)['ayat'] == 7
+
+    # Bypassing the ORM does not invalidate: the cached value is served
+    db.session.execute(Tahfidz.__table__.update().values(ayat_selesai=3))
+    db.session.commit()
+    assert TahfidzProgressService.get_progress(santri.id)['ayat'] == 7
+
+    # A new deposit for this santri drops the cached value
+    _setor(santri.id, 112, 1, 4)
+    db.session.commit()
+    assert TahfidzProgressService.get_progress(santri.id)['ayat'] == 3 + 4
@@ -0,0 +1,58 @@
+from datetime import date
+from decimal import Decimal
+from app import db
+from app.models.akademik import Santri, Kelas
+from app.models.keuangan import Keuangan
+from app.services.tunggakan import TunggakanService, daftar_periode
+
+
+def _santri(nis, kelas=None, status='aktif'):
+    santri = Santri(nis=nis, nama=f'Santri {nis}', jenis_kelamin='L', tanggal_lahir=date(2010, 1, 1),
+                    jenjang='SMP', status=status, kelas_id=kelas.id if kelas else None)
+    db.session.add(santri)
+    db.session.flush()
+    return santri
+
+
+def test_periode_is_set_from_bulan_and_tahun(app):
+    bayar = Keuangan(bulan='Juli', tahun=2024)
+    assert bayar.periode == 202407
+    bayar.bulan = 'Desember'
+    assert bayar.periode == 202412
+    assert Keuangan.nama_periode(202412) == 'Desember 2024'
+
+
+def test_daftar_periode_crosses_year():
+    assert daftar_periode(202411, 202502) == [202411, 202412, 202501, 202502]
+
+
+def test_unpaid_and_unbilled_months_per_kelas(app):
+    kelas = Kelas(nama_kelas='7A', jenjang='SMP')
+    db.session.add(kelas)
+    db.session.flush()
+    a, b = _santri('TN1', kelas), _santri('TN2', kelas)
+    _santri('TN3', kelas, status='lulus')
+    db.session.add_all([
+        Keuangan(santri_id=a.id, bulan='Januari', tahun=2024, jumlah=100000, status='Lunas'),
+        Keuangan(santri_id=a.id, bulan='Februari', tahun=2024, jumlah=120000, status='Belum Lunas'),
+        Keuangan(santri_id=b.id, bulan='Januari', tahun=2024, jumlah=100000, status='Lunas'),
+        Keuangan(santri_id=b.id, bulan='Februari', tahun=2024, jumlah=100000, status='Lunas'),
+    ])
+    db.session.commit()
+
+    per_kelas, total = TunggakanService.per_kelas(202401, 202403, tarif=Decimal('100000'))
+    # a: Februari (billed 120000) + Maret (unbilled); b: Maret (unbilled)
+    assert per_kelas == [{'kelas_id': kelas.id, 'nama_kelas': '7A', 'santri': 2, 'bulan': 3,
+                          'total': Decimal('320000.00')}]
+    assert total['total'] == Decimal('320000.00')
+
+    page = TunggakanService.santri_page(202401, 202403, tarif=Decimal('100000'), per_page=1)
+    assert [(r.nis, r.jumlah_bulan, r.periode_awal) for r in page.items] == [('TN1', 2, 202402)]
+    page = TunggakanService.santri_page(202401, 202403, after=page.next_cursor, per_page=1)
+    assert [(r.nis, r.jumlah_bulan) for r in page.items] == [('TN2', 1)]
+    assert not page.has_next
+
+    rincian = list(TunggakanService.iter_rincian(202401, 202403))
+    assert [(r.nis, r.periode, r.status) for r in rincian] == [
+        ('TN1', 202402, 'Belum Lunas'), ('TN1', 202403, 'Belum Ditagih'), ('TN2', 202403, 'Belum Ditagih')
+    ]